@@ -4,6 +4,7 @@
 
 __all__ = [
     # Modules
+    "analysis",
     "serde",
     "traversal",
     "convenience",
@@ -79,7 +80,7 @@ __all__ = [
     "save",
 ]
 
-from onnxscript.ir import convenience, external_data, passes, serde, traversal
+from onnxscript.ir import analysis, convenience, external_data, passes, serde, traversal
 from onnxscript.ir._convenience import tensor
 from onnxscript.ir._core import (
     Attr,
@@ -15,7 +15,7 @@ __all__ = [
 ]
 
 import typing
-from typing import Mapping, Sequence, Union
+from typing import Any, Mapping, Sequence, Union
 
 import numpy as np
 import onnx
@@ -338,7 +338,13 @@ def tensor(
         ValueError: If the dtype does not match the value when value is not a plain Python
             object like ``list[int]``.
     """
-    if isinstance(value, _protocols.TensorProtocol):
+    # Check the common concrete types first because isinstance checks against
+    # runtime protocols are slow
+    if isinstance(value, (list, tuple, int, float, bool)):
+        return _tensor_from_python_object(value, dtype, name, doc_string)
+    if isinstance(value, np.ndarray):
+        return _core.Tensor(value, dtype=dtype, name=name, doc_string=doc_string)
+    if isinstance(value, (_core.TensorBase, _protocols.TensorProtocol)):
         if dtype is not None and dtype != value.dtype:
             raise ValueError(
                 f"The dtype must match the value when value is a Tensor. dtype={dtype}, value.dtype={value.dtype}. "
@@ -362,9 +368,13 @@ def tensor(
         # as it creates overhead during import
         return tensor_adapters.TorchTensor(value, name=name, doc_string=doc_string)  # type: ignore[arg-type]
     elif isinstance(value, (_protocols.DLPackCompatible, _protocols.ArrayCompatible)):
-        return _core.Tensor(value, dtype=dtype, name=name, doc_string=name)
+        return _core.Tensor(value, dtype=dtype, name=name, doc_string=doc_string)
+    return _tensor_from_python_object(value, dtype, name, doc_string)
 
-    # Plain Python object
+
+def _tensor_from_python_object(
+    value: Any, dtype: _enums.DataType | None, name: str | None, doc_string: str | None
+) -> _core.Tensor:
     if dtype is not None:
         numpy_dtype = dtype.numpy()
     else:
@@ -375,14 +385,15 @@ def tensor(
         dtype=dtype,
         shape=_core.Shape(array.shape),
         name=name,
-        doc_string=name,
+        doc_string=doc_string,
     )
 
 
 def create_value_mapping(graph: _core.Graph) -> dict[str, _core.Value]:
     """Return a dictionary mapping names to values in the graph.
 
-    The mapping does not include values from subgraphs.
+    The mapping does not include values from subgraphs. The mapping is created on
+    every call. To look up a few values by name, use :meth:`Graph.value` instead.
 
     Args:
         graph: The graph to extract the mapping from.
@@ -6,6 +6,7 @@ import unittest
 
 import numpy as np
 
+from onnxscript import ir
 from onnxscript.ir import _convenience
 
 
@@ -17,6 +18,18 @@ class ConvenienceTest(unittest.TestCase):
         tensor = _convenience.tensor(torch_tensor)
         np.testing.assert_array_equal(tensor, torch_tensor.numpy())
 
+    def test_tensor_keeps_the_doc_string(self):
+        for value in ([1, 2], np.array([1, 2])):
+            tensor = _convenience.tensor(value, name="name", doc_string="doc")
+            self.assertEqual(tensor.name, "name")
+            self.assertEqual(tensor.doc_string, "doc")
+
+    def test_tensor_returns_tensors_as_is(self):
+        tensor = _convenience.tensor([1.0])
+        self.assertIs(_convenience.tensor(tensor), tensor)
+        with self.assertRaises(ValueError):
+            _convenience.tensor(tensor, dtype=ir.DataType.INT64)
+
 
 if __name__ == "__main__":
     unittest.main()
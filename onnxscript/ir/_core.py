@@ -16,17 +16,21 @@ import abc
 import contextlib
 import dataclasses
 import heapq
+import itertools
 import math
 import mmap
 import os
 import sys
 import textwrap
 import typing
+import weakref
 from collections.abc import Hashable
 from typing import (
     AbstractSet,
     Any,
+    Callable,
     Collection,
+    Dict,
     Generic,
     Iterable,
     Iterator,
@@ -34,6 +38,7 @@ from typing import (
     OrderedDict,
     Sequence,
     SupportsInt,
+    Tuple,
     Union,
 )
 
@@ -47,6 +52,7 @@ from onnxscript.ir import (
     _enums,
     _linked_list,
     _metadata,
+    _mmap_cache,
     _name_authority,
     _protocols,
     _type_casting,
@@ -56,6 +62,8 @@ if typing.TYPE_CHECKING:
     import numpy.typing as npt
     from typing_extensions import TypeGuard
 
+    from onnxscript.ir import analysis
+
 TArrayCompatible = typing.TypeVar(
     "TArrayCompatible",
     bound=Union[_protocols.ArrayCompatible, _protocols.DLPackCompatible],
@@ -270,6 +278,69 @@ def _maybe_view_np_array_with_ml_dtypes(
     return array
 
 
+_PACKED_4BIT_TYPES = frozenset(
+    (_enums.DataType.INT4, _enums.DataType.UINT4, _enums.DataType.FLOAT4E2M1)
+)
+# Little endian numpy dtypes used to read the buffers of tensors, filled on first use
+_LITTLE_ENDIAN_NUMPY_DTYPES: dict[_enums.DataType, np.dtype] = {}
+
+
+def _frozen_static_shape(shape: Shape | Sequence[int]) -> tuple[Shape, tuple[int, ...]]:
+    """Return a frozen shape and its dimensions, raising ValueError when one is symbolic."""
+    # Check the concrete sequence types first because isinstance checks against
+    # classes deriving from protocols are slow
+    if isinstance(shape, (tuple, list)) or not isinstance(shape, Shape):
+        shape = Shape(shape, frozen=True)
+    else:
+        # Like in Tensor.__init__, the given shape is frozen and used by the tensor
+        shape._frozen = True  # pylint: disable=protected-access
+    dims = tuple(shape._dims)  # pylint: disable=protected-access
+    for dim in dims:
+        if not isinstance(dim, int):
+            raise ValueError(f"The shape {shape} must not have symbolic dimensions")  # noqa: TRY004
+    return shape, dims  # type: ignore[return-value]
+
+
+def _check_buffer_size(buffer: Any, expected: int, dtype: _enums.DataType) -> None:
+    size = memoryview(buffer).nbytes
+    if size != expected:
+        raise ValueError(
+            f"The buffer has {size} bytes, but {expected} bytes are expected for "
+            f"the dtype {dtype} and the shape."
+        )
+
+
+def _unpack_4bit(
+    packed: npt.NDArray[np.uint8], dtype: _enums.DataType, dims: Sequence[int]
+) -> np.ndarray:
+    if dtype == _enums.DataType.INT4:
+        return _type_casting.unpack_int4(packed, dims)
+    if dtype == _enums.DataType.UINT4:
+        return _type_casting.unpack_uint4(packed, dims)
+    return _type_casting.unpack_float4e2m1(packed, dims)
+
+
+def _array_from_buffer(
+    buffer: Any, dtype: _enums.DataType, dims: tuple[int, ...]
+) -> np.ndarray:
+    """Read an array from a buffer in the layout of ``TensorProto.raw_data``."""
+    size = math.prod(dims)
+    if dtype in _PACKED_4BIT_TYPES:
+        _check_buffer_size(buffer, (size + 1) // 2, dtype)
+        return _unpack_4bit(np.frombuffer(buffer, dtype=np.uint8), dtype, dims)
+    numpy_dtype = _LITTLE_ENDIAN_NUMPY_DTYPES.get(dtype)
+    if numpy_dtype is None:
+        numpy_dtype = dtype.numpy()
+        if numpy_dtype.kind in "OSU":
+            raise TypeError(f"A tensor of dtype {dtype} cannot be created from a buffer.")
+        numpy_dtype = _LITTLE_ENDIAN_NUMPY_DTYPES[dtype] = numpy_dtype.newbyteorder("<")
+    _check_buffer_size(buffer, size * numpy_dtype.itemsize, dtype)
+    array = np.frombuffer(buffer, dtype=numpy_dtype)
+    if not _IS_LITTLE_ENDIAN:
+        array = array.astype(numpy_dtype.newbyteorder("="))
+    return array.reshape(dims)
+
+
 class Tensor(TensorBase, _protocols.TensorProtocol, Generic[TArrayCompatible]):  # pylint: disable=too-many-ancestors
     """An immutable concrete tensor.
 
@@ -386,6 +457,132 @@ class Tensor(TensorBase, _protocols.TensorProtocol, Generic[TArrayCompatible]):
         self._metadata: _metadata.MetadataStore | None = None
         self._metadata_props = metadata_props
 
+    @classmethod
+    def _from_valid_array(
+        cls,
+        array: np.ndarray,
+        dtype: _enums.DataType,
+        shape: Shape,
+        name: str | None,
+        doc_string: str | None,
+        metadata_props: dict[str, str] | None,
+    ) -> Tensor:
+        """Create a tensor without checking that the array matches the dtype and shape."""
+        tensor = cls.__new__(cls)
+        tensor._raw = array
+        tensor._dtype = dtype
+        tensor._shape = shape
+        tensor.name = name
+        tensor.doc_string = doc_string
+        tensor._metadata = None
+        tensor._metadata_props = metadata_props
+        return tensor
+
+    @classmethod
+    def from_buffer(
+        cls,
+        buffer: bytes | bytearray | memoryview,
+        dtype: _enums.DataType,
+        shape: Shape | Sequence[int],
+        *,
+        name: str | None = None,
+        doc_string: str | None = None,
+        metadata_props: dict[str, str] | None = None,
+    ) -> Tensor:
+        """Create a tensor from a buffer in the layout of ``TensorProto.raw_data``.
+
+        The elements are read in little endian order, with 4-bit types packed two
+        per byte. The tensor is a view of the buffer and the data is not copied,
+        except for 4-bit types, which are unpacked, and on big endian systems.
+        The buffer must not be modified while the tensor is in use.
+
+        Example::
+
+            >>> from onnxscript import ir
+            >>> import numpy as np
+            >>> data = np.array([1, 2], dtype=np.int16).tobytes()
+            >>> ir.Tensor.from_buffer(data, ir.DataType.INT16, [2])
+            Tensor<INT16,[2]>(array([1, 2], dtype=int16), name=None)
+
+        Args:
+            buffer: An object supporting the buffer protocol, like ``bytes`` or ``memoryview``.
+            dtype: The data type of the elements.
+            shape: The shape of the tensor. All dimensions must be static.
+            name: The name of the tensor.
+            doc_string: The documentation string.
+            metadata_props: The metadata properties.
+
+        Raises:
+            TypeError: If the dtype is not supported by numpy, like STRING.
+            ValueError: If the size of the buffer does not match the dtype and shape.
+        """
+        frozen_shape, dims = _frozen_static_shape(shape)
+        array = _array_from_buffer(buffer, dtype, dims)
+        return cls._from_valid_array(
+            array, dtype, frozen_shape, name, doc_string, metadata_props
+        )
+
+    @classmethod
+    def from_buffers(
+        cls,
+        buffers: Sequence[bytes | bytearray | memoryview],
+        dtype: _enums.DataType,
+        shapes: Sequence[Shape | Sequence[int]],
+        *,
+        names: Sequence[str | None] | None = None,
+    ) -> list[Tensor]:
+        """Create many tensors of the same dtype from buffers, see :meth:`from_buffer`.
+
+        This is faster than calling :meth:`from_buffer` for each buffer when creating
+        many small tensors. The buffers of 4-bit types are joined and unpacked at
+        once, and the tensors are views of the unpacked array.
+
+        Args:
+            buffers: The buffers of the tensors.
+            dtype: The data type of the elements of all tensors.
+            shapes: The shape of each tensor.
+            names: The name of each tensor.
+
+        Returns:
+            The tensors, in the order of the buffers.
+
+        Raises:
+            TypeError: If the dtype is not supported by numpy, like STRING.
+            ValueError: If the numbers of buffers, shapes and names differ, or if the
+                size of a buffer does not match the dtype and its shape.
+        """
+        if len(shapes) != len(buffers) or (names is not None and len(names) != len(buffers)):
+            raise ValueError("The numbers of buffers, shapes and names must be equal.")
+        if names is None:
+            names = [None] * len(buffers)
+        frozen_shapes = [_frozen_static_shape(shape) for shape in shapes]
+        if dtype not in _PACKED_4BIT_TYPES:
+            return [
+                cls._from_valid_array(
+                    _array_from_buffer(buffer, dtype, dims), dtype, shape, name, None, None
+                )
+                for buffer, (shape, dims), name in zip(buffers, frozen_shapes, names)
+            ]
+
+        sizes = [math.prod(dims) for _, dims in frozen_shapes]
+        packed_sizes = [(size + 1) // 2 for size in sizes]
+        joined = b"".join(buffers)
+        if len(joined) != sum(packed_sizes):
+            for buffer, packed_size in zip(buffers, packed_sizes):
+                _check_buffer_size(buffer, packed_size, dtype)
+        unpacked = _unpack_4bit(
+            np.frombuffer(joined, dtype=np.uint8), dtype, [len(joined) * 2]
+        )
+        tensors = []
+        start = 0
+        for (shape, dims), size, packed_size, name in zip(
+            frozen_shapes, sizes, packed_sizes, names
+        ):
+            array = unpacked[start : start + size].reshape(dims)
+            tensors.append(cls._from_valid_array(array, dtype, shape, name, None, None))
+            start += packed_size * 2
+        return tensors
+
     def __array__(self, dtype: Any = None) -> np.ndarray:
         if isinstance(self._raw, np.ndarray) or _compatible_with_numpy(self._raw):
             return self._raw.__array__(dtype)
@@ -507,6 +704,7 @@ class ExternalTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=
     """
 
     __slots__ = (
+        "__weakref__",
         "_array",
         "_base_dir",
         "_dtype",
@@ -515,6 +713,7 @@ class ExternalTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=
         "_metadata",
         "_metadata_props",
         "_offset",
+        "_release_mapping",
         "_shape",
         "_valid",
         "doc_string",
@@ -567,6 +766,8 @@ class ExternalTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=
         self.doc_string: str | None = doc_string  # mutable
         self._array: np.ndarray | None = None
         self.raw: mmap.mmap | None = None
+        # Releases the mapping when the tensor is garbage collected or released
+        self._release_mapping: weakref.finalize | None = None
         self._metadata_props = metadata_props
         self._metadata: _metadata.MetadataStore | None = None
         self._valid = True
@@ -617,14 +818,12 @@ class ExternalTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=
             # When the size is 0, mmap is impossible and meaningless
             self._array = np.empty(self.shape.numpy(), dtype=self.dtype.numpy())
             return
-        # Map the whole file into the memory
-        # TODO(justinchuby): Verify if this would exhaust the memory address space
-        with open(self.path, "rb") as f:
-            self.raw = mmap.mmap(
-                f.fileno(),
-                0,
-                access=mmap.ACCESS_READ,
-            )
+        # Map the whole file into the memory. The mapping is shared with all other
+        # external tensors that refer to the same file.
+        self.raw = _mmap_cache.MAPPED_FILES.acquire(self.path)
+        self._release_mapping = weakref.finalize(
+            self, _mmap_cache.MAPPED_FILES.release, self.raw
+        )
         # Handle the byte order correctly by always using little endian
         dt = np.dtype(self.dtype.numpy()).newbyteorder("<")
         if self.dtype in {
@@ -719,11 +918,21 @@ class ExternalTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=
         self._valid = False
 
     def release(self) -> None:
-        """Delete all references to the memory buffer and close the memory-mapped file."""
+        """Delete all references to the memory buffer and release the memory-mapped file.
+
+        The mapping is shared by all external tensors referring to the same file. It is
+        closed when it is no longer used by any tensor and is evicted from the cache.
+        See :func:`onnxscript.ir.external_data.release_mapped_files`.
+
+        The mapping is also released when the tensor is garbage collected, so calling
+        this method is only needed to release it earlier.
+        """
         self._array = None
-        if self.raw is not None:
-            self.raw.close()
-            self.raw = None
+        self.raw = None
+        if self._release_mapping is not None:
+            # Calling the finalizer releases the mapping once and detaches it
+            self._release_mapping()
+            self._release_mapping = None
 
     @property
     def metadata_props(self) -> dict[str, str]:
@@ -853,8 +1062,36 @@ class StringTensor(TensorBase, _protocols.TensorProtocol):  # pylint: disable=to
         return self._metadata
 
 
+# A symbolic expression is a polynomial with integer coefficients, stored as a
+# mapping from monomials to their coefficients. A monomial is a sorted tuple of atoms,
+# the names of symbolic dims or of floor divisions that cannot be simplified, and
+# the empty monomial holds the constant term.
+_Terms = Dict[Tuple[str, ...], int]
+
+
 class SymbolicDim(_protocols.SymbolicDimProtocol, _display.PrettyPrintable):
-    __slots__ = ("_value",)
+    """A symbolic dimension of a shape.
+
+    A symbolic dimension is either a named dimension, an unknown dimension (``None``)
+    or an expression of named dimensions. Expressions are created with the ``+``, ``-``,
+    ``*`` and ``//`` operators, which accept ints and other symbolic dimensions::
+
+        >>> batch = SymbolicDim("batch")
+        >>> batch * 4 + 1
+        SymbolicDim(4*batch + 1)
+        >>> (batch * 4) // 2
+        SymbolicDim(2*batch)
+        >>> batch * 4 - 4 * batch
+        0
+
+    Expressions are simplified to a canonical form, which is their :attr:`value`, so
+    equivalent expressions compare equal. The result of an operation is an int when
+    the expression simplifies to a constant, and is unknown when an operand is
+    unknown. Names are never parsed: ``SymbolicDim("2*batch")`` is a name, which is not
+    equal to the expression ``batch * 2``.
+    """
+
+    __slots__ = ("_terms", "_value")
 
     def __init__(self, value: str | None) -> None:
         """Initialize a symbolic dimension.
@@ -868,11 +1105,14 @@ class SymbolicDim(_protocols.SymbolicDimProtocol, _display.PrettyPrintable):
                 "If you are creating a Shape, use int directly instead of SymbolicDim."
             )
         self._value = value
+        # Set for expressions only. A name is the monomial of a single atom.
+        self._terms: _Terms | None = None
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, SymbolicDim):
             return self.value == other
-        return self.value == other.value
+        # A name is an atom, so it is not equal to an expression with the same text
+        return self.value == other.value and self._terms == other._terms
 
     def __hash__(self) -> int:
         return hash(self.value)
@@ -881,12 +1121,175 @@ class SymbolicDim(_protocols.SymbolicDimProtocol, _display.PrettyPrintable):
     def value(self) -> str | None:
         return self._value
 
+    def is_non_negative(self) -> bool:
+        """Return whether the dimension is known to be non-negative.
+
+        A name is the size of a dimension, so it is non-negative. An expression is
+        non-negative when its coefficients are non-negative and it has no floor
+        divisions, whose operands may be negative. An unknown dimension is not known
+        to be non-negative.
+        """
+        if self._value is None:
+            return False
+        if self._terms is None:
+            return True
+        return all(
+            coefficient >= 0 and not any("//" in atom for atom in monomial)
+            for monomial, coefficient in self._terms.items()
+        )
+
     def __str__(self) -> str:
         return f"{self._value}"
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self._value})"
 
+    def __add__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_add_terms, self, other)
+
+    def __radd__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_add_terms, other, self)
+
+    def __sub__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_subtract_terms, self, other)
+
+    def __rsub__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_subtract_terms, other, self)
+
+    def __mul__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_multiply_terms, self, other)
+
+    def __rmul__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_multiply_terms, other, self)
+
+    def __floordiv__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_floor_divide_terms, self, other)
+
+    def __rfloordiv__(self, other: int | SymbolicDim) -> int | SymbolicDim:
+        return _symbolic_binary_op(_floor_divide_terms, other, self)
+
+    def __neg__(self) -> int | SymbolicDim:
+        return _symbolic_binary_op(_subtract_terms, 0, self)
+
+
+def _to_terms(dim: int | SymbolicDim) -> _Terms:
+    if isinstance(dim, int):
+        return {(): dim} if dim else {}
+    if dim._terms is not None:  # pylint: disable=protected-access
+        return dim._terms  # pylint: disable=protected-access
+    assert dim.value is not None
+    return {(dim.value,): 1}
+
+
+def _from_terms(terms: _Terms) -> int | SymbolicDim:
+    """Create the int or the canonical SymbolicDim of a polynomial."""
+    terms = {monomial: coefficient for monomial, coefficient in terms.items() if coefficient}
+    if not terms:
+        return 0
+    if len(terms) == 1:
+        ((monomial, coefficient),) = terms.items()
+        if not monomial:
+            return coefficient
+        if len(monomial) == 1 and coefficient == 1:
+            return SymbolicDim(monomial[0])
+    dim = SymbolicDim(_format_terms(terms))
+    dim._terms = terms  # pylint: disable=protected-access
+    return dim
+
+
+def _format_atom(atom: str) -> str:
+    return atom if atom.isidentifier() else f"({atom})"
+
+
+def _format_terms(terms: _Terms) -> str:
+    """Format a polynomial with the terms of higher degree first."""
+    text = ""
+    for monomial in sorted(terms, key=lambda monomial: (-len(monomial), monomial)):
+        coefficient = terms[monomial]
+        magnitude = abs(coefficient)
+        if not monomial:
+            term = str(magnitude)
+        else:
+            term = "*".join(_format_atom(atom) for atom in monomial)
+            if magnitude != 1:
+                term = f"{magnitude}*{term}"
+        if not text:
+            text = f"-{term}" if coefficient < 0 else term
+        else:
+            text += f" - {term}" if coefficient < 0 else f" + {term}"
+    return text
+
+
+def _format_operand(terms: _Terms) -> str:
+    text = _format_terms(terms) or "0"
+    if len(terms) == 1:
+        ((monomial, coefficient),) = terms.items()
+        if coefficient > 0 and (not monomial or (len(monomial) == 1 and coefficient == 1)):
+            return _format_atom(text) if monomial else text
+    return f"({text})"
+
+
+def _add_terms(a: _Terms, b: _Terms) -> _Terms:
+    result = dict(a)
+    for monomial, coefficient in b.items():
+        result[monomial] = result.get(monomial, 0) + coefficient
+    return result
+
+
+def _subtract_terms(a: _Terms, b: _Terms) -> _Terms:
+    return _add_terms(a, {monomial: -coefficient for monomial, coefficient in b.items()})
+
+
+def _multiply_terms(a: _Terms, b: _Terms) -> _Terms:
+    result: _Terms = {}
+    for monomial_a, coefficient_a in a.items():
+        for monomial_b, coefficient_b in b.items():
+            monomial = tuple(sorted(monomial_a + monomial_b))
+            result[monomial] = result.get(monomial, 0) + coefficient_a * coefficient_b
+    return result
+
+
+def _divide_monomial(
+    monomial: tuple[str, ...], divisor: tuple[str, ...]
+) -> tuple[str, ...] | None:
+    remaining = list(monomial)
+    for atom in divisor:
+        if atom not in remaining:
+            return None
+        remaining.remove(atom)
+    return tuple(remaining)
+
+
+def _floor_divide_terms(a: _Terms, b: _Terms) -> _Terms:
+    if not b:
+        raise ZeroDivisionError("Symbolic dimension division by zero")
+    if len(b) == 1:
+        # Divide exactly by a monomial when it divides every term
+        ((divisor, divisor_coefficient),) = b.items()
+        result: _Terms = {}
+        for monomial, coefficient in a.items():
+            quotient = _divide_monomial(monomial, divisor)
+            if quotient is None or coefficient % divisor_coefficient:
+                break
+            result[quotient] = coefficient // divisor_coefficient
+        else:
+            return result
+    # The floor division becomes an atom of the expression
+    return {(f"{_format_operand(a)}//{_format_operand(b)}",): 1}
+
+
+def _symbolic_binary_op(
+    op: Callable[[_Terms, _Terms], _Terms], a: int | SymbolicDim, b: int | SymbolicDim
+) -> int | SymbolicDim:
+    if not isinstance(a, (int, SymbolicDim)) or not isinstance(b, (int, SymbolicDim)):
+        return NotImplemented
+    if (isinstance(a, SymbolicDim) and a.value is None) or (
+        isinstance(b, SymbolicDim) and b.value is None
+    ):
+        # An expression of an unknown dimension is unknown
+        return SymbolicDim(None)
+    return _from_terms(op(_to_terms(a), _to_terms(b)))
+
 
 def _is_int_compatible(value: object) -> TypeIs[SupportsInt]:
     """Return True if the value is int compatible."""
@@ -898,12 +1301,29 @@ def _is_int_compatible(value: object) -> TypeIs[SupportsInt]:
     return False
 
 
+# Symbolic dims are immutable and compared by value, so the same object can be
+# shared by all shapes using a name. The cache is cleared when it grows too large
+# to bound its memory on graphs with many unique generated names.
+_SYMBOLIC_DIM_CACHE_SIZE = 4096
+_symbolic_dims: dict[str | None, SymbolicDim] = {}
+
+
+def _interned_symbolic_dim(value: str | None) -> SymbolicDim:
+    """Return a shared SymbolicDim for the value."""
+    dim = _symbolic_dims.get(value)
+    if dim is None:
+        if len(_symbolic_dims) >= _SYMBOLIC_DIM_CACHE_SIZE:
+            _symbolic_dims.clear()
+        dim = _symbolic_dims[value] = SymbolicDim(value)
+    return dim
+
+
 def _maybe_convert_to_symbolic_dim(
     dim: int | SupportsInt | SymbolicDim | str | None,
 ) -> SymbolicDim | int:
     """Convert the value to a SymbolicDim if it is not an int."""
     if dim is None or isinstance(dim, str):
-        return SymbolicDim(dim)
+        return _interned_symbolic_dim(dim)
     if _is_int_compatible(dim):
         return int(dim)
     if isinstance(dim, SymbolicDim):
@@ -913,8 +1333,20 @@ def _maybe_convert_to_symbolic_dim(
     )
 
 
+def _convert_dims(
+    dims: Iterable[int | SupportsInt | SymbolicDim | str | None],
+) -> list[int | SymbolicDim]:
+    """Convert the dims of a shape, skipping the conversion when no dim needs it."""
+    dim_list = list(dims)
+    for dim in dim_list:
+        # bool and other int compatible types go through the conversion
+        if type(dim) is not int and not isinstance(dim, SymbolicDim):  # pylint: disable=unidiomatic-typecheck
+            return [_maybe_convert_to_symbolic_dim(dim) for dim in dim_list]
+    return dim_list  # type: ignore[return-value]
+
+
 class Shape(_protocols.ShapeProtocol, _display.PrettyPrintable):
-    __slots__ = ("_dims", "_frozen")
+    __slots__ = ("_denotations", "_dims", "_frozen")
 
     def __init__(
         self,
@@ -938,16 +1370,15 @@ class Shape(_protocols.ShapeProtocol, _display.PrettyPrintable):
             frozen: If True, the shape is immutable and cannot be modified. This
                 is useful when the shape is initialized by a Tensor.
         """
-        self._dims: list[int | SymbolicDim] = [
-            _maybe_convert_to_symbolic_dim(dim) for dim in dims
-        ]
-        self._denotations: list[str | None] = (
-            list(denotations) if denotations is not None else [None] * len(self._dims)
-        )
-        if len(self._denotations) != len(self._dims):
-            raise ValueError(
-                "The number of denotations, when provided, must be equal to the number of dimensions."
-            )
+        self._dims: list[int | SymbolicDim] = _convert_dims(dims)
+        # Allocated only when a denotation is set because most shapes have none
+        self._denotations: list[str | None] | None = None
+        if denotations is not None:
+            self._denotations = list(denotations)
+            if len(self._denotations) != len(self._dims):
+                raise ValueError(
+                    "The number of denotations, when provided, must be equal to the number of dimensions."
+                )
         self._frozen: bool = frozen
 
     def copy(self):
@@ -1011,6 +1442,10 @@ class Shape(_protocols.ShapeProtocol, _display.PrettyPrintable):
         Returns:
             The denotation of the dimension.
         """
+        if self._denotations is None:
+            # Raise IndexError for an invalid index
+            _ = self._dims[index]
+            return None
         return self._denotations[index]
 
     def set_denotation(self, index: int, denotation: str | None) -> None:
@@ -1020,6 +1455,8 @@ class Shape(_protocols.ShapeProtocol, _display.PrettyPrintable):
             index: The index of the dimension.
             denotation: The denotation of the dimension.
         """
+        if self._denotations is None:
+            self._denotations = [None] * len(self._dims)
         self._denotations[index] = denotation
 
     def __repr__(self) -> str:
@@ -1187,7 +1624,8 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
         self._version: int | None = version
         self._metadata: _metadata.MetadataStore | None = None
         self._metadata_props: dict[str, str] | None = metadata_props
-        self._graph: Graph | None = graph
+        # Set by the graph when the node is added to it
+        self._graph: Graph | None = None
         self.doc_string = doc_string
 
         # Add the node as a use of the inputs
@@ -1196,8 +1634,8 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
                 input_value._add_usage(self, i)  # pylint: disable=protected-access
 
         # Add the node to the graph if graph is specified
-        if self._graph is not None:
-            self._graph.append(self)
+        if graph is not None:
+            graph.append(self)
 
     def _create_outputs(
         self, num_outputs: int | None, outputs: Sequence[Value] | None
@@ -1288,6 +1726,8 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
 
     @name.setter
     def name(self, value: str | None) -> None:
+        if self._graph is not None and self._graph._name_index is not None:  # pylint: disable=protected-access
+            self._graph._name_index.rename_node(self, self._name, value)  # pylint: disable=protected-access
         self._name = value
 
     @property
@@ -1296,7 +1736,9 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
 
     @domain.setter
     def domain(self, value: str) -> None:
+        old_identifier = self.op_identifier()
         self._domain = value
+        self._update_op_type_index(old_identifier)
 
     @property
     def version(self) -> int | None:
@@ -1312,7 +1754,9 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
 
     @op_type.setter
     def op_type(self, value: str) -> None:
+        old_identifier = self.op_identifier()
         self._op_type = value
+        self._update_op_type_index(old_identifier)
 
     @property
     def overload(self) -> str:
@@ -1320,7 +1764,15 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
 
     @overload.setter
     def overload(self, value: str) -> None:
+        old_identifier = self.op_identifier()
         self._overload = value
+        self._update_op_type_index(old_identifier)
+
+    def _update_op_type_index(self, old_identifier: _protocols.OperatorIdentifier) -> None:
+        if self._graph is not None and self._graph._op_type_index is not None:  # pylint: disable=protected-access
+            self._graph._op_type_index.change_op_identifier(  # pylint: disable=protected-access
+                self, old_identifier, self.op_identifier()
+            )
 
     @property
     def inputs(self) -> Sequence[Value | None]:
@@ -1347,7 +1799,7 @@ class Node(_protocols.NodeProtocol, _display.PrettyPrintable):
         successors: dict[Node, None] = {}
         for value in self.outputs:
             assert value is not None, "Bug: Output values are not expected to be None"
-            for usage in value.uses():
+            for usage in value.iter_uses():
                 successors[usage.node] = None
         return tuple(successors)
 
@@ -1489,6 +1941,8 @@ class _TensorTypeBase(_protocols.TypeProtocol, _display.PrettyPrintable, Hashabl
 class TensorType(_TensorTypeBase):
     """A type that represents a tensor."""
 
+    __slots__ = ()
+
     def __str__(self) -> str:
         return f"{self.dtype}"
 
@@ -1496,6 +1950,8 @@ class TensorType(_TensorTypeBase):
 class SparseTensorType(_TensorTypeBase):
     """A type that represents a sparse tensor."""
 
+    __slots__ = ()
+
 
 class _RecursiveTypeBase(_protocols.TypeProtocol, _display.PrettyPrintable, Hashable):
     """Base for recursive types like Optional and Sequence."""
@@ -1540,10 +1996,14 @@ class _RecursiveTypeBase(_protocols.TypeProtocol, _display.PrettyPrintable, Hash
 class SequenceType(_RecursiveTypeBase):
     """A type that represents a sequence of elements."""
 
+    __slots__ = ()
+
 
 class OptionalType(_RecursiveTypeBase):
     """A type that represents an optional element."""
 
+    __slots__ = ()
+
 
 class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
     """IR Value.
@@ -1574,14 +2034,17 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
 
     __slots__ = (
         "_const_value",
+        "_const_value_shared",
         "_index",
         "_metadata",
         "_metadata_props",
         "_name",
+        "_pending_uses",
         "_producer",
         "_shape",
         "_type",
         "_uses",
+        "_uses_shared",
         "doc_string",
     )
 
@@ -1619,10 +2082,20 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
         # TODO(justinchuby): Handle initialization when a const value is provided
         # We can get shape and type information from the const value
         self._const_value = const_value
+        # Whether the const value is shared with the value this value is a clone of.
+        # Renaming the value then does not rename the tensor.
+        self._const_value_shared = False
         # Use a collection of (Node, int) to store uses. This is needed
         # because a single use can use the same value multiple times.
-        # Use a dictionary to preserve insertion order so that the visiting order is deterministic
-        self._uses: dict[Usage, None] = {}
+        # Use a dictionary to preserve insertion order so that the visiting order is deterministic.
+        # It is allocated on the first use because many values (e.g. graph outputs) have none.
+        self._uses: dict[Usage, None] | None = None
+        # Whether self._uses may be iterated over by an iterator from iter_uses().
+        # It is then copied before it is modified.
+        self._uses_shared = False
+        # Callbacks that register more uses, like the deserialization of a lazily
+        # loaded subgraph that refers to this value. They run before the uses are read.
+        self._pending_uses: list[Callable[[], object]] | None = None
         self.doc_string = doc_string
 
     def __repr__(self) -> str:
@@ -1655,6 +2128,12 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
 
     def consumers(self) -> Sequence[Node]:
         """Return the nodes (deduplicated) that consume this value."""
+        if self._pending_uses is not None:
+            self._resolve_pending_uses()
+        if not self._uses:
+            return ()
+        if len(self._uses) == 1:
+            return (next(iter(self._uses)).node,)
         return tuple({usage.node: None for usage in self._uses})
 
     def index(self) -> int | None:
@@ -1671,21 +2150,83 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
         # be affected when the usage changes during graph mutation.
         # This adds a small overhead but is better a user experience than
         # having users call tuple().
+        if self._pending_uses is not None:
+            self._resolve_pending_uses()
+        if not self._uses:
+            return ()
         return tuple(self._uses)
 
+    def iter_uses(self) -> Iterator[Usage]:
+        """Iterate over the uses of the value without copying them.
+
+        The iteration is not affected when the uses change during graph mutation.
+        It yields the uses as they were when the iteration started. The uses are
+        copied only when they are first modified after this call.
+
+        Prefer this over :meth:`uses` in loops that may stop early, and
+        :meth:`num_uses` or :meth:`has_uses` when only the number of uses is needed.
+        """
+        if self._pending_uses is not None:
+            self._resolve_pending_uses()
+        if not self._uses:
+            return iter(())
+        self._uses_shared = True
+        return iter(self._uses)
+
+    def num_uses(self) -> int:
+        """Return the number of uses of the value in O(1) time."""
+        if self._pending_uses is not None:
+            self._resolve_pending_uses()
+        if self._uses is None:
+            return 0
+        return len(self._uses)
+
+    def has_uses(self) -> bool:
+        """Return whether the value is used by any node in O(1) time."""
+        if self._pending_uses is not None:
+            self._resolve_pending_uses()
+        return bool(self._uses)
+
+    def _add_pending_uses(self, resolve: Callable[[], object]) -> None:
+        """Register a callback that adds uses of this value when the uses are read.
+
+        This is an internal method used by the lazy deserialization of subgraphs.
+        """
+        if self._pending_uses is None:
+            self._pending_uses = []
+        self._pending_uses.append(resolve)
+
+    def _resolve_pending_uses(self) -> None:
+        pending_uses = self._pending_uses
+        self._pending_uses = None
+        for resolve in pending_uses or ():
+            resolve()
+
+    def _prepare_uses_for_modification(self) -> dict[Usage, None]:
+        if self._uses is None:
+            self._uses = {}
+        elif self._uses_shared:
+            # Leave the dictionary that may be iterated over untouched
+            self._uses = dict(self._uses)
+            self._uses_shared = False
+        return self._uses
+
     def _add_usage(self, use: Node, index: int) -> None:
         """Add a usage of this value.
 
         This is an internal method. It should only be called by the Node class.
         """
-        self._uses[Usage(use, index)] = None
+        self._prepare_uses_for_modification()[Usage(use, index)] = None
 
     def _remove_usage(self, use: Node, index: int) -> None:
         """Remove a node from the uses of this value.
 
         This is an internal method. It should only be called by the Node class.
         """
-        self._uses.pop(Usage(use, index))
+        usage = Usage(use, index)
+        if self._uses is None:
+            raise KeyError(usage)
+        self._prepare_uses_for_modification().pop(usage)
 
     @property
     def name(self) -> str | None:
@@ -1693,8 +2234,14 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
 
     @name.setter
     def name(self, value: str | None) -> None:
-        if self._const_value is not None:
+        if self._const_value is not None and not self._const_value_shared:
             self._const_value.name = value
+        if (
+            self._producer is not None
+            and (graph := self._producer.graph) is not None
+            and graph._name_index is not None  # pylint: disable=protected-access
+        ):
+            graph._name_index.rename_value(self, self._name, value)  # pylint: disable=protected-access
         self._name = value
 
     @property
@@ -1767,6 +2314,7 @@ class Value(_protocols.ValueProtocol, _display.PrettyPrintable):
                     f"Expected value to be a TensorProtocol or None, got '{type(value)}'"
                 )
         self._const_value = value
+        self._const_value_shared = False
 
     @property
     def meta(self) -> _metadata.MetadataStore:
@@ -1848,6 +2396,146 @@ def _check_node_safe_to_remove(
             )
 
 
+class _NameIndex:
+    """Index of the nodes and the node outputs of a graph by name.
+
+    The index is created by the graph on the first lookup by name and is kept up to
+    date when nodes are added or removed and when nodes or values are renamed.
+    Multiple objects can have the same name. They are stored in the order they were
+    indexed, which is not necessarily the order in the graph.
+
+    Graph inputs and initializers are not indexed because they can be modified through
+    the lists and dictionaries returned by the graph without notifying it.
+
+    Attributes:
+        nodes: Node name -> nodes with the name.
+        values: Value name -> node outputs with the name.
+    """
+
+    __slots__ = ("nodes", "values")
+
+    def __init__(self, nodes: Iterable[Node]) -> None:
+        self.nodes: dict[str, list[Node]] = {}
+        self.values: dict[str, list[Value]] = {}
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: Node) -> None:
+        if node.name:
+            self.nodes.setdefault(node.name, []).append(node)
+        for value in node._outputs:  # pylint: disable=protected-access
+            if value.name:
+                self.values.setdefault(value.name, []).append(value)
+
+    def remove_node(self, node: Node) -> None:
+        if node.name:
+            _remove_from_index(self.nodes, node.name, node)
+        for value in node._outputs:  # pylint: disable=protected-access
+            if value.name:
+                _remove_from_index(self.values, value.name, value)
+
+    def rename_node(self, node: Node, old_name: str | None, new_name: str | None) -> None:
+        if old_name:
+            _remove_from_index(self.nodes, old_name, node)
+        if new_name:
+            self.nodes.setdefault(new_name, []).append(node)
+
+    def rename_value(self, value: Value, old_name: str | None, new_name: str | None) -> None:
+        if old_name:
+            _remove_from_index(self.values, old_name, value)
+        if new_name:
+            self.values.setdefault(new_name, []).append(value)
+
+
+class _OpTypeIndex:
+    """Index of the nodes of a graph by operator identifier.
+
+    The index is created by the graph on the first lookup by operator and is kept up
+    to date when nodes are added, removed or moved and when the domain, op_type or
+    overload of a node changes.
+
+    The nodes of an operator are sorted in graph order on lookup when nodes of the
+    operator were added or moved since the last lookup.
+
+    Attributes:
+        nodes: (domain, op_type, overload) -> nodes of the operator. The dictionaries
+            are used as ordered sets.
+        unsorted: The operators whose nodes may not be in graph order.
+    """
+
+    __slots__ = ("nodes", "unsorted")
+
+    def __init__(self, nodes: Iterable[Node]) -> None:
+        self.nodes: dict[_protocols.OperatorIdentifier, dict[Node, None]] = {}
+        self.unsorted: set[_protocols.OperatorIdentifier] = set()
+        for node in nodes:
+            self.nodes.setdefault(node.op_identifier(), {})[node] = None
+
+    def get_all_overloads(
+        self, domain: str, op_type: str, sort_key: Callable[[Node], int]
+    ) -> list[Node]:
+        identifiers = [
+            identifier
+            for identifier in self.nodes
+            if identifier[0] == domain and identifier[1] == op_type
+        ]
+        if len(identifiers) == 1:
+            return self.get(identifiers[0], sort_key)
+        return sorted(
+            (node for identifier in identifiers for node in self.nodes[identifier]),
+            key=sort_key,
+        )
+
+    def get(
+        self, identifier: _protocols.OperatorIdentifier, sort_key: Callable[[Node], int]
+    ) -> list[Node]:
+        nodes = self.nodes.get(identifier)
+        if nodes is None:
+            return []
+        if identifier in self.unsorted:
+            self.unsorted.discard(identifier)
+            self.nodes[identifier] = nodes = dict.fromkeys(sorted(nodes, key=sort_key))
+        return list(nodes)
+
+    def add_node(self, node: Node) -> None:
+        identifier = node.op_identifier()
+        self.nodes.setdefault(identifier, {})[node] = None
+        self.unsorted.add(identifier)
+
+    def move_node(self, node: Node) -> None:
+        self.unsorted.add(node.op_identifier())
+
+    def remove_node(self, node: Node) -> None:
+        self._remove(node, node.op_identifier())
+
+    def change_op_identifier(
+        self,
+        node: Node,
+        old_identifier: _protocols.OperatorIdentifier,
+        new_identifier: _protocols.OperatorIdentifier,
+    ) -> None:
+        if old_identifier == new_identifier:
+            return
+        self._remove(node, old_identifier)
+        self.add_node(node)
+
+    def _remove(self, node: Node, identifier: _protocols.OperatorIdentifier) -> None:
+        nodes = self.nodes[identifier]
+        del nodes[node]
+        if not nodes:
+            del self.nodes[identifier]
+
+
+def _remove_from_index(index: dict[str, list[Any]], name: str, obj: object) -> None:
+    objects = index[name]
+    for i, existing in enumerate(objects):
+        if existing is obj:
+            del objects[i]
+            break
+    if not objects:
+        del index[name]
+
+
 class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
     """IR Graph.
 
@@ -1882,7 +2570,9 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
         "_metadata",
         "_metadata_props",
         "_name_authority",
+        "_name_index",
         "_nodes",
+        "_op_type_index",
         "_opset_imports",
         "_outputs",
         "name",
@@ -1924,6 +2614,10 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
         # Be sure the initialize the name authority before extending the nodes
         # because it is used to name the nodes and their outputs
         self._name_authority = _name_authority.NameAuthority()
+        # Created on the first lookup by name
+        self._name_index: _NameIndex | None = None
+        # Created on the first lookup by operator
+        self._op_type_index: _OpTypeIndex | None = None
         # Call self.extend not self._nodes.extend so the graph reference is added to the nodes
         self.extend(nodes)
 
@@ -2009,20 +2703,43 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
         self._name_authority.register_or_name_node(node)
         for value in node._outputs:  # pylint: disable=protected-access
             self._name_authority.register_or_name_value(value)
+        if node.graph is not self:
+            # The node is new to the graph. Nodes that are moved within the graph are
+            # already indexed.
+            if self._name_index is not None:
+                self._name_index.add_node(node)
+            if self._op_type_index is not None:
+                self._op_type_index.add_node(node)
+        elif self._op_type_index is not None:
+            self._op_type_index.move_node(node)
         node.graph = self
         return node
 
+    def _get_name_index(self) -> _NameIndex:
+        if self._name_index is None:
+            self._name_index = _NameIndex(self._nodes)
+        return self._name_index
+
+    def _get_op_type_index(self) -> _OpTypeIndex:
+        if self._op_type_index is None:
+            self._op_type_index = _OpTypeIndex(self._nodes)
+        return self._op_type_index
+
     def node(self, index_or_name: int | str, /) -> Node:
         """Get a node by index or name.
 
-        This is an O(n) operation. Getting nodes on the ends of the graph (0 or -1) is O(1).
+        Getting a node by index is an O(n) operation. Getting nodes on the ends of the
+        graph (0 or -1) is O(1).
+
+        Getting a node by name is O(1). The first lookup by name builds an index of the
+        names in O(n) time. The index is then kept up to date when the graph is modified.
 
         .. note::
-            If you need repeated random access, consider turning it into a list with ``list(graph)`` .
-            Or a dictionary for repeated access by name: ``{node.name for node in graph}`` .
+            If you need repeated random access by index, consider turning it into a list with ``list(graph)`` .
 
         When a name is provided and if there are multiple nodes with the same name,
-        the first node with the name is returned.
+        the first node with the name is returned. Use :meth:`duplicate_node_names`
+        to find such names.
 
         Args:
             index_or_name: The index or name of the node.
@@ -2037,10 +2754,114 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
         # NOTE: This is a method specific to Graph, not required by the protocol unless proven
         if isinstance(index_or_name, int):
             return self[index_or_name]
-        for node in self:
-            if node.name == index_or_name:
-                return node
-        raise ValueError(f"Node with name '{index_or_name}' not found.")
+        nodes = self._get_name_index().nodes.get(index_or_name)
+        if not nodes:
+            raise ValueError(f"Node with name '{index_or_name}' not found.")
+        if len(nodes) == 1:
+            return nodes[0]
+        # Return the first node in the graph order when the name is duplicated
+        return min(nodes, key=self._nodes.label)
+
+    def value(self, name: str, /) -> Value:
+        """Get a graph input, an initializer or a node output by name.
+
+        Initializers and node outputs are looked up in O(1) time. Graph inputs are
+        scanned linearly because the list returned by :attr:`inputs` can be modified
+        without notifying the graph, so the lookup is O(number of graph inputs).
+
+        Graph inputs take precedence over initializers, which take precedence over
+        node outputs. When multiple node outputs have the same name, any of them may be
+        returned. Use :meth:`duplicate_value_names` to find such names.
+
+        Values in subgraphs are not included.
+
+        Args:
+            name: The name of the value.
+
+        Returns:
+            The value if found.
+
+        Raises:
+            ValueError: If the value with the given name is not found.
+        """
+        # NOTE: This is a method specific to Graph, not required by the protocol unless proven
+        for input_ in self._inputs:
+            if input_.name == name:
+                return input_
+        if (initializer := self._initializers.get(name)) is not None:
+            return initializer
+        values = self._get_name_index().values.get(name)
+        if not values:
+            raise ValueError(f"Value with name '{name}' not found.")
+        return values[0]
+
+    def is_before(self, node: Node, other: Node, /) -> bool:
+        """Return whether the node comes before the other node in the graph in O(1) time.
+
+        The graph keeps order labels of its nodes up to date when nodes are inserted, so
+        the positions of nodes can be compared without scanning the graph. For example,
+        a pass can use it to find an insertion point after all nodes it depends on.
+
+        Raises:
+            ValueError: If any of the nodes does not belong to this graph.
+        """
+        # NOTE: This is a method specific to Graph, not required by the protocol unless proven
+        return self._nodes.is_before(node, other)
+
+    def snapshot(self) -> analysis.GraphSnapshot:
+        """Create a frozen snapshot of the graph for analyses in O(#nodes + #values) time.
+
+        The snapshot numbers the nodes and values with dense integer IDs and stores
+        the use-def relations in NumPy arrays. See :class:`onnxscript.ir.analysis.GraphSnapshot`.
+        """
+        # NOTE: This is a method specific to Graph, not required by the protocol unless proven
+        return onnxscript.ir.analysis.GraphSnapshot(self)
+
+    def nodes_by_op(
+        self, domain: str, op_type: str, overload: str | None = "", /
+    ) -> list[Node]:
+        """Get the nodes of an operator in graph order.
+
+        The first lookup builds an index of the nodes by operator in O(n) time. The
+        index is then kept up to date when the graph is modified, so later lookups take
+        time proportional to the number of nodes returned, plus the time to sort them
+        when nodes of the operator were inserted or moved since the last lookup.
+
+        Nodes in subgraphs are not included.
+
+        Args:
+            domain: The domain of the operator. The default domain is ``""``.
+            op_type: The type of the operator.
+            overload: The overload of the operator. ``None`` to get the nodes of all
+                overloads of the operator.
+
+        Returns:
+            A new list of the nodes of the operator. The graph can be modified while
+            iterating over it.
+        """
+        # NOTE: This is a method specific to Graph, not required by the protocol unless proven
+        index = self._get_op_type_index()
+        if overload is None:
+            return index.get_all_overloads(domain, op_type, self._nodes.label)
+        return index.get((domain, op_type, overload), self._nodes.label)
+
+    def duplicate_node_names(self) -> list[str]:
+        """Return the names shared by more than one node in the graph."""
+        return [name for name, nodes in self._get_name_index().nodes.items() if len(nodes) > 1]
+
+    def duplicate_value_names(self) -> list[str]:
+        """Return the names shared by more than one value in the graph.
+
+        Graph inputs, initializers and node outputs are considered. A value that is both
+        a graph input and an initializer counts once.
+        """
+        ids_by_name: dict[str, set[int]] = {}
+        for value in itertools.chain(self._inputs, self._initializers.values()):
+            if value.name:
+                ids_by_name.setdefault(value.name, set()).add(id(value))
+        for name, values in self._get_name_index().values.items():
+            ids_by_name.setdefault(name, set()).update(id(value) for value in values)
+        return [name for name, ids in ids_by_name.items() if len(ids) > 1]
 
     def num_nodes(self) -> int:
         """Get the number of nodes in the graph in O(1) time.
@@ -2122,6 +2943,10 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
             # Set attributes to remove the node from this graph
             node.graph = None
             self._nodes.remove(node)
+            if self._name_index is not None:
+                self._name_index.remove_node(node)
+            if self._op_type_index is not None:
+                self._op_type_index.remove_node(node)
 
     def insert_after(self, node: Node, new_nodes: Iterable[Node] | Node, /) -> None:
         """Insert new nodes after the given node in O(#new_nodes) time.
@@ -2258,6 +3083,25 @@ class Graph(_protocols.GraphProtocol, Sequence[Node], _display.PrettyPrintable):
 
     # End of mutation methods
 
+    def clone(self) -> Graph:
+        """Create a copy of this graph and all subgraphs in O(#nodes + #values) time.
+
+        The nodes and values of the copy are new objects, so the copy can be modified
+        without affecting this graph. Data that is not expected to be modified in place
+        is shared with this graph: the tensors of initializers and constant values, and
+        the attributes that do not contain graphs. Replace an attribute or a tensor
+        instead of modifying it to keep the two graphs independent. Renaming a value
+        of the copy does not rename its shared tensor, while renaming a value of this
+        graph still does.
+
+        Values captured by this graph from an outer scope are not copied. The
+        :attr:`meta` store is not copied.
+
+        Returns:
+            The copy of this graph.
+        """
+        return _Cloner().clone_graph(self)
+
     @property
     def meta(self) -> _metadata.MetadataStore:
         """The metadata store for intermediate analysis.
@@ -2341,6 +3185,105 @@ def _graph_repr(graph: Graph | GraphView) -> str:
 )"""
 
 
+class _Cloner:
+    """Clone graphs while sharing the data that passes do not modify in place.
+
+    Nodes, values and graphs are copied. Tensors and attributes that do not contain
+    graphs are shared with the original. Shapes and types are copied because they
+    are commonly modified in place through the values.
+
+    Values that are not defined in the cloned graphs, like values captured by a
+    subgraph from an outer scope that is not cloned, are not copied.
+    """
+
+    __slots__ = ("_value_map",)
+
+    def __init__(self) -> None:
+        self._value_map: dict[Value, Value] = {}
+
+    def clone_value(self, value: Value) -> Value:
+        if (new_value := self._value_map.get(value)) is not None:
+            return new_value
+        new_value = Value(
+            name=value.name,
+            shape=value.shape.copy() if value.shape is not None else None,
+            type=_clone_type(value.type),
+            doc_string=value.doc_string,
+            const_value=value.const_value,
+        )
+        if value.const_value is not None:
+            # Renaming the copy must not rename the tensor used by the original value
+            new_value._const_value_shared = True  # pylint: disable=protected-access
+        if value._metadata_props:  # pylint: disable=protected-access
+            new_value.metadata_props.update(value._metadata_props)  # pylint: disable=protected-access
+        self._value_map[value] = new_value
+        return new_value
+
+    def clone_attr(self, attr: Attr | RefAttr) -> Attr | RefAttr:
+        if isinstance(attr, Attr):
+            if attr.type == _enums.AttributeType.GRAPH:
+                return Attr(
+                    attr.name,
+                    attr.type,
+                    self.clone_graph(attr.value),
+                    doc_string=attr.doc_string,
+                )
+            if attr.type == _enums.AttributeType.GRAPHS:
+                return Attr(
+                    attr.name,
+                    attr.type,
+                    [self.clone_graph(graph) for graph in attr.value],
+                    doc_string=attr.doc_string,
+                )
+        return attr
+
+    def clone_node(self, node: Node) -> Node:
+        new_node = Node(
+            node.domain,
+            node.op_type,
+            [
+                None if input is None else self._value_map.get(input, input)
+                for input in node.inputs
+            ],
+            [self.clone_attr(attr) for attr in node.attributes.values()],
+            overload=node.overload,
+            # The outputs are created before the nodes so that they can be used by
+            # nodes that appear earlier in an unsorted graph
+            outputs=[self._value_map[output] for output in node.outputs],
+            version=node.version,
+            name=node.name,
+            doc_string=node.doc_string,
+            metadata_props=dict(node._metadata_props) if node._metadata_props else None,  # pylint: disable=protected-access
+        )
+        return new_node
+
+    def clone_graph(self, graph: Graph) -> Graph:
+        inputs = [self.clone_value(input) for input in graph.inputs]
+        initializers = [self.clone_value(value) for value in graph.initializers.values()]
+        for node in graph:
+            for output in node.outputs:
+                self.clone_value(output)
+        nodes = [self.clone_node(node) for node in graph]
+        return Graph(
+            inputs,
+            [self._value_map.get(output, output) for output in graph.outputs],
+            nodes=nodes,
+            initializers=initializers,
+            doc_string=graph.doc_string,
+            opset_imports=dict(graph.opset_imports),
+            name=graph.name,
+            metadata_props=dict(graph._metadata_props) if graph._metadata_props else None,  # pylint: disable=protected-access
+        )
+
+
+def _clone_type(type: _protocols.TypeProtocol | None) -> _protocols.TypeProtocol | None:
+    if isinstance(type, _TensorTypeBase):
+        return type.__class__(type.dtype, denotation=type.denotation)
+    if isinstance(type, _RecursiveTypeBase):
+        return type.__class__(_clone_type(type.elem_type), denotation=type.denotation)  # type: ignore[arg-type]
+    return type
+
+
 class GraphView(Sequence[Node], _display.PrettyPrintable):
     """A read-only view on a graph.
 
@@ -2377,11 +3320,11 @@ class GraphView(Sequence[Node], _display.PrettyPrintable):
     __slots__ = (
         "_metadata",
         "_metadata_props",
+        "_nodes",
         "doc_string",
         "initializers",
         "inputs",
         "name",
-        "nodes",
         "opset_imports",
         "outputs",
     )
@@ -2525,6 +3468,28 @@ class Model(_protocols.ModelProtocol, _display.PrettyPrintable):
             self._metadata_props = {}
         return self._metadata_props
 
+    def clone(self) -> Model:
+        """Create a copy of this model in O(#nodes + #values) time.
+
+        The main graph and the functions are copied with :meth:`Graph.clone`. See it
+        for what is shared with the copy. Optimizers can modify the copy and discard it
+        without affecting this model.
+
+        Returns:
+            The copy of this model.
+        """
+        return Model(
+            self.graph.clone(),
+            ir_version=self.ir_version,
+            producer_name=self.producer_name,
+            producer_version=self.producer_version,
+            domain=self.domain,
+            model_version=self.model_version,
+            doc_string=self.doc_string,
+            functions=[function.clone() for function in self._functions.values()],
+            meta_data_props=dict(self._metadata_props) if self._metadata_props else None,
+        )
+
     def __str__(self) -> str:
         # TODO(justinchuby): Show docstrings and metadata
         signature = f"""\
@@ -2658,6 +3623,26 @@ class Function(_protocols.FunctionProtocol, Sequence[Node], _display.PrettyPrint
     def __reversed__(self) -> Iterator[Node]:
         return self._graph.__reversed__()
 
+    def nodes_by_op(
+        self, domain: str, op_type: str, overload: str | None = "", /
+    ) -> list[Node]:
+        """Get the nodes of an operator in the order of the function.
+
+        See :meth:`Graph.nodes_by_op` for details.
+        """
+        return self._graph.nodes_by_op(domain, op_type, overload)
+
+    def is_before(self, node: Node, other: Node, /) -> bool:
+        """Return whether the node comes before the other node in the function in O(1) time."""
+        return self._graph.is_before(node, other)
+
+    def snapshot(self) -> analysis.GraphSnapshot:
+        """Create a frozen snapshot of the function for analyses.
+
+        See :meth:`Graph.snapshot` for details.
+        """
+        return onnxscript.ir.analysis.GraphSnapshot(self)
+
     @property
     def doc_string(self) -> str | None:
         return self._graph.doc_string
@@ -2732,6 +3717,20 @@ class Function(_protocols.FunctionProtocol, Sequence[Node], _display.PrettyPrint
 
     # End of mutation methods
 
+    def clone(self) -> Function:
+        """Create a copy of this function in O(#nodes + #values) time.
+
+        See :meth:`Graph.clone` for what is shared with the copy.
+        """
+        return Function(
+            self._domain,
+            self._name,
+            self._overload,
+            graph=self._graph.clone(),
+            attributes=list(self._attributes.values()),
+            metadata_props=dict(self._metadata_props) if self._metadata_props else None,
+        )
+
     def __str__(self) -> str:
         full_name = f"{self.domain}::{self.name}" + f":{self.overload}" * (self.overload != "")
         inputs_text = ",\n".join(str(x) for x in self.inputs)
@@ -3,20 +3,24 @@
 from __future__ import annotations
 
 import copy
+import gc
+import os
 import pathlib
 import tempfile
 import unittest
+import weakref
 from typing import Any
 
 import ml_dtypes
 import numpy as np
 import onnx
 import onnx.external_data_helper
+import onnx.parser
 import parameterized
 import torch
 
 from onnxscript import ir
-from onnxscript.ir import _core
+from onnxscript.ir import _core, _mmap_cache
 
 
 class TensorTest(unittest.TestCase):
@@ -182,6 +186,76 @@ class TensorTest(unittest.TestCase):
         tensor.metadata_props["test"] = "any string"
         self.assertEqual(tensor.metadata_props["test"], "any string")
 
+    def test_from_buffer_is_a_view_of_the_buffer(self):
+        array = np.arange(6, dtype=np.float32)
+        tensor = _core.Tensor.from_buffer(
+            memoryview(array), ir.DataType.FLOAT, [2, 3], name="test"
+        )
+        self.assertEqual(tensor.name, "test")
+        self.assertEqual(tensor.dtype, ir.DataType.FLOAT)
+        self.assertEqual(tensor.shape, _core.Shape([2, 3]))
+        self.assertTrue(np.shares_memory(tensor.numpy(), array))
+        np.testing.assert_array_equal(tensor.numpy(), array.reshape(2, 3))
+
+    @parameterized.parameterized.expand(
+        [
+            ("bfloat16", ir.DataType.BFLOAT16, ml_dtypes.bfloat16),
+            ("float8e4m3fn", ir.DataType.FLOAT8E4M3FN, ml_dtypes.float8_e4m3fn),
+            ("int4", ir.DataType.INT4, ml_dtypes.int4),
+            ("uint4", ir.DataType.UINT4, ml_dtypes.uint4),
+            ("float4e2m1", ir.DataType.FLOAT4E2M1, ml_dtypes.float4_e2m1fn),
+        ]
+    )
+    def test_from_buffer_reads_the_raw_data_layout(self, _: str, dtype, np_dtype):
+        array = np.array([[0, 1, -2], [1, 0, 2]], dtype=np_dtype)
+        raw_data = _core.Tensor(array, dtype=dtype).tobytes()
+        tensor = _core.Tensor.from_buffer(raw_data, dtype, _core.Shape([2, 3]))
+        np.testing.assert_array_equal(tensor.numpy(), array)
+        self.assertEqual(tensor.tobytes(), raw_data)
+
+    def test_from_buffer_raises_when_the_buffer_size_does_not_match(self):
+        with self.assertRaisesRegex(ValueError, "bytes"):
+            _core.Tensor.from_buffer(b"\x00" * 3, ir.DataType.INT16, [2])
+        with self.assertRaisesRegex(ValueError, "bytes"):
+            _core.Tensor.from_buffer(b"\x00", ir.DataType.INT4, [3])
+
+    def test_from_buffer_raises_for_symbolic_shapes_and_strings(self):
+        with self.assertRaisesRegex(ValueError, "symbolic"):
+            _core.Tensor.from_buffer(b"", ir.DataType.FLOAT, ["N"])
+        with self.assertRaises(TypeError):
+            _core.Tensor.from_buffer(b"", ir.DataType.STRING, [0])
+
+    @parameterized.parameterized.expand(
+        [
+            ("int16", ir.DataType.INT16, np.int16),
+            ("int4", ir.DataType.INT4, ml_dtypes.int4),
+        ]
+    )
+    def test_from_buffers(self, _: str, dtype, np_dtype):
+        arrays = [
+            np.array([1, -2, 3], dtype=np_dtype),
+            np.array([[4]], dtype=np_dtype),
+            np.array([], dtype=np_dtype),
+            np.array([-5, 6], dtype=np_dtype),
+        ]
+        buffers = [_core.Tensor(array, dtype=dtype).tobytes() for array in arrays]
+        tensors = _core.Tensor.from_buffers(
+            buffers,
+            dtype,
+            [array.shape for array in arrays],
+            names=["a", "b", "c", "d"],
+        )
+        self.assertEqual([tensor.name for tensor in tensors], ["a", "b", "c", "d"])
+        for tensor, array in zip(tensors, arrays):
+            self.assertEqual(tensor.dtype, dtype)
+            np.testing.assert_array_equal(tensor.numpy(), array)
+
+    def test_from_buffers_raises_when_a_buffer_size_does_not_match(self):
+        with self.assertRaisesRegex(ValueError, "bytes"):
+            _core.Tensor.from_buffers([b"\x00", b"\x00"], ir.DataType.INT4, [[2], [3]])
+        with self.assertRaisesRegex(ValueError, "numbers"):
+            _core.Tensor.from_buffers([b"\x00"], ir.DataType.INT4, [[2], [3]])
+
 
 def _to_external_tensor(tensor_proto, dir: str, filename: str):
     onnx.external_data_helper.set_external_data(tensor_proto, location=filename)
@@ -279,6 +353,50 @@ class ExternalTensorTest(unittest.TestCase):
         # Tensor can be re-loaded after release
         self.assertEqual(tensor.tobytes(), self.data.tobytes())
 
+    def test_mapping_is_released_when_the_model_is_garbage_collected(self):
+        model = ir.serde.deserialize_model(self.model)
+        ir.external_data.set_base_dir(model.graph, self.base_path)
+        for value in model.graph.initializers.values():
+            value.const_value.numpy()
+        mapping = model.graph.initializers["input"].const_value.raw
+        self.assertIsNotNone(mapping)
+        del model, value
+        gc.collect()
+        # The mapping is closed when it is evicted only if no tensor holds it
+        _mmap_cache.MAPPED_FILES.evict(os.path.join(self.base_path, self.external_data_name))
+        self.assertTrue(mapping.closed)
+
+    def test_release_and_garbage_collection_release_the_mapping_once(self):
+        external_tensor = self.model.graph.initializer[0]
+        external_info = onnx.external_data_helper.ExternalDataInfo(external_tensor)
+        tensors = [
+            _core.ExternalTensor(
+                external_info.location,
+                offset=external_info.offset,
+                length=external_info.length,
+                dtype=ir.DataType.FLOAT,
+                base_dir=self.base_path,
+                name="input",
+                shape=_core.Shape(external_tensor.dims),
+            )
+            for _ in range(2)
+        ]
+        for tensor in tensors:
+            tensor.numpy()
+        mapping = weakref.ref(tensors[0].raw)
+        tensors[0].release()
+        tensors[0].release()
+        del tensors[0]
+        gc.collect()
+        # The other tensor still holds the mapping
+        _mmap_cache.MAPPED_FILES.evict(os.path.join(self.base_path, self.external_data_name))
+        self.assertFalse(mapping().closed)
+        np.testing.assert_equal(tensors[0], self.data)
+        del tensors, tensor
+        gc.collect()
+        # The cache no longer refers to the mapping, so it is unmapped
+        self.assertIsNone(mapping())
+
     def test_initialize_with_relative_path(self):
         external_tensor = self.model.graph.initializer[0]
         external_info = onnx.external_data_helper.ExternalDataInfo(external_tensor)
@@ -510,6 +628,76 @@ class SymbolicDimTest(unittest.TestCase):
         self.assertIn(dim, {dim})
         self.assertIn(dim, {value})
 
+    @parameterized.parameterized.expand(
+        [
+            ("add_int", lambda n, m: n + 1, "N + 1"),
+            ("radd_int", lambda n, m: 1 + n, "N + 1"),
+            ("sub_int", lambda n, m: n - 2, "N - 2"),
+            ("rsub_int", lambda n, m: 2 - n, "-N + 2"),
+            ("neg", lambda n, m: -n, "-N"),
+            ("mul_int", lambda n, m: n * 4, "4*N"),
+            ("rmul_int", lambda n, m: 4 * n, "4*N"),
+            ("add_dims", lambda n, m: m + n, "M + N"),
+            ("mul_dims", lambda n, m: n * m * 2, "2*M*N"),
+            ("distribute", lambda n, m: (n + 1) * (m - 1), "M*N + M - N - 1"),
+            ("floordiv_exact", lambda n, m: (n * 4 + 8) // 4, "N + 2"),
+            ("floordiv_dim", lambda n, m: (n * m * 6) // (m * 3), "2*N"),
+            ("floordiv_inexact", lambda n, m: (n + 1) // 2, "(N + 1)//2"),
+            ("floordiv_atom", lambda n, m: (n // m) * 2, "2*(N//M)"),
+        ]
+    )
+    def test_arithmetic_creates_canonical_expressions(self, _: str, op, expected: str):
+        result = op(_core.SymbolicDim("N"), _core.SymbolicDim("M"))
+        self.assertIsInstance(result, _core.SymbolicDim)
+        self.assertEqual(result.value, expected)
+
+    def test_equivalent_expressions_are_equal(self):
+        n = _core.SymbolicDim("N")
+        m = _core.SymbolicDim("M")
+        self.assertEqual(n * m + n, n * (m + 1))
+        self.assertEqual(hash(n * m + n), hash(n * (m + 1)))
+        self.assertEqual((n * 2 + 2) // 2, n + 1)
+
+    def test_arithmetic_simplifies_to_int_or_name(self):
+        n = _core.SymbolicDim("N")
+        self.assertEqual(n * 4 - 4 * n, 0)
+        self.assertIsInstance(n * 4 - 4 * n, int)
+        self.assertEqual(n * 0, 0)
+        self.assertIs(type(n + 1 - 1), _core.SymbolicDim)
+        self.assertEqual((n + 1 - 1).value, "N")
+
+    def test_arithmetic_with_unknown_dim_is_unknown(self):
+        unknown = _core.SymbolicDim(None)
+        self.assertIsNone((unknown + 1).value)
+        self.assertIsNone((_core.SymbolicDim("N") * unknown).value)
+
+    def test_names_are_not_parsed(self):
+        dim = _core.SymbolicDim("2*N")
+        self.assertEqual(dim.value, "2*N")
+        self.assertEqual((dim * 2).value, "2*(2*N)")
+
+    def test_names_are_not_equal_to_expressions_with_the_same_text(self):
+        n = _core.SymbolicDim("N")
+        name = _core.SymbolicDim("4*N + 1")
+        expression = n * 4 + 1
+        self.assertEqual(name.value, expression.value)
+        self.assertNotEqual(name, expression)
+        self.assertEqual(expression - 1, n * 4)
+        self.assertNotEqual(name - 1, n * 4)
+
+    def test_is_non_negative(self):
+        n = _core.SymbolicDim("N")
+        m = _core.SymbolicDim("M")
+        self.assertTrue(n.is_non_negative())
+        self.assertTrue((n * m + 2 * n + 1).is_non_negative())
+        self.assertFalse((n - 10).is_non_negative())
+        self.assertFalse(((n - 10) // 4 + 1).is_non_negative())
+        self.assertFalse(_core.SymbolicDim(None).is_non_negative())
+
+    def test_floordiv_by_zero_raises(self):
+        with self.assertRaises(ZeroDivisionError):
+            _core.SymbolicDim("N") // 0
+
 
 class ShapeTest(unittest.TestCase):
     def test_init_raises_when_denotations_and_dims_have_different_lengths(self):
@@ -528,6 +716,23 @@ class ShapeTest(unittest.TestCase):
         shape = _core.Shape([None])
         self.assertIsInstance(shape[0], _core.SymbolicDim)
 
+    def test_symbolic_dimensions_are_shared_between_shapes(self):
+        shape_1 = _core.Shape(["batch", None])
+        shape_2 = _core.Shape(["batch", None])
+        self.assertIs(shape_1[0], shape_2[0])
+        self.assertIs(shape_1[1], shape_2[1])
+
+    def test_init_converts_bool_to_python_int(self):
+        shape = _core.Shape([True, 42])
+        self.assertIs(type(shape[0]), int)
+        self.assertEqual(shape.dims, (1, 42))
+
+    def test_init_does_not_share_the_dims_with_the_input_list(self):
+        dims = [1, 2]
+        shape = _core.Shape(dims)
+        dims.append(3)
+        self.assertEqual(shape.dims, (1, 2))
+
     def test_init_raises_when_dims_is_not_a_list(self):
         with self.assertRaises(TypeError):
             _core.Shape(42)
@@ -660,6 +865,15 @@ class ShapeTest(unittest.TestCase):
         shape.set_denotation(1, "UPDATED")
         self.assertEqual(shape.get_denotation(1), "UPDATED")
 
+    def test_set_denotation_when_shape_has_no_denotations(self):
+        shape = _core.Shape([42, 0])
+        self.assertIsNone(shape.get_denotation(1))
+        shape.set_denotation(1, "BATCH")
+        self.assertEqual(shape.get_denotation(1), "BATCH")
+        self.assertIsNone(shape.get_denotation(0))
+        with self.assertRaises(IndexError):
+            _core.Shape([42]).get_denotation(1)
+
     def test_set_denotation_is_still_possible_when_shape_is_frozen(self):
         shape = _core.Shape([42], denotations=("DATA_CHANNEL",), frozen=True)
         shape.set_denotation(0, "UPDATED")
@@ -751,6 +965,32 @@ class ValueTest(unittest.TestCase):
         self.assertEqual(self.node.outputs[0].consumers(), ())
         self.assertEqual(self.node.outputs[1].consumers(), ())
 
+    def test_num_uses_and_has_uses(self):
+        self.assertEqual(self.v0.num_uses(), 1)
+        self.assertEqual(self.v1.num_uses(), 2)
+        self.assertTrue(self.v1.has_uses())
+        self.assertEqual(self.node.outputs[0].num_uses(), 0)
+        self.assertFalse(self.node.outputs[0].has_uses())
+
+    def test_iter_uses_yields_the_uses(self):
+        self.assertEqual(list(self.v1.iter_uses()), [(self.node, 1), (self.node, 2)])
+        self.assertEqual(list(self.node.outputs[0].iter_uses()), [])
+
+    def test_iter_uses_is_not_affected_by_changes_of_the_uses(self):
+        uses = self.v1.iter_uses()
+        self.assertEqual(next(uses), (self.node, 1))
+        self.node.replace_input_with(2, self.v0)
+        other = _core.Node("", "Identity", inputs=(self.v1,))
+        self.assertEqual(next(uses), (self.node, 2))
+        with self.assertRaises(StopIteration):
+            next(uses)
+        self.assertEqual(self.v1.uses(), ((self.node, 1), (other, 0)))
+        self.assertEqual(self.v0.uses(), ((self.node, 0), (self.node, 2)))
+
+    def test_uses_of_a_value_without_uses_is_empty(self):
+        self.assertEqual(self.node.outputs[0].uses(), ())
+        self.assertEqual(self.node.outputs[0].consumers(), ())
+
     # TODO(justinchuby): Test all methods
 
 
@@ -892,6 +1132,82 @@ class GraphTest(unittest.TestCase):
         with self.assertRaises(IndexError):
             self.graph.node(1)
 
+    def test_node_by_name_follows_graph_mutations(self):
+        self.assertIs(self.graph.node("node_add"), self.node)
+        sub_node = _core.Node("", "Sub", inputs=(self.v0, self.v1), name="node_sub")
+        self.graph.insert_before(self.node, sub_node)
+        self.assertIs(self.graph.node("node_sub"), sub_node)
+        sub_node.name = "renamed"
+        self.assertIs(self.graph.node("renamed"), sub_node)
+        with self.assertRaisesRegex(ValueError, "not found"):
+            self.graph.node("node_sub")
+        self.graph.remove(sub_node)
+        with self.assertRaisesRegex(ValueError, "not found"):
+            self.graph.node("renamed")
+
+    def test_node_by_name_returns_first_node_in_graph_order_for_duplicates(self):
+        first = _core.Node("", "Sub", inputs=(self.v0, self.v1), name="node_add")
+        self.graph.node("node_add")  # Build the index before inserting
+        self.graph.insert_before(self.node, first)
+        self.assertIs(self.graph.node("node_add"), first)
+        self.assertEqual(self.graph.duplicate_node_names(), ["node_add"])
+
+    def test_value_returns_inputs_initializers_and_node_outputs(self):
+        initializer = _core.Value(name="init", const_value=ir.tensor([1.0]))
+        self.graph.register_initializer(initializer)
+        output = self.node.outputs[0]
+        self.assertIs(self.graph.value("v0"), self.v0)
+        self.assertIs(self.graph.value("init"), initializer)
+        self.assertIs(self.graph.value(output.name), output)
+        output.name = "renamed_output"
+        self.assertIs(self.graph.value("renamed_output"), output)
+        with self.assertRaisesRegex(ValueError, "not found"):
+            self.graph.value("non_existent")
+
+    def test_duplicate_value_names(self):
+        self.assertEqual(self.graph.duplicate_value_names(), [])
+        self.node.outputs[0].name = "v0"
+        self.assertEqual(self.graph.duplicate_value_names(), ["v0"])
+
+    def test_nodes_by_op_returns_nodes_in_graph_order(self):
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [self.node])
+        self.assertEqual(self.graph.nodes_by_op("", "Sub"), [])
+        last = _core.Node("", "Add", inputs=(self.v0, self.v1), graph=self.graph)
+        first = _core.Node("", "Add", inputs=(self.v0, self.v1))
+        self.graph.insert_before(self.node, first)
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [first, self.node, last])
+        self.graph.remove(self.node)
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [first, last])
+
+    def test_is_before_follows_insertions(self):
+        first = _core.Node("", "Sub", inputs=(self.v0, self.v1))
+        last = _core.Node("", "Mul", inputs=(self.v0, self.v1), graph=self.graph)
+        self.graph.insert_before(self.node, first)
+        self.assertTrue(self.graph.is_before(first, self.node))
+        self.assertTrue(self.graph.is_before(self.node, last))
+        self.assertFalse(self.graph.is_before(last, first))
+        self.graph.remove(first)
+        with self.assertRaises(ValueError):
+            self.graph.is_before(first, last)
+
+    def test_nodes_by_op_follows_changes_of_the_operator(self):
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [self.node])
+        self.node.op_type = "Sub"
+        self.node.domain = "custom"
+        self.node.overload = "v2"
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [])
+        self.assertEqual(self.graph.nodes_by_op("custom", "Sub", "v2"), [self.node])
+
+    def test_nodes_by_op_returns_nodes_of_all_overloads_in_graph_order(self):
+        first = _core.Node("", "Add", inputs=(self.v0, self.v1), overload="v1")
+        self.graph.insert_before(self.node, first)
+        last = _core.Node(
+            "", "Add", inputs=(self.v0, self.v1), overload="v2", graph=self.graph
+        )
+        self.assertEqual(self.graph.nodes_by_op("", "Add"), [self.node])
+        self.assertEqual(self.graph.nodes_by_op("", "Add", None), [first, self.node, last])
+        self.assertEqual(self.graph.nodes_by_op("", "Sub", None), [])
+
     def test_num_nodes_returns_the_count_of_nodes(self):
         self.assertEqual(self.graph.num_nodes(), 1)
         self.assertEqual(self.graph.num_nodes(), len(self.graph))
@@ -1257,5 +1573,111 @@ class AttrTest(unittest.TestCase):
         self.assertIsInstance(attr.as_graphs()[0], _core.Graph)
 
 
+class CloneTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = ir.serde.deserialize_model(
+            onnx.parser.parse_model(
+                """
+                <ir_version: 10, opset_import: ["" : 20, "custom" : 1]>
+                main (float[N] x, bool cond) => (float[N] y)
+                <float[1] w = {1.0}>
+                {
+                    z = custom.Double(x)
+                    y = If(cond) <
+                        then_branch = then_graph () => (float[N] t) {
+                            t = Add(z, w)
+                        },
+                        else_branch = else_graph () => (float[N] e) {
+                            e = Identity(z)
+                        }
+                    >
+                }
+                <domain: "custom", opset_import: ["" : 20]>
+                Double (a) => (b) {
+                    b = Add(a, a)
+                }
+                """
+            )
+        )
+
+    def test_clone_is_equal_to_the_original(self):
+        clone = self.model.clone()
+        self.assertEqual(ir.serde.serialize_model(clone), ir.serde.serialize_model(self.model))
+
+    def test_clone_shares_tensors_but_not_nodes_and_values(self):
+        clone = self.model.clone()
+        self.assertIsNot(clone.graph, self.model.graph)
+        for node, cloned_node in zip(self.model.graph, clone.graph):
+            self.assertIsNot(node, cloned_node)
+            self.assertIs(cloned_node.graph, clone.graph)
+        self.assertIsNot(clone.graph.initializers["w"], self.model.graph.initializers["w"])
+        self.assertIs(
+            clone.graph.initializers["w"].const_value,
+            self.model.graph.initializers["w"].const_value,
+        )
+        self.assertIsNot(clone.graph.outputs[0].shape, self.model.graph.outputs[0].shape)
+
+    def test_subgraphs_of_the_clone_use_values_of_the_clone(self):
+        clone = self.model.clone()
+        then_add = clone.graph.node(1).attributes["then_branch"].as_graph().node(0)
+        self.assertIs(then_add.inputs[0], clone.graph.node(0).outputs[0])
+        self.assertIs(then_add.inputs[1], clone.graph.initializers["w"])
+        self.assertEqual(clone.graph.initializers["w"].consumers(), (then_add,))
+        self.assertEqual(len(self.model.graph.initializers["w"].consumers()), 1)
+
+    def test_modifying_the_clone_does_not_modify_the_original(self):
+        expected = ir.serde.serialize_model(self.model)
+        clone = self.model.clone()
+        clone.graph.outputs[0].dtype = ir.DataType.DOUBLE
+        clone.graph.outputs[0].shape = ir.Shape([2])
+        clone.graph.inputs[0].name = "renamed"
+        double = clone.graph.node(0)
+        ir.convenience.replace_all_uses_with(double.outputs[0], clone.graph.inputs[0])
+        clone.graph.remove(double, safe=True)
+        clone.functions[("custom", "Double", "")][0].op_type = "Mul"
+        self.assertEqual(ir.serde.serialize_model(self.model), expected)
+
+    def test_renaming_values_of_the_clone_does_not_rename_the_shared_tensors(self):
+        expected = ir.serde.serialize_model(self.model)
+        clone = self.model.clone()
+        clone.graph.initializers["w"].name = "renamed"
+        cloned_proto = ir.serde.serialize_model(clone)
+        self.assertEqual(self.model.graph.initializers["w"].const_value.name, "w")
+        self.assertEqual(ir.serde.serialize_model(self.model), expected)
+        self.assertEqual(cloned_proto.graph.initializer[0].name, "renamed")
+
+    def test_renaming_values_of_the_original_renames_their_tensors(self):
+        clone = self.model.clone()
+        initializer = self.model.graph.initializers["w"]
+        initializer.name = "original"
+        self.assertEqual(initializer.const_value.name, "original")
+        # The clone names its initializer after its own value when it is serialized
+        self.assertEqual(ir.serde.serialize_model(clone).graph.initializer[0].name, "w")
+        del clone
+        initializer.name = "renamed"
+        self.assertEqual(initializer.const_value.name, "renamed")
+
+
+class SlotsTest(unittest.TestCase):
+    @parameterized.parameterized.expand(
+        [
+            ("value", lambda: _core.Value(name="v")),
+            ("node", lambda: _core.Node("", "Add", ())),
+            ("attr", lambda: _core.Attr("a", ir.AttributeType.INT, 1)),
+            ("ref_attr", lambda: _core.RefAttr("a", "b", ir.AttributeType.INT)),
+            ("shape", lambda: _core.Shape([1, "N"])),
+            ("symbolic_dim", lambda: _core.SymbolicDim("N")),
+            ("tensor_type", lambda: _core.TensorType(ir.DataType.FLOAT)),
+            ("sequence_type", lambda: _core.SequenceType(_core.TensorType(ir.DataType.FLOAT))),
+            ("graph", lambda: _core.Graph((), (), nodes=())),
+        ]
+    )
+    def test_object_does_not_have_instance_dict(self, _: str, create):
+        obj = create()
+        self.assertFalse(hasattr(obj, "__dict__"))
+        with self.assertRaises(AttributeError):
+            obj.unknown_attribute = 1
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -22,6 +22,8 @@ def require_rich() -> Any:
 
 
 class PrettyPrintable:
+    __slots__ = ()
+
     def display(self, *, page: bool = False) -> None:
         """Pretty print the object.
 
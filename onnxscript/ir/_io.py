@@ -10,26 +10,48 @@ import os
 
 import onnx
 
-from onnxscript.ir import _core, serde
+from onnxscript.ir import _core, _wire_format, serde
 from onnxscript.ir import external_data as _external_data
 from onnxscript.ir._polyfill import zip
 
 
-def load(path: str | os.PathLike, format: str | None = None) -> _core.Model:
+def load(
+    path: str | os.PathLike,
+    format: str | None = None,
+    *,
+    lazy: bool = False,
+    memory_map: bool = False,
+) -> _core.Model:
     """Load an ONNX model from a file.
 
     Args:
         path: The path to the ONNX file.
         format: The format of the file (e.g. protobuf, textproto, json, etc.).
             If None, the format is inferred from the file extension.
+        lazy: When True, function bodies and subgraphs are deserialized on first
+            access. See :func:`onnxscript.ir.serde.deserialize_model` for details.
+        memory_map: When True, the file is memory mapped and large initializers
+            embedded in the file are exposed as views into the mapping instead of
+            being parsed and copied. Only the binary protobuf format is supported.
+            The file must not be modified while the model is in use.
 
     Returns:
         The loaded model.
+
+    Raises:
+        ValueError: If :param:`memory_map` is True and the format is not protobuf.
     """
-    # Do not use ONNX to load external data because the IR handles external data
-    # by doing memory mapping directly.
-    proto = onnx.load(path, format=format, load_external_data=False)
-    model = serde.deserialize_model(proto)
+    if memory_map:
+        if format not in (None, "protobuf"):
+            raise ValueError(
+                f"memory_map is only supported for the protobuf format, not '{format}'."
+            )
+        model = _wire_format.load_model(path, lazy=lazy)
+    else:
+        # Do not use ONNX to load external data because the IR handles external data
+        # by doing memory mapping directly.
+        proto = onnx.load(path, format=format, load_external_data=False)
+        model = serde.deserialize_model(proto, lazy=lazy)
     base_dir = os.path.dirname(path)
     # Set the base directory for external data to the directory of the ONNX file
     # so that relative paths are resolved correctly.
@@ -43,6 +65,7 @@ def save(
     format: str | None = None,
     external_data: str | os.PathLike | None = None,
     size_threshold_bytes: int = 256,
+    max_shard_size_bytes: int | None = None,
 ) -> None:
     """Save an ONNX model to a file.
 
@@ -65,6 +88,9 @@ def save(
             it will be serialized in the ONNX Proto message.
         size_threshold_bytes: Save to external data if the tensor size in bytes is larger than this threshold.
             Effective only when :param:`external_data` is set.
+        max_shard_size_bytes: When set, the external data is split into files of at most
+            this size named ``{external_data}.00001``, ``{external_data}.00002``, etc.
+            Effective only when :param:`external_data` is set.
 
     Raises:
         ValueError: If the external data path is an absolute path.
@@ -82,16 +108,30 @@ def save(
 
         try:
             model = _external_data.unload_from_model(
-                model, base_dir, external_data, size_threshold_bytes=size_threshold_bytes
+                model,
+                base_dir,
+                external_data,
+                size_threshold_bytes=size_threshold_bytes,
+                max_shard_size_bytes=max_shard_size_bytes,
             )
-            proto = serde.serialize_model(model)
-            onnx.save(proto, path, format=format)
+            _save_model(model, path, format)
 
         finally:
             # Restore the original initializer values so the model is unchanged
             for initializer, tensor in zip(initializer_values, tensors, strict=True):
                 initializer.const_value = tensor
 
+    else:
+        _save_model(model, path, format)
+
+
+def _save_model(model: _core.Model, path: str | os.PathLike, format: str | None) -> None:
+    if format is None:
+        _, ext = os.path.splitext(path)
+        format = onnx.serialization.registry.get_format_from_file_extension(ext)
+    if format in (None, "protobuf"):
+        # Stream the binary format to the file to avoid holding the whole proto in memory
+        _wire_format.save_model(model, path)
     else:
         proto = serde.serialize_model(model)
         onnx.save(proto, path, format=format)
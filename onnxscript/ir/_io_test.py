@@ -70,6 +70,18 @@ class IOFunctionsTest(unittest.TestCase):
         self.assertEqual(loaded_model.graph.outputs[0].name, "identity_0")
         self.assertEqual(loaded_model.graph.outputs[1].name, "const_0")
 
+    def test_load_lazy(self):
+        model = _create_simple_model_with_initializers()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.onnx")
+            _io.save(model, path)
+            loaded_model = _io.load(path, lazy=True)
+        self.assertEqual(len(loaded_model.graph), 2)
+        np.testing.assert_array_equal(
+            loaded_model.graph.initializers["initializer_0"].const_value.numpy(),
+            np.array([0.0]),
+        )
+
     def test_save_with_external_data_does_not_modify_model(self):
         model = _create_simple_model_with_initializers()
         self.assertIsInstance(model.graph.initializers["initializer_0"].const_value, ir.Tensor)
@@ -138,6 +150,52 @@ class IOFunctionsTest(unittest.TestCase):
                     size_threshold_bytes=0,
                 )
 
+    def test_save_with_sharded_external_data(self):
+        tensors = [
+            ir.tensor(np.full((256,), i, dtype=np.float32), name=f"initializer_{i}")
+            for i in range(3)
+        ]
+        initializers = [_create_initializer(tensor) for tensor in tensors]
+        graph = ir.Graph(
+            inputs=[],
+            outputs=initializers,
+            nodes=[],
+            initializers=initializers,
+            name="test_graph",
+        )
+        model = ir.Model(graph, ir_version=10)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.onnx")
+            _io.save(
+                model,
+                path,
+                external_data="model.data",
+                size_threshold_bytes=0,
+                max_shard_size_bytes=2048,
+            )
+            self.assertEqual(
+                sorted(os.listdir(tmpdir)),
+                ["model.data.00001", "model.data.00002", "model.onnx"],
+            )
+            loaded_model = _io.load(path)
+            locations = {
+                name: value.const_value.location
+                for name, value in loaded_model.graph.initializers.items()
+            }
+            self.assertEqual(
+                locations,
+                {
+                    "initializer_0": "model.data.00001",
+                    "initializer_1": "model.data.00001",
+                    "initializer_2": "model.data.00002",
+                },
+            )
+            for i in range(3):
+                np.testing.assert_array_equal(
+                    loaded_model.graph.initializers[f"initializer_{i}"].const_value.numpy(),
+                    tensors[i].numpy(),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
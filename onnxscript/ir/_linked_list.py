@@ -8,6 +8,10 @@ from typing import Generic, Iterable, Iterator, Sequence, TypeVar
 
 T = TypeVar("T")
 
+# The gap between the order labels of consecutive values when labels are assigned
+# at the end of the list or spread out after running out of room
+_LABEL_GAP = 1 << 16
+
 
 class _LinkBox(Generic[T]):
     """A link in a doubly linked list that has a reference to the actual object in the link.
@@ -28,9 +32,11 @@ class _LinkBox(Generic[T]):
         erased: A flag to indicate if the box has been removed from the list.
         owning_list: The :class:`DoublyLinkedSet` to which the box belongs.
         value: The actual object in the list.
+        label: The order label of the box. Labels increase from the start to the end
+            of the list. The label of the root box is 0.
     """
 
-    __slots__ = ("next", "owning_list", "prev", "value")
+    __slots__ = ("label", "next", "owning_list", "prev", "value")
 
     def __init__(self, owner: DoublyLinkedSet[T], value: T | None) -> None:
         """Create a new link box.
@@ -45,6 +51,7 @@ class _LinkBox(Generic[T]):
         self.next: _LinkBox[T] = self
         self.value: T | None = value
         self.owning_list: DoublyLinkedSet[T] = owner
+        self.label = 0
 
     @property
     def erased(self) -> bool:
@@ -83,9 +90,14 @@ class DoublyLinkedSet(Sequence[T], Generic[T]):
         iteration will start from the "next" node at the _original_ location.
 
     Time complexity:
-        Inserting and removing nodes from the set is O(1). Accessing nodes by index is O(n),
-        although accessing nodes at either end of the set is O(1). I.e.
-        ``linked_set[0]`` and ``linked_set[-1]`` are O(1).
+        Inserting and removing nodes from the set is O(1) amortized. Accessing nodes by
+        index is O(n), although accessing nodes at either end of the set is O(1). I.e.
+        ``linked_set[0]`` and ``linked_set[-1]`` are O(1). Comparing the positions of
+        two nodes with :meth:`is_before` is O(1).
+
+    The positions are compared with order labels that increase along the list. A
+    value inserted between two others takes a label between theirs. When there is no
+    room left, the labels of the neighboring values are spread out again.
 
     Values need to be hashable. ``None`` is not a valid value in the set.
     """
@@ -200,6 +212,7 @@ class DoublyLinkedSet(Sequence[T], Generic[T]):
         new_box.prev = box
         new_box.next = original_next
         original_next.prev = new_box
+        self._label(new_box)
 
         # Be sure to update the length and mapping
         self._length += 1
@@ -207,6 +220,35 @@ class DoublyLinkedSet(Sequence[T], Generic[T]):
 
         return new_box
 
+    def _label(self, box: _LinkBox[T]) -> None:
+        """Assign an order label to a box that was just linked into the list."""
+        prev_label = box.prev.label
+        next_box = box.next
+        if next_box is self._root:
+            box.label = prev_label + _LABEL_GAP
+            return
+        if next_box.label - prev_label > 1:
+            box.label = (prev_label + next_box.label) // 2
+            return
+        # There is no room between the neighbors. Extend a range of boxes towards the
+        # end of the list until the labels it spans are sparse enough, and spread out
+        # the labels of the boxes in it. Requiring the span to grow with the square of
+        # the number of boxes keeps the amortized cost of relabeling low.
+        start_label = prev_label
+        count = 1
+        end = next_box
+        while end is not self._root and end.label - start_label <= (count + 1) ** 2:
+            end = end.next
+            count += 1
+        if end is self._root:
+            gap = _LABEL_GAP
+        else:
+            gap = (end.label - start_label) // (count + 1)
+        current = box
+        for i in range(1, count + 1):
+            current.label = start_label + i * gap
+            current = current.next
+
     def _insert_many_after(
         self,
         box: _LinkBox[T],
@@ -272,5 +314,26 @@ class DoublyLinkedSet(Sequence[T], Generic[T]):
         insertion_point = self._value_ids_to_boxes[value_id].prev
         return self._insert_many_after(insertion_point, new_values)
 
+    def is_before(self, value: T, other: T) -> bool:
+        """Return whether the value comes before the other value in the list in O(1) time.
+
+        Raises:
+            ValueError: If any of the values is not in the list.
+        """
+        return self.label(value) < self.label(other)
+
+    def label(self, value: T) -> int:
+        """Return the order label of the value in O(1) time.
+
+        Labels increase along the list. They change when values are inserted, so they
+        should only be compared with labels obtained since the last insertion.
+
+        Raises:
+            ValueError: If the value is not in the list.
+        """
+        if (box := self._value_ids_to_boxes.get(id(value))) is None:
+            raise ValueError(f"Value {value!r} is not in the list")
+        return box.label
+
     def __repr__(self) -> str:
         return f"DoublyLinkedSet({list(self)})"
@@ -373,6 +373,32 @@ class DoublyLinkedSetTest(unittest.TestCase):
         self.assertEqual(len(other_linked_list), 1)
         self.assertEqual([elem.value for elem in other_linked_list], [42])
 
+    def test_is_before_compares_positions(self):
+        elems = [_TestElement(i) for i in range(3)]
+        linked_list = _linked_list.DoublyLinkedSet(elems)
+        self.assertTrue(linked_list.is_before(elems[0], elems[2]))
+        self.assertFalse(linked_list.is_before(elems[2], elems[0]))
+        self.assertFalse(linked_list.is_before(elems[1], elems[1]))
+        linked_list.insert_before(elems[0], [elems[2]])
+        self.assertTrue(linked_list.is_before(elems[2], elems[0]))
+        with self.assertRaises(ValueError):
+            linked_list.is_before(elems[0], _TestElement(3))
+
+    @parameterized.parameterized.expand(
+        [
+            ("head", 0),
+            ("middle", 1),
+            ("tail", 2),
+        ]
+    )
+    def test_labels_stay_ordered_after_repeated_insertions_at_one_place(self, _: str, index):
+        elems = [_TestElement(i) for i in range(3)]
+        linked_list = _linked_list.DoublyLinkedSet(elems)
+        for i in range(200):
+            linked_list.insert_before(elems[index], [_TestElement(i + 3)])
+        labels = [linked_list.label(elem) for elem in linked_list]
+        self.assertEqual(labels, sorted(set(labels)))
+
 
 if __name__ == "__main__":
     unittest.main()
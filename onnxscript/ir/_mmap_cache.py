@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""A shared cache of memory mapped files for external data."""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import mmap
+import os
+import threading
+
+
+class _Entry:
+    """A mapped file and the number of holders that are using it.
+
+    Attributes:
+        key: The real path of the mapped file.
+        mapping: The memory mapped file.
+        signature: The (size, modification time, inode) of the file when it was mapped.
+            It is used to detect files that were replaced or modified since.
+        ref_count: The number of holders that acquired the mapping and did not release it.
+        detached: Whether the entry was removed from the cache while still in use. The
+            mapping is closed when the last holder releases it.
+    """
+
+    __slots__ = ("detached", "key", "mapping", "ref_count", "signature")
+
+    def __init__(self, key: str, mapping: mmap.mmap, signature: tuple[int, int, int]) -> None:
+        self.key = key
+        self.mapping = mapping
+        self.signature = signature
+        self.ref_count = 0
+        self.detached = False
+
+
+def _signature(path: str) -> tuple[int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def close_mapping(mapping: mmap.mmap) -> None:
+    """Close a mapping unless arrays created from it are still alive.
+
+    The mapping cannot be closed while a numpy array created from it is alive. It is
+    then closed when the last such array is garbage collected.
+    """
+    with contextlib.suppress(BufferError):
+        mapping.close()
+
+
+class MappedFileCache:
+    """A reference counted cache of read-only memory mapped files keyed by path.
+
+    All holders of the same file share one mapping. A holder calls :meth:`acquire` to
+    obtain the mapping and :meth:`release` when it no longer uses it. Mappings that are
+    not in use are kept open for reuse, up to :attr:`max_unused` of them. Beyond that
+    the least recently used ones are closed. Mappings that are in use are never closed.
+
+    A file that changed on disk since it was mapped is mapped again on the next
+    :meth:`acquire`.
+
+    The cache is thread safe.
+    """
+
+    def __init__(self, max_unused: int = 16) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_unused: The maximum number of mappings kept open while no holder uses them.
+        """
+        self.max_unused = max_unused
+        self._lock = threading.Lock()
+        # Real path -> entry for the current version of each file
+        self._entries: dict[str, _Entry] = {}
+        # id(mapping) -> entry for every mapping that is open, including detached ones
+        self._mappings: dict[int, _Entry] = {}
+        # Keys of the entries that are not in use, from the least to the most recently used
+        self._unused: collections.OrderedDict[str, None] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of open mappings."""
+        return len(self._mappings)
+
+    def acquire(self, path: str | os.PathLike) -> mmap.mmap:
+        """Return a read-only mapping of the whole file and increment its reference count.
+
+        Raises:
+            OSError: If the file cannot be opened.
+            ValueError: If the file is empty. Empty files cannot be memory mapped.
+        """
+        key = os.path.realpath(path)
+        signature = _signature(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature != signature:
+                # The file changed. Holders of the stale mapping keep it until they release it.
+                self._detach(entry)
+                entry = None
+            if entry is None:
+                with open(key, "rb") as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                entry = _Entry(key, mapping, signature)
+                self._entries[key] = entry
+                self._mappings[id(mapping)] = entry
+            entry.ref_count += 1
+            self._unused.pop(key, None)
+            return entry.mapping
+
+    def release(self, mapping: mmap.mmap) -> None:
+        """Decrement the reference count of a mapping obtained from :meth:`acquire`."""
+        with self._lock:
+            entry = self._mappings.get(id(mapping))
+            if entry is None or entry.mapping is not mapping:
+                raise ValueError("The mapping was not acquired from this cache")
+            entry.ref_count -= 1
+            if entry.ref_count > 0:
+                return
+            if entry.detached:
+                self._close(entry)
+                return
+            self._unused[entry.key] = None
+            while len(self._unused) > self.max_unused:
+                key, _ = self._unused.popitem(last=False)
+                self._detach(self._entries[key])
+
+    def evict(self, path: str | os.PathLike) -> None:
+        """Remove the file from the cache, closing its mapping if no holder uses it.
+
+        Call this before overwriting a file. Holders that still use the mapping keep it
+        until they release it.
+        """
+        key = os.path.realpath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._detach(entry)
+
+    def clear(self) -> None:
+        """Close all mappings that are not in use and forget the ones that are."""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._detach(entry)
+
+    def _detach(self, entry: _Entry) -> None:
+        del self._entries[entry.key]
+        self._unused.pop(entry.key, None)
+        entry.detached = True
+        if entry.ref_count == 0:
+            self._close(entry)
+
+    def _close(self, entry: _Entry) -> None:
+        del self._mappings[id(entry.mapping)]
+        close_mapping(entry.mapping)
+
+
+# The cache shared by all external tensors
+MAPPED_FILES = MappedFileCache()
@@ -0,0 +1,99 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from onnxscript import ir
+from onnxscript.ir import _mmap_cache
+
+
+class MappedFileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.temp_dir.name, f"data_{i}.bin")
+            with open(path, "wb") as f:
+                f.write(bytes([i]) * 16)
+            self.paths.append(path)
+        self.cache = _mmap_cache.MappedFileCache(max_unused=1)
+
+    def tearDown(self):
+        self.cache.clear()
+        self.temp_dir.cleanup()
+
+    def test_acquire_shares_the_mapping_of_the_same_file(self):
+        mapping = self.cache.acquire(self.paths[0])
+        other = self.cache.acquire(os.path.join(self.temp_dir.name, ".", "data_0.bin"))
+        self.assertIs(mapping, other)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(mapping[:], bytes([0]) * 16)
+
+    def test_mapping_in_use_is_not_closed_by_eviction(self):
+        mapping = self.cache.acquire(self.paths[0])
+        self.cache.evict(self.paths[0])
+        self.assertFalse(mapping.closed)
+        self.cache.release(mapping)
+        self.assertTrue(mapping.closed)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_unused_mappings_are_closed(self):
+        mappings = [self.cache.acquire(path) for path in self.paths]
+        for mapping in mappings:
+            self.cache.release(mapping)
+        # Only the most recently released mapping is kept open
+        self.assertEqual([mapping.closed for mapping in mappings], [True, True, False])
+        self.assertIs(self.cache.acquire(self.paths[2]), mappings[2])
+
+    def test_changed_file_is_mapped_again(self):
+        mapping = self.cache.acquire(self.paths[0])
+        self.cache.release(mapping)
+        with open(self.paths[0], "wb") as f:
+            f.write(b"\x07" * 32)
+        new_mapping = self.cache.acquire(self.paths[0])
+        self.assertIsNot(new_mapping, mapping)
+        self.assertTrue(mapping.closed)
+        self.assertEqual(new_mapping[:], b"\x07" * 32)
+
+    def test_release_raises_for_unknown_mapping(self):
+        mapping = self.cache.acquire(self.paths[0])
+        self.cache.release(mapping)
+        self.cache.clear()
+        with self.assertRaises(ValueError):
+            self.cache.release(mapping)
+
+
+class ExternalTensorMappingTest(unittest.TestCase):
+    def test_external_tensors_of_the_same_file_share_one_mapping(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data = np.arange(8, dtype=np.float32)
+            with open(os.path.join(temp_dir, "model.data"), "wb") as f:
+                f.write(data.tobytes())
+            tensors = [
+                ir.ExternalTensor(
+                    "model.data",
+                    offset=i * 16,
+                    length=16,
+                    dtype=ir.DataType.FLOAT,
+                    shape=ir.Shape([4]),
+                    name=f"tensor_{i}",
+                    base_dir=temp_dir,
+                )
+                for i in range(2)
+            ]
+            np.testing.assert_array_equal(tensors[0].numpy(), data[:4])
+            np.testing.assert_array_equal(tensors[1].numpy(), data[4:])
+            self.assertIs(tensors[0].raw, tensors[1].raw)
+            mapping = tensors[0].raw
+            for tensor in tensors:
+                tensor.release()
+            self.assertFalse(mapping.closed)
+            ir.external_data.release_mapped_files()
+            self.assertTrue(mapping.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
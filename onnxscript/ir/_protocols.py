@@ -63,6 +63,8 @@ class ArrayCompatible(Protocol):
     Read more at https://numpy.org/devdocs/user/basics.interoperability.html
     """
 
+    __slots__ = ()
+
     def __array__(self, dtype: Any) -> np.ndarray: ...
 
 
@@ -75,6 +77,8 @@ class DLPackCompatible(Protocol):
     without copying the data.
     """
 
+    __slots__ = ()
+
     def __dlpack__(self, *, stream: Any = ...) -> Any:
         """Return PyCapsule."""
         ...
@@ -111,6 +115,8 @@ class TensorProtocol(ArrayCompatible, DLPackCompatible, Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     name: str | None
     shape: ShapeProtocol
     dtype: _enums.DataType
@@ -177,6 +183,8 @@ class ValueProtocol(Protocol):
         const_value: The constant tensor is the value constant.
     """
 
+    __slots__ = ()
+
     name: str
     shape: ShapeProtocol | None
     type: TypeProtocol | None
@@ -243,6 +251,8 @@ class NodeProtocol(Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     name: str | None
     domain: str
     op_type: str
@@ -288,6 +298,8 @@ class GraphProtocol(Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     # TODO(justinchuby): Support quantization_annotation
     name: str | None
     inputs: MutableSequence[ValueProtocol]
@@ -349,6 +361,8 @@ class GraphViewProtocol(Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     name: str | None
     inputs: Sequence[ValueProtocol]
     outputs: Sequence[ValueProtocol]
@@ -384,6 +398,8 @@ class ModelProtocol(Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     graph: GraphProtocol
     ir_version: int
     producer_name: str | None
@@ -409,6 +425,8 @@ class AttributeProtocol(Protocol):
         doc_string: Documentation string.
     """
 
+    __slots__ = ()
+
     name: str
     type: _enums.AttributeType
     value: Any
@@ -428,6 +446,8 @@ class ReferenceAttributeProtocol(Protocol):
         doc_string: Documentation string.
     """
 
+    __slots__ = ()
+
     name: str
     ref_attr_name: str
     type: _enums.AttributeType
@@ -436,6 +456,8 @@ class ReferenceAttributeProtocol(Protocol):
 
 @typing.runtime_checkable
 class SparseTensorProtocol(Protocol):
+    __slots__ = ()
+
     values: TensorProtocol
     indices: TensorProtocol
     dims: Sequence[int]
@@ -449,6 +471,8 @@ class SymbolicDimProtocol(Protocol):
         value: The value of the dimension.
     """
 
+    __slots__ = ()
+
     value: str | None  # TODO(justinchuby): Maybe support sympy
 
 
@@ -462,6 +486,8 @@ class ShapeProtocol(Protocol):
         dims: The dimensions of the shape.
     """
 
+    __slots__ = ()
+
     dims: Sequence[int | SymbolicDimProtocol]
 
     def __len__(self) -> int: ...
@@ -500,6 +526,8 @@ class TypeProtocol(Protocol):
         dtype: The data type of the tensor or the nested tensor.
     """
 
+    __slots__ = ()
+
     denotation: str | None
     elem_type: TypeProtocol | _enums.DataType
     dtype: _enums.DataType
@@ -514,6 +542,8 @@ class MapTypeProtocol(Protocol):
     TODO: This protocol is not yet implemented in the ONNX IR.
     """
 
+    __slots__ = ()
+
     key_type: typing.Literal[
         _enums.DataType.STRING,
         _enums.DataType.INT64,
@@ -552,6 +582,8 @@ class FunctionProtocol(Protocol):
         meta: Metadata store for graph transform passes.
     """
 
+    __slots__ = ()
+
     name: str
     domain: str
     overload: str
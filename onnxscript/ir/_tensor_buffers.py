@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Access to the raw bytes and content hashes of tensors, shared by the IR modules."""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import hashlib
+import sys
+from typing import Hashable, Iterator, Sequence
+
+import numpy as np
+
+from onnxscript.ir import _core, _enums, _mmap_cache, _protocols
+
+# Data types whose numpy representation is not a view of the raw bytes
+PACKED_TYPES = frozenset(
+    (
+        _enums.DataType.INT4,
+        _enums.DataType.UINT4,
+        _enums.DataType.FLOAT4E2M1,
+        _enums.DataType.STRING,
+        _enums.DataType.UNDEFINED,
+    )
+)
+
+# Number of bytes hashed at a time when computing the content hash of a tensor
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def tensor_buffer(tensor: _protocols.TensorProtocol) -> memoryview | bytes:
+    """Return the little endian bytes of the tensor, avoiding a copy when possible.
+
+    A view of the numpy array is returned when the tensor holds a contiguous little
+    endian array. Otherwise the result of ``tensor.tobytes()`` is returned.
+    """
+    if (
+        isinstance(tensor, _core.Tensor)
+        and isinstance(tensor.raw, np.ndarray)
+        and tensor.dtype not in PACKED_TYPES
+    ):
+        array = tensor.raw
+        byteorder = array.dtype.byteorder
+        is_little_endian = byteorder in ("<", "|") or (
+            byteorder == "=" and sys.byteorder == "little"
+        )
+        if array.flags.c_contiguous and is_little_endian:
+            # View the data as bytes so that dtypes from ml_dtypes, which do not
+            # support the buffer protocol, can be written as well
+            return memoryview(array.reshape(-1).view(np.uint8))
+    return tensor.tobytes()
+
+
+@contextlib.contextmanager
+def open_tensor_data(tensor: _protocols.TensorProtocol) -> Iterator[memoryview]:
+    """Yield the little endian bytes of a tensor, without copying them when possible."""
+    if tensor.nbytes == 0:
+        # Empty files cannot be memory mapped
+        yield memoryview(b"")
+        return
+    if isinstance(tensor, _core.ExternalTensor):
+        if not tensor.valid():
+            raise ValueError(
+                f"The external tensor '{tensor!r}' is invalidated. The data may be corrupted or deleted."
+            )
+        # Read the bytes from the mapped source file directly. Going through the tensor
+        # would unpack 4-bit types or copy the data with tobytes()
+        start = tensor.offset or 0
+        length = tensor.length if tensor.length is not None else tensor.nbytes
+        source = _mmap_cache.MAPPED_FILES.acquire(tensor.path)
+        try:
+            with memoryview(source) as source_view, source_view[
+                start : start + length
+            ] as view:
+                yield view
+        finally:
+            _mmap_cache.MAPPED_FILES.release(source)
+        return
+    with memoryview(tensor_buffer(tensor)) as view:
+        yield view
+
+
+def content_hash(tensor: _protocols.TensorProtocol) -> bytes:
+    """Compute the SHA-256 digest of the tensor bytes.
+
+    The data is hashed in chunks directly from the tensor buffer or the mapped file,
+    so it is not copied or loaded into memory at once.
+    """
+    hasher = hashlib.sha256()
+    with open_tensor_data(tensor) as data:
+        for start in range(0, len(data), _HASH_CHUNK_SIZE):
+            with data[start : start + _HASH_CHUNK_SIZE] as chunk:
+                hasher.update(chunk)
+    return hasher.digest()
+
+
+def content_keys(tensors: Sequence[_protocols.TensorProtocol]) -> list[Hashable]:
+    """Compute keys that are equal only for tensors with identical content.
+
+    Only tensors that share their data type and size with another tensor are hashed.
+    """
+    counts = collections.Counter((tensor.dtype, tensor.nbytes) for tensor in tensors)
+    keys: list[Hashable] = []
+    for i, tensor in enumerate(tensors):
+        if counts[(tensor.dtype, tensor.nbytes)] > 1:
+            keys.append((tensor.dtype, tensor.nbytes, content_hash(tensor)))
+        else:
+            keys.append(i)
+    return keys
@@ -0,0 +1,422 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Read and write ONNX models by working with the protobuf wire format directly.
+
+When reading, large initializers are not parsed by protobuf. Their ``raw_data`` is
+located in a memory mapped file and exposed as a numpy view, so the data is neither
+copied nor decoded until it is used. The rest of the model is small and is deserialized
+with :mod:`serde`.
+
+When writing, the model is encoded to the file incrementally, one node and one tensor
+at a time, so that a complete ``ModelProto`` is never held in memory. Tensor data is
+written to the file directly from the tensor buffers.
+"""
+
+# NOTES for developers:
+# The protobuf wire format is a sequence of (tag, value) pairs where the tag is
+# a varint of (field_number << 3 | wire_type). Length-delimited values (wire type 2)
+# are prefixed with their length as a varint. Removing bytes from a nested message
+# therefore requires rewriting the length prefix of every enclosing message.
+# Only ModelProto.graph -> GraphProto.initializer -> TensorProto.raw_data is rewritten.
+# Everything else is copied verbatim.
+#
+# Concatenating two serialized messages of the same type is equivalent to merging them,
+# so the writer serializes small parts of a message (e.g. the header fields of a graph)
+# with protobuf and appends the large repeated fields one element at a time. The length
+# of the graph is not known until all of it is written, so a fixed-width placeholder
+# is reserved and patched afterwards. Parsers accept varints padded with continuation
+# bytes, so the patched length is valid.
+
+from __future__ import annotations
+
+__all__ = ["load_model", "save_model"]
+
+import logging
+import mmap
+import os
+import weakref
+from typing import BinaryIO, Sequence
+
+import numpy as np
+import onnx
+
+from onnxscript.ir import _core, _enums, _mmap_cache, _protocols, _tensor_buffers, serde
+
+logger = logging.getLogger(__name__)
+
+# Wire types
+_VARINT = 0
+_I64 = 1
+_LEN = 2
+_I32 = 5
+
+# Field numbers
+_MODEL_GRAPH = 7
+_MODEL_FUNCTIONS = 25
+_GRAPH_NODE = 1
+_GRAPH_INITIALIZER = 5
+_GRAPH_INPUT = 11
+_GRAPH_OUTPUT = 12
+_GRAPH_VALUE_INFO = 13
+_TENSOR_DATA_TYPE = 2
+_TENSOR_NAME = 8
+_TENSOR_RAW_DATA = 9
+
+# Protobuf refuses to parse messages larger than 2GB
+_MAX_PROTOBUF_SIZE = 2**31 - 1
+# Number of bytes reserved for the length of the graph. Enough for any parsable size.
+_LENGTH_PLACEHOLDER_SIZE = 5
+
+# Tensors smaller than this are left in the proto because the mapping is not worth it
+DEFAULT_SIZE_THRESHOLD_BYTES = 1024
+
+
+def _read_varint(buffer: Sequence[int], pos: int) -> tuple[int, int]:
+    """Read a varint starting at pos and return (value, new_pos)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _encode_padded_varint(value: int, size: int) -> bytes:
+    """Encode a varint with exactly size bytes by padding it with continuation bytes."""
+    out = bytearray()
+    for _ in range(size - 1):
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    if value > 0x7F:
+        raise ValueError(f"Value does not fit in a varint of {size} bytes")
+    out.append(value)
+    return bytes(out)
+
+
+def _encode_tag(field_number: int, wire_type: int) -> bytes:
+    return _encode_varint(field_number << 3 | wire_type)
+
+
+def _skip_value(buffer: Sequence[int], wire_type: int, pos: int) -> int:
+    """Return the position right after the value of the given wire type."""
+    if wire_type == _VARINT:
+        _, pos = _read_varint(buffer, pos)
+        return pos
+    if wire_type == _I64:
+        return pos + 8
+    if wire_type == _LEN:
+        length, pos = _read_varint(buffer, pos)
+        return pos + length
+    if wire_type == _I32:
+        return pos + 4
+    raise ValueError(f"Unsupported protobuf wire type {wire_type} at offset {pos}")
+
+
+class _Rewriter:
+    """Build a copy of the model proto bytes without the raw data of large initializers."""
+
+    def __init__(self, buffer: mmap.mmap, size_threshold_bytes: int):
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._size_threshold_bytes = size_threshold_bytes
+        # Initializer name -> (offset, length) of its raw data in the file
+        self.locations: dict[str, tuple[int, int]] = {}
+
+    def release(self) -> None:
+        """Release the view of the buffer so that the buffer can be closed."""
+        self._view.release()
+
+    def _rewrite_message(self, start: int, end: int, rewrite_field) -> list:
+        """Copy the fields in [start, end), letting rewrite_field replace length-delimited fields.
+
+        Returns:
+            A list of bytes-like chunks of the new message.
+        """
+        buffer = self._buffer
+        chunks: list = []
+        copy_from = start
+        pos = start
+        while pos < end:
+            field_start = pos
+            tag, pos = _read_varint(buffer, pos)
+            field_number, wire_type = tag >> 3, tag & 0x7
+            if wire_type != _LEN:
+                pos = _skip_value(buffer, wire_type, pos)
+                continue
+            length, value_start = _read_varint(buffer, pos)
+            pos = value_start + length
+            replacement = rewrite_field(field_number, value_start, pos)
+            if replacement is None:
+                continue
+            # Flush the unchanged bytes before this field and emit the rewritten field
+            chunks.append(self._view[copy_from:field_start])
+            new_length = sum(len(chunk) for chunk in replacement)
+            chunks.append(_encode_varint(tag))
+            chunks.append(_encode_varint(new_length))
+            chunks.extend(replacement)
+            copy_from = pos
+        chunks.append(self._view[copy_from:end])
+        return chunks
+
+    def rewrite_model(self) -> bytes:
+        chunks = self._rewrite_message(0, len(self._buffer), self._rewrite_model_field)
+        return b"".join(chunks)
+
+    def _rewrite_model_field(self, field_number: int, start: int, end: int) -> list | None:
+        if field_number != _MODEL_GRAPH:
+            return None
+        return self._rewrite_message(start, end, self._rewrite_graph_field)
+
+    def _rewrite_graph_field(self, field_number: int, start: int, end: int) -> list | None:
+        if field_number != _GRAPH_INITIALIZER:
+            return None
+        return self._rewrite_tensor(start, end)
+
+    def _rewrite_tensor(self, start: int, end: int) -> list | None:
+        buffer = self._buffer
+        data_type = _enums.DataType.UNDEFINED
+        name = None
+        raw_data_field: tuple[int, int, int] | None = None
+        pos = start
+        while pos < end:
+            field_start = pos
+            tag, pos = _read_varint(buffer, pos)
+            field_number, wire_type = tag >> 3, tag & 0x7
+            if field_number == _TENSOR_DATA_TYPE and wire_type == _VARINT:
+                value, pos = _read_varint(buffer, pos)
+                data_type = _enums.DataType(value)
+                continue
+            if wire_type != _LEN:
+                pos = _skip_value(buffer, wire_type, pos)
+                continue
+            length, value_start = _read_varint(buffer, pos)
+            pos = value_start + length
+            if field_number == _TENSOR_NAME:
+                name = bytes(self._view[value_start:pos]).decode("utf-8")
+            elif field_number == _TENSOR_RAW_DATA:
+                raw_data_field = (field_start, value_start, pos)
+        if raw_data_field is None or name is None or name in self.locations:
+            return None
+        if data_type in _tensor_buffers.PACKED_TYPES:
+            return None
+        field_start, value_start, value_end = raw_data_field
+        if value_end - value_start < self._size_threshold_bytes:
+            return None
+        self.locations[name] = (value_start, value_end - value_start)
+        return [self._view[start:field_start], self._view[value_end:end]]
+
+
+def _mapped_tensor(
+    buffer: mmap.mmap,
+    offset: int,
+    length: int,
+    template: serde.TensorProtoTensor,
+) -> _core.Tensor:
+    """Create a tensor whose data is a view into the mapped buffer."""
+    dtype = template.dtype
+    shape = template.shape
+    # ONNX always stores raw_data in little endian
+    np_dtype = np.dtype(dtype.numpy()).newbyteorder("<")
+    count = length // np_dtype.itemsize
+    array = np.frombuffer(buffer, dtype=np_dtype, count=count, offset=offset)
+    # numpy holds the buffer through a memoryview, which releases it before its
+    # finalizers run. The last view to be garbage collected closes the mapping.
+    view = array.base if isinstance(array.base, memoryview) else array
+    weakref.finalize(view, _mmap_cache.close_mapping, buffer)
+    return _core.Tensor(
+        array.reshape(shape.numpy()),
+        dtype=dtype,
+        shape=_core.Shape(shape.dims),
+        name=template.name,
+        doc_string=template.doc_string or None,
+        metadata_props=template.metadata_props or None,
+    )
+
+
+def load_model(
+    path: str | os.PathLike,
+    *,
+    lazy: bool = False,
+    size_threshold_bytes: int = DEFAULT_SIZE_THRESHOLD_BYTES,
+) -> _core.Model:
+    """Load a binary ONNX model with its large initializers memory mapped.
+
+    Initializers stored in ``raw_data`` with at least :param:`size_threshold_bytes`
+    bytes are returned as :class:`ir.Tensor` objects backed by a read-only view into the
+    mapped file. The file must not be modified or truncated while the model is in use.
+    The mapping is closed once the tensors and the arrays obtained from them are
+    garbage collected, or right away when no initializer is mapped.
+    Initializers stored as external data are handled as in :func:`onnxscript.ir.load`.
+
+    Only the initializers of the main graph are mapped. The initializers of subgraphs
+    are decoded by protobuf and hold a copy of their data.
+
+    Args:
+        path: The path to the ONNX file. It must be in the binary protobuf format.
+        lazy: Whether to deserialize function bodies and subgraphs on first access.
+        size_threshold_bytes: Only initializers at least this large are mapped.
+
+    Returns:
+        The loaded model.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    rewriter = _Rewriter(buffer, size_threshold_bytes)
+    try:
+        proto = onnx.load_model_from_string(rewriter.rewrite_model())
+        model = serde.deserialize_model(proto, lazy=lazy)
+    finally:
+        rewriter.release()
+    for name, (offset, length) in rewriter.locations.items():
+        value = model.graph.initializers.get(name)
+        if value is None or not isinstance(value.const_value, serde.TensorProtoTensor):
+            continue
+        value.const_value = _mapped_tensor(buffer, offset, length, value.const_value)
+    # Close the mapping now if no tensor uses it
+    _mmap_cache.close_mapping(buffer)
+    return model
+
+
+def _write_length_delimited(f: BinaryIO, field_number: int, data) -> None:
+    """Write a length-delimited field whose value is the bytes-like data."""
+    f.write(_encode_tag(field_number, _LEN))
+    f.write(_encode_varint(len(data)))
+    f.write(data)
+
+
+def _write_tensor(
+    f: BinaryIO, field_number: int, tensor: _protocols.TensorProtocol, name: str | None
+) -> None:
+    """Write the tensor with the name of the value it is the const value of."""
+    if isinstance(tensor, (serde.TensorProtoTensor, _core.ExternalTensor, _core.StringTensor)):
+        # These tensors are either already in memory as protos or do not carry raw data
+        tensor_proto = serde.serialize_tensor(tensor)
+        if name:
+            tensor_proto.name = name
+        _write_length_delimited(f, field_number, tensor_proto.SerializeToString())
+        return
+    header = onnx.TensorProto()
+    if name:
+        header.name = name
+    if tensor.doc_string:
+        header.doc_string = tensor.doc_string
+    header.data_type = tensor.dtype.value
+    header.dims.extend(tensor.shape.numpy())
+    serde._serialize_metadata_props_into(header.metadata_props, tensor.metadata_props)  # pylint: disable=protected-access
+    header_bytes = header.SerializeToString()
+    data = _tensor_buffers.tensor_buffer(tensor)
+    raw_data_header = _encode_tag(_TENSOR_RAW_DATA, _LEN) + _encode_varint(len(data))
+    f.write(_encode_tag(field_number, _LEN))
+    f.write(_encode_varint(len(header_bytes) + len(raw_data_header) + len(data)))
+    f.write(header_bytes)
+    f.write(raw_data_header)
+    f.write(data)
+
+
+def _write_graph_fields(f: BinaryIO, graph: _protocols.GraphProtocol) -> None:
+    """Write the fields of the graph in the same way as :func:`serde.serialize_graph_into`."""
+    header = onnx.GraphProto()
+    if graph.name:
+        header.name = graph.name
+    if graph.doc_string:
+        header.doc_string = graph.doc_string
+    if graph.metadata_props:
+        serde._serialize_metadata_props_into(header.metadata_props, graph.metadata_props)  # pylint: disable=protected-access
+    f.write(header.SerializeToString())
+    for input_ in graph.inputs:
+        _write_length_delimited(
+            f, _GRAPH_INPUT, serde.serialize_value(input_).SerializeToString()
+        )
+    for initializer in graph.initializers.values():
+        if initializer.const_value is None:
+            # Skip initializers without constant values
+            logger.warning(
+                "Initializer '%s' does not have a constant value set.", initializer.name
+            )
+            continue
+        _write_tensor(f, _GRAPH_INITIALIZER, initializer.const_value, initializer.name)
+    for node in graph:
+        _write_length_delimited(f, _GRAPH_NODE, serde.serialize_node(node).SerializeToString())
+        for node_output in node.outputs:
+            if not serde._should_create_value_info_for_value(node_output):  # pylint: disable=protected-access
+                continue
+            if node_output.is_graph_output():
+                continue
+            _write_length_delimited(
+                f, _GRAPH_VALUE_INFO, serde.serialize_value(node_output).SerializeToString()
+            )
+    for output in graph.outputs:
+        _write_length_delimited(
+            f, _GRAPH_OUTPUT, serde.serialize_value(output).SerializeToString()
+        )
+
+
+def save_model(model: _core.Model, path: str | os.PathLike) -> None:
+    """Save a model in the binary protobuf format without building its ``ModelProto``.
+
+    The file is written incrementally, so the peak memory used is bounded by the largest
+    node or tensor instead of the whole model. The content is equivalent to
+    ``serde.serialize_model(model)``, although the order of the fields in the file may differ.
+
+    Args:
+        model: The model to save.
+        path: The path to save the model to.
+
+    Raises:
+        ValueError: If the serialized model exceeds the 2GB protobuf limit. The partially
+            written file is removed.
+    """
+    header = onnx.ModelProto()
+    serde._serialize_model_metadata_into(header, model)  # pylint: disable=protected-access
+    create_value_info_in_functions = (
+        model.ir_version >= serde._FUNCTION_VALUE_INFO_SUPPORTED_VERSION  # pylint: disable=protected-access
+    )
+    with open(path, "wb") as f:
+        f.write(header.SerializeToString())
+        f.write(_encode_tag(_MODEL_GRAPH, _LEN))
+        length_position = f.tell()
+        f.write(b"\0" * _LENGTH_PLACEHOLDER_SIZE)
+        graph_start = f.tell()
+        _write_graph_fields(f, model.graph)
+        if not create_value_info_in_functions:
+            # Create value info for functions in the main graph instead
+            for function in model.functions.values():
+                value_info = onnx.GraphProto()
+                serde._serialize_experimental_value_info_for_function_ir9_into(  # pylint: disable=protected-access
+                    value_info, function
+                )
+                f.write(value_info.SerializeToString())
+        graph_end = f.tell()
+        if graph_end <= _MAX_PROTOBUF_SIZE:
+            f.seek(length_position)
+            f.write(_encode_padded_varint(graph_end - graph_start, _LENGTH_PLACEHOLDER_SIZE))
+            f.seek(graph_end)
+            for function in model.functions.values():
+                function_proto = serde.serialize_function(
+                    function, create_value_info=create_value_info_in_functions
+                )
+                _write_length_delimited(
+                    f, _MODEL_FUNCTIONS, function_proto.SerializeToString()
+                )
+        size = f.tell()
+    if size > _MAX_PROTOBUF_SIZE:
+        os.remove(path)
+        raise ValueError(
+            f"The serialized model is larger than the 2GB protobuf limit ({size} bytes). "
+            "Save the initializers as external data instead."
+        )
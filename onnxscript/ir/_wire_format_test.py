@@ -0,0 +1,188 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import gc
+import mmap
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import ml_dtypes
+import numpy as np
+import onnx
+import onnx.parser
+
+from onnxscript import ir
+from onnxscript.ir import _tensor_buffers, _wire_format
+
+
+def _create_model(arrays: dict[str, np.ndarray]) -> ir.Model:
+    graph = ir.Graph([], [], nodes=[], opset_imports={"": 20})
+    for name, array in arrays.items():
+        tensor = ir.tensor(array, name=name)
+        value = ir.Value(
+            name=name, shape=tensor.shape, type=ir.TensorType(tensor.dtype), const_value=tensor
+        )
+        graph.register_initializer(value)
+        node = ir.Node("", "Identity", [value])
+        graph.append(node)
+        graph.outputs.append(node.outputs[0])
+    return ir.Model(graph, ir_version=10)
+
+
+class LoadModelTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "model.onnx")
+        self.arrays = {
+            "large_float": np.arange(1024, dtype=np.float32).reshape(32, 32),
+            "large_float16": np.arange(2048, dtype=np.float16),
+            "small_int": np.array([1, 2, 3], dtype=np.int64),
+        }
+        ir.save(_create_model(self.arrays), self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_large_initializers_are_views_into_the_mapped_file(self):
+        model = _wire_format.load_model(self.path)
+        for name in ("large_float", "large_float16"):
+            tensor = model.graph.initializers[name].const_value
+            self.assertIsInstance(tensor, ir.Tensor)
+            array = tensor.numpy()
+            self.assertFalse(array.flags.owndata)
+            self.assertFalse(array.flags.writeable)
+            np.testing.assert_array_equal(array, self.arrays[name])
+
+    def test_small_initializers_are_left_in_the_proto(self):
+        model = _wire_format.load_model(self.path)
+        tensor = model.graph.initializers["small_int"].const_value
+        self.assertIsInstance(tensor, ir.TensorProtoTensor)
+        np.testing.assert_array_equal(tensor.numpy(), self.arrays["small_int"])
+
+    def test_serialized_model_is_unchanged(self):
+        model = _wire_format.load_model(self.path)
+        self.assertEqual(ir.serde.serialize_model(model), onnx.load(self.path))
+
+    def _load_model_and_mappings(self, **kwargs) -> tuple[ir.Model, list[mmap.mmap]]:
+        mappings = []
+        create_mapping = mmap.mmap
+
+        def record_mapping(*args, **kwargs):
+            mappings.append(create_mapping(*args, **kwargs))
+            return mappings[-1]
+
+        with unittest.mock.patch.object(mmap, "mmap", side_effect=record_mapping):
+            model = _wire_format.load_model(self.path, **kwargs)
+        self.assertEqual(len(mappings), 1)
+        return model, mappings
+
+    def test_mapping_is_closed_when_the_model_is_garbage_collected(self):
+        model, (mapping,) = self._load_model_and_mappings()
+        array = model.graph.initializers["large_float"].const_value.numpy()
+        del model
+        gc.collect()
+        # An array obtained from a tensor keeps the mapping open
+        self.assertFalse(mapping.closed)
+        np.testing.assert_array_equal(array, self.arrays["large_float"])
+        del array
+        gc.collect()
+        self.assertTrue(mapping.closed)
+
+    def test_mapping_is_closed_with_the_tensors(self):
+        model, mappings = self._load_model_and_mappings()
+        for value in model.graph.initializers.values():
+            value.const_value = None
+        gc.collect()
+        self.assertTrue(mappings[0].closed)
+
+    def test_mapping_is_closed_when_no_initializer_is_mapped(self):
+        model, mappings = self._load_model_and_mappings(size_threshold_bytes=1 << 30)
+        self.assertTrue(mappings[0].closed)
+        np.testing.assert_array_equal(
+            model.graph.initializers["large_float"].const_value.numpy(),
+            self.arrays["large_float"],
+        )
+
+    def test_load_with_memory_map(self):
+        model = ir.load(self.path, memory_map=True)
+        np.testing.assert_array_equal(
+            model.graph.initializers["large_float"].const_value.numpy(),
+            self.arrays["large_float"],
+        )
+
+    def test_load_with_memory_map_raises_for_text_formats(self):
+        with self.assertRaises(ValueError):
+            ir.load(self.path, format="textproto", memory_map=True)
+
+
+class SaveModelTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "model.onnx")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_saved_model_is_the_same_as_the_serialized_model(self):
+        model = _create_model(
+            {
+                "float": np.arange(1024, dtype=np.float32).reshape(32, 32),
+                "bfloat16": np.arange(16, dtype=ml_dtypes.bfloat16),
+                "int4": np.array([1, -2, 3], dtype=ml_dtypes.int4),
+            }
+        )
+        model.graph.name = "main"
+        model.metadata_props["key"] = "value"
+        _wire_format.save_model(model, self.path)
+        self.assertEqual(onnx.load(self.path), ir.serde.serialize_model(model))
+
+    def test_saved_model_contains_functions(self):
+        proto = onnx.parser.parse_model(
+            """
+            <ir_version: 9, opset_import: ["" : 20, "custom" : 1]>
+            main (float[2] x) => (float[2] y) {
+                y = custom.Double(x)
+            }
+            <domain: "custom", opset_import: ["" : 20]>
+            Double (a) => (b) {
+                b = Add(a, a)
+            }
+            """
+        )
+        model = ir.serde.deserialize_model(proto)
+        model.functions[("custom", "Double", "")][0].outputs[0].dtype = ir.DataType.FLOAT
+        _wire_format.save_model(model, self.path)
+        self.assertEqual(onnx.load(self.path), ir.serde.serialize_model(model))
+
+    def test_ir_save_streams_the_binary_format(self):
+        model = _create_model({"float": np.arange(4, dtype=np.float32)})
+        with unittest.mock.patch.object(
+            _wire_format, "save_model", wraps=_wire_format.save_model
+        ) as save_model:
+            ir.save(model, self.path)
+        save_model.assert_called_once()
+        self.assertEqual(onnx.load(self.path), ir.serde.serialize_model(model))
+
+    def test_ir_save_uses_onnx_for_text_formats(self):
+        model = _create_model({"float": np.arange(4, dtype=np.float32)})
+        path = os.path.join(self.temp_dir.name, "model.textproto")
+        with unittest.mock.patch.object(_wire_format, "save_model") as save_model:
+            ir.save(model, path)
+        save_model.assert_not_called()
+        self.assertEqual(onnx.load(path, format="textproto"), ir.serde.serialize_model(model))
+
+    def test_tensor_buffer_does_not_copy_contiguous_arrays(self):
+        array = np.arange(8, dtype=np.float32)
+        buffer = _tensor_buffers.tensor_buffer(ir.tensor(array))
+        self.assertIsInstance(buffer, memoryview)
+        self.assertTrue(np.shares_memory(np.asarray(buffer), array))
+
+    def test_encode_padded_varint_is_decoded_as_the_value(self):
+        encoded = _wire_format._encode_padded_varint(300, 5)  # pylint: disable=protected-access
+        self.assertEqual(len(encoded), 5)
+        self.assertEqual(_wire_format._read_varint(encoded, 0), (300, 5))  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,717 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Whole-graph analyses: array-backed snapshots and memory estimation."""
+
+from __future__ import annotations
+
+__all__ = [
+    "BufferPlan",
+    "GraphSnapshot",
+    "MemoryEstimate",
+    "TensorLifetime",
+    "estimate_memory",
+    "memory_aware_order",
+    "memory_aware_sort",
+    "value_nbytes",
+]
+
+import dataclasses
+import heapq
+import itertools
+import math
+from typing import Iterable, Mapping, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from onnxscript.ir import _core, _enums, traversal
+
+GraphLike = Union[_core.Graph, _core.Function]
+
+
+def _csr(
+    rows: npt.NDArray[np.int64], columns: npt.NDArray[np.int32], num_rows: int
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]:
+    """Group the columns by row into a compressed sparse row structure."""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, columns[order]
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class GraphSnapshot:
+    """A frozen view of the nodes and values of a graph numbered with dense integer IDs.
+
+    The use-def relations are stored in NumPy arrays, so that whole-graph analyses
+    like liveness or reachability can be written as vectorized code on integer
+    arrays instead of loops over dictionaries keyed by :class:`~onnxscript.ir.Node`
+    and :class:`~onnxscript.ir.Value` objects.
+
+    Nodes are numbered in graph order. Values are numbered in the order of the graph
+    inputs, the initializers, then the node inputs and outputs as they are first
+    seen when visiting the nodes in graph order. Values captured from an outer scope
+    are included. Nodes of subgraphs are not.
+
+    The edges are stored in compressed sparse row (CSR) format: the IDs related to
+    row ``i`` are ``ids[indptr[i]:indptr[i + 1]]``. All arrays are read-only.
+
+    The snapshot does not follow later modifications of the graph. Create a new
+    snapshot after modifying it.
+
+    Attributes:
+        nodes: The nodes by ID.
+        values: The values by ID.
+        node_inputs_indptr: CSR row pointers of :attr:`node_inputs`.
+        node_inputs: The IDs of the inputs of each node. Missing optional inputs are -1.
+        node_outputs_indptr: CSR row pointers of :attr:`node_outputs`.
+        node_outputs: The IDs of the outputs of each node.
+        value_producers: The ID of the node producing each value, or -1 when the
+            value is not produced by a node of the graph.
+        value_consumers_indptr: CSR row pointers of :attr:`value_consumers`.
+        value_consumers: The IDs of the nodes using each value, once per use, in
+            graph order.
+        graph_inputs: The IDs of the graph inputs.
+        graph_outputs: The IDs of the graph outputs.
+        initializers: The IDs of the initializers.
+    """
+
+    __slots__ = (
+        "_node_ids",
+        "_value_ids",
+        "graph_inputs",
+        "graph_outputs",
+        "initializers",
+        "node_inputs",
+        "node_inputs_indptr",
+        "node_outputs",
+        "node_outputs_indptr",
+        "nodes",
+        "value_consumers",
+        "value_consumers_indptr",
+        "value_producers",
+        "values",
+    )
+
+    def __init__(self, graph: GraphLike) -> None:
+        """Create a snapshot of the graph in O(#nodes + #values) time."""
+        value_ids: dict[_core.Value, int] = {}
+
+        def value_id(value: _core.Value) -> int:
+            if (id_ := value_ids.get(value)) is None:
+                id_ = value_ids[value] = len(value_ids)
+            return id_
+
+        graph_inputs = [value_id(value) for value in graph.inputs]
+        initializers = (
+            [value_id(value) for value in graph.initializers.values()]
+            if isinstance(graph, _core.Graph)
+            else []
+        )
+        nodes = tuple(graph)
+        node_inputs: list[int] = []
+        node_inputs_lengths: list[int] = []
+        node_outputs: list[int] = []
+        node_outputs_lengths: list[int] = []
+        for node in nodes:
+            inputs = node.inputs
+            node_inputs.extend(-1 if value is None else value_id(value) for value in inputs)
+            node_inputs_lengths.append(len(inputs))
+            outputs = node.outputs
+            node_outputs.extend(value_id(value) for value in outputs)
+            node_outputs_lengths.append(len(outputs))
+        graph_outputs = [value_id(value) for value in graph.outputs]
+
+        num_nodes = len(nodes)
+        num_values = len(value_ids)
+        self.nodes: tuple[_core.Node, ...] = nodes
+        self.values: tuple[_core.Value, ...] = tuple(value_ids)
+        self._node_ids = {node: i for i, node in enumerate(nodes)}
+        self._value_ids = value_ids
+
+        self.node_inputs = np.array(node_inputs, dtype=np.int32)
+        self.node_inputs_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(node_inputs_lengths, out=self.node_inputs_indptr[1:])
+        self.node_outputs = np.array(node_outputs, dtype=np.int32)
+        self.node_outputs_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(node_outputs_lengths, out=self.node_outputs_indptr[1:])
+
+        node_of_input = np.repeat(
+            np.arange(num_nodes, dtype=np.int32), np.diff(self.node_inputs_indptr)
+        )
+        node_of_output = np.repeat(
+            np.arange(num_nodes, dtype=np.int32), np.diff(self.node_outputs_indptr)
+        )
+        self.value_producers = np.full(num_values, -1, dtype=np.int32)
+        self.value_producers[self.node_outputs] = node_of_output
+        present = self.node_inputs >= 0
+        self.value_consumers_indptr, self.value_consumers = _csr(
+            self.node_inputs[present].astype(np.int64), node_of_input[present], num_values
+        )
+
+        self.graph_inputs = np.array(graph_inputs, dtype=np.int32)
+        self.graph_outputs = np.array(graph_outputs, dtype=np.int32)
+        self.initializers = np.array(initializers, dtype=np.int32)
+        for name in (
+            "node_inputs",
+            "node_inputs_indptr",
+            "node_outputs",
+            "node_outputs_indptr",
+            "value_producers",
+            "value_consumers",
+            "value_consumers_indptr",
+            "graph_inputs",
+            "graph_outputs",
+            "initializers",
+        ):
+            _read_only(getattr(self, name))
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(num_nodes={len(self.nodes)}, "
+            f"num_values={len(self.values)})"
+        )
+
+    def node_id(self, node: _core.Node) -> int:
+        """Return the ID of a node.
+
+        Raises:
+            KeyError: If the node is not in the snapshot.
+        """
+        return self._node_ids[node]
+
+    def value_id(self, value: _core.Value) -> int:
+        """Return the ID of a value.
+
+        Raises:
+            KeyError: If the value is not in the snapshot.
+        """
+        return self._value_ids[value]
+
+    def num_uses(self) -> npt.NDArray[np.int64]:
+        """Return the number of uses of each value by the nodes of the graph."""
+        return np.diff(self.value_consumers_indptr)
+
+    def reachable_nodes(
+        self, nodes: npt.ArrayLike, *, backward: bool = False
+    ) -> npt.NDArray[np.bool_]:
+        """Return a mask of the nodes reachable from the given nodes through their values.
+
+        The given nodes are included.
+
+        Args:
+            nodes: The IDs of the nodes to start from.
+            backward: When True, follow the edges from consumers to producers instead.
+
+        Returns:
+            A boolean array indexed by node ID.
+        """
+        if backward:
+            indptr, edges = self.node_inputs_indptr, self.node_inputs
+        else:
+            indptr, edges = self.node_outputs_indptr, self.node_outputs
+        reached = np.zeros(len(self.nodes), dtype=np.bool_)
+        frontier = np.unique(np.asarray(nodes, dtype=np.int64))
+        reached[frontier] = True
+        while frontier.size:
+            values = _gather(indptr, edges, frontier)
+            if backward:
+                values = values[values >= 0]
+                next_nodes = self.value_producers[values]
+                next_nodes = next_nodes[next_nodes >= 0]
+            else:
+                next_nodes = _gather(self.value_consumers_indptr, self.value_consumers, values)
+            next_nodes = np.unique(next_nodes)
+            frontier = next_nodes[~reached[next_nodes]]
+            reached[frontier] = True
+        return reached
+
+
+def _gather(
+    indptr: npt.NDArray[np.int64], ids: np.ndarray, rows: np.ndarray
+) -> npt.NDArray[np.int32]:
+    """Concatenate the CSR rows of the given row IDs."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=ids.dtype)
+    # Offsets of each element relative to the start of its row
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return ids[np.repeat(starts, lengths) + offsets]
+
+
+def value_nbytes(
+    value: _core.Value, dim_values: Mapping[str, int] | None = None
+) -> int | None:
+    """Return the size in bytes of the tensor of a value from its type and shape.
+
+    Args:
+        value: The value.
+        dim_values: The sizes of the symbolic dimensions by name.
+
+    Returns:
+        The size in bytes, or None when the value is not a tensor, or when its type,
+        its shape or the size of one of its symbolic dimensions is unknown.
+    """
+    if not isinstance(value.type, _core.TensorType) or (shape := value.shape) is None:
+        return None
+    num_elements = 1
+    for dim in shape:
+        if isinstance(dim, int):
+            num_elements *= dim
+            continue
+        if dim_values is None or dim.value is None or dim.value not in dim_values:
+            return None
+        num_elements *= dim_values[dim.value]
+    return math.ceil(num_elements * value.type.dtype.itemsize)
+
+
+@dataclasses.dataclass
+class TensorLifetime:
+    """The steps of a schedule during which the tensor of a value is alive.
+
+    Attributes:
+        value: The value.
+        nbytes: The size of the tensor in bytes, or None when it is unknown.
+        start: The step producing the value. Graph inputs start at step 0.
+        end: The last step using the value, inclusive. Graph outputs are alive
+            until the last step.
+    """
+
+    value: _core.Value
+    nbytes: int | None
+    start: int
+    end: int
+
+
+@dataclasses.dataclass
+class BufferPlan:
+    """An assignment of intermediate tensors to reusable buffers.
+
+    Attributes:
+        buffer_sizes: The size in bytes of each buffer.
+        assignment: The index of the buffer of each planned value.
+        unplanned_bytes: The total size of the planned tensors if every tensor
+            had its own buffer.
+    """
+
+    buffer_sizes: list[int]
+    assignment: dict[_core.Value, int] = dataclasses.field(repr=False)
+    unplanned_bytes: int
+
+    @property
+    def total_bytes(self) -> int:
+        """The total size of the buffers in bytes."""
+        return sum(self.buffer_sizes)
+
+
+@dataclasses.dataclass
+class MemoryEstimate:
+    """The memory used by the activations of a graph when run in a given order.
+
+    The activations are the graph inputs and the outputs of the nodes. Initializers
+    are not included. Nodes run one at a time: the inputs and outputs of a node are
+    alive together during its step.
+
+    Attributes:
+        order: The nodes in the order of the steps.
+        lifetimes: The lifetime of each activation.
+        live_bytes: The total size of the tensors alive at each step.
+        peak_bytes: The largest total size of the tensors alive at a step.
+        peak_step: The first step reaching :attr:`peak_bytes`.
+        unknown_values: The activations of unknown sizes. They are counted as 0 bytes.
+    """
+
+    order: tuple[_core.Node, ...] = dataclasses.field(repr=False)
+    lifetimes: dict[_core.Value, TensorLifetime] = dataclasses.field(repr=False)
+    live_bytes: list[int] = dataclasses.field(repr=False)
+    peak_bytes: int
+    peak_step: int
+    unknown_values: tuple[_core.Value, ...] = dataclasses.field(repr=False)
+
+    def top_contributors(self, k: int = 10) -> list[TensorLifetime]:
+        """Return the ``k`` largest tensors alive at the peak, largest first."""
+        alive = [
+            lifetime
+            for lifetime in self.lifetimes.values()
+            if lifetime.nbytes and lifetime.start <= self.peak_step <= lifetime.end
+        ]
+        return heapq.nlargest(k, alive, key=lambda lifetime: lifetime.nbytes or 0)
+
+    def plan_buffers(self) -> BufferPlan:
+        """Suggest buffers for the intermediate tensors to reuse memory.
+
+        Tensors whose lifetimes do not overlap may share a buffer. Graph inputs and
+        outputs, and tensors of unknown or zero sizes, are not planned. The plan is
+        computed greedily in order of the steps, reusing the smallest free buffer
+        large enough for a tensor, or growing the largest free buffer when none is.
+        """
+        graph_values = {
+            lifetime.value
+            for lifetime in self.lifetimes.values()
+            if lifetime.value.producer() is None or lifetime.value.is_graph_output()
+        }
+        planned = sorted(
+            (
+                lifetime
+                for lifetime in self.lifetimes.values()
+                if lifetime.nbytes and lifetime.value not in graph_values
+            ),
+            key=lambda lifetime: (lifetime.start, -(lifetime.nbytes or 0)),
+        )
+        buffer_sizes: list[int] = []
+        assignment: dict[_core.Value, int] = {}
+        # (end of the lifetime of the current tensor, buffer index)
+        busy: list[tuple[int, int]] = []
+        free: list[int] = []
+        for lifetime in planned:
+            nbytes = lifetime.nbytes
+            assert nbytes is not None
+            while busy and busy[0][0] < lifetime.start:
+                free.append(heapq.heappop(busy)[1])
+            fitting = [buffer for buffer in free if buffer_sizes[buffer] >= nbytes]
+            if fitting:
+                buffer = min(fitting, key=lambda buffer: (buffer_sizes[buffer], buffer))
+            elif free:
+                buffer = max(free, key=lambda buffer: (buffer_sizes[buffer], -buffer))
+                buffer_sizes[buffer] = nbytes
+            else:
+                buffer = len(buffer_sizes)
+                buffer_sizes.append(nbytes)
+            if free and buffer in free:
+                free.remove(buffer)
+            assignment[lifetime.value] = buffer
+            heapq.heappush(busy, (lifetime.end, buffer))
+        return BufferPlan(
+            buffer_sizes=buffer_sizes,
+            assignment=assignment,
+            unplanned_bytes=sum(lifetime.nbytes or 0 for lifetime in planned),
+        )
+
+
+def _activations(graph: GraphLike) -> list[_core.Value]:
+    """Return the graph inputs that are not initializers and the outputs of the nodes."""
+    initializers = graph.initializers if isinstance(graph, _core.Graph) else {}
+    activations = [
+        value
+        for value in graph.inputs
+        if value.name is None or initializers.get(value.name) is not value
+    ]
+    for node in graph:
+        activations.extend(node.outputs)
+    return activations
+
+
+def _used_values(
+    graph: GraphLike, activations: Iterable[_core.Value]
+) -> dict[_core.Node, list[_core.Value]]:
+    """Return the activations used by each node, including the ones used by its subgraphs."""
+    tracked = set(activations)
+    used_values: dict[_core.Node, list[_core.Value]] = {}
+    for node in graph:
+        used = dict.fromkeys(value for value in node.inputs if value in tracked)
+        for attr in node.attributes.values():
+            if not isinstance(attr, _core.Attr) or attr.type not in (
+                _enums.AttributeType.GRAPH,
+                _enums.AttributeType.GRAPHS,
+            ):
+                continue
+            subgraphs = [attr.value] if attr.type == _enums.AttributeType.GRAPH else attr.value
+            for subgraph in subgraphs:
+                for subgraph_node in traversal.RecursiveGraphIterator(subgraph):
+                    used.update(
+                        dict.fromkeys(
+                            value for value in subgraph_node.inputs if value in tracked
+                        )
+                    )
+        used_values[node] = list(used)
+    return used_values
+
+
+def estimate_memory(
+    graph: GraphLike,
+    dim_values: Mapping[str, int] | None = None,
+    *,
+    order: Sequence[_core.Node] | None = None,
+) -> MemoryEstimate:
+    """Estimate the memory used by the activations of a graph in O(#nodes + #values) time.
+
+    The sizes of the tensors are computed from the types and shapes of the values.
+    Values captured by subgraphs are kept alive until the step of the node owning
+    the subgraph. The memory used inside subgraphs is not included.
+
+    Args:
+        graph: The graph or function.
+        dim_values: The sizes of the symbolic dimensions by name.
+        order: The order to run the nodes in. Defaults to the order of the graph.
+
+    Returns:
+        The memory estimate.
+
+    Raises:
+        ValueError: If the order does not contain the nodes of the graph, or if a node
+            runs before a node producing one of its inputs.
+    """
+    nodes = tuple(graph)
+    order = nodes if order is None else tuple(order)
+    step_of = {node: step for step, node in enumerate(order)}
+    if len(step_of) != len(order) or set(nodes) != step_of.keys():
+        raise ValueError("The order must contain every node of the graph exactly once.")
+    num_steps = len(order)
+    last_step = max(num_steps - 1, 0)
+
+    activations = _activations(graph)
+    lifetimes: dict[_core.Value, TensorLifetime] = {}
+    for value in activations:
+        producer = value.producer()
+        start = step_of[producer] if producer is not None and producer in step_of else 0
+        lifetimes[value] = TensorLifetime(value, value_nbytes(value, dim_values), start, start)
+    for node, used in _used_values(graph, activations).items():
+        step = step_of[node]
+        for value in used:
+            lifetime = lifetimes[value]
+            if lifetime.start > step or (lifetime.start == step and value.producer() is node):
+                raise ValueError(
+                    f"Node {node.name!r} runs before the producer of its input {value.name!r}."
+                )
+            lifetime.end = max(lifetime.end, step)
+    for value in graph.outputs:
+        if (lifetime := lifetimes.get(value)) is not None:
+            lifetime.end = last_step
+
+    # Add the size of each tensor at its first step and remove it after its last step
+    deltas = [0] * (last_step + 2)
+    for lifetime in lifetimes.values():
+        if lifetime.nbytes:
+            deltas[lifetime.start] += lifetime.nbytes
+            deltas[lifetime.end + 1] -= lifetime.nbytes
+    live_bytes = list(itertools.accumulate(deltas[:-1]))
+    peak_bytes = max(live_bytes)
+    return MemoryEstimate(
+        order=order,
+        lifetimes=lifetimes,
+        live_bytes=live_bytes,
+        peak_bytes=peak_bytes,
+        peak_step=live_bytes.index(peak_bytes),
+        unknown_values=tuple(
+            lifetime.value for lifetime in lifetimes.values() if lifetime.nbytes is None
+        ),
+    )
+
+
+# The number of best ranked ready nodes evaluated at each step with a lookahead
+_LOOKAHEAD_CANDIDATES = 8
+
+
+class _Scheduler:
+    """The state of a node schedule being built, to order nodes by their memory use."""
+
+    def __init__(self, graph: GraphLike, dim_values: Mapping[str, int] | None) -> None:
+        self.nodes = tuple(graph)
+        self.index_of = {node: i for i, node in enumerate(self.nodes)}
+        activations = _activations(graph)
+        self.nbytes = {value: value_nbytes(value, dim_values) or 0 for value in activations}
+        self.used_values = _used_values(graph, activations)
+        self.graph_outputs = set(graph.outputs)
+
+        self.consumers: dict[_core.Value, list[_core.Node]] = {
+            value: [] for value in activations
+        }
+        self.num_predecessors = dict.fromkeys(self.nodes, 0)
+        self.successors: dict[_core.Node, list[_core.Node]] = {node: [] for node in self.nodes}
+        for node, used in self.used_values.items():
+            for value in used:
+                self.consumers[value].append(node)
+                producer = value.producer()
+                if producer is not None and producer in self.index_of:
+                    self.num_predecessors[node] += 1
+                    self.successors[producer].append(node)
+        self.remaining_consumers = {
+            value: len(users) for value, users in self.consumers.items()
+        }
+        self.ready = {node: None for node in self.nodes if self.num_predecessors[node] == 0}
+        self.live_bytes = sum(
+            self.nbytes[value] for value in activations if value.producer() is None
+        )
+
+    def _is_freed(self, value: _core.Value) -> bool:
+        return self.remaining_consumers[value] == 0 and value not in self.graph_outputs
+
+    def score(self, node: _core.Node) -> int:
+        """Return the change of the live bytes when running the node."""
+        allocated = sum(
+            self.nbytes[value]
+            for value in node.outputs
+            if self.consumers[value] or value in self.graph_outputs
+        )
+        freed = sum(
+            self.nbytes[value]
+            for value in self.used_values[node]
+            if self.remaining_consumers[value] == 1 and value not in self.graph_outputs
+        )
+        return allocated - freed
+
+    def rank(self, node: _core.Node) -> tuple[int, int]:
+        return self.score(node), self.index_of[node]
+
+    def run(self, node: _core.Node) -> int:
+        """Run a ready node and return the live bytes during its step."""
+        del self.ready[node]
+        step_bytes = self.live_bytes + sum(self.nbytes[value] for value in node.outputs)
+        self.live_bytes = step_bytes
+        for value in self.used_values[node]:
+            self.remaining_consumers[value] -= 1
+            if self._is_freed(value):
+                self.live_bytes -= self.nbytes[value]
+        for value in node.outputs:
+            if self._is_freed(value):
+                self.live_bytes -= self.nbytes[value]
+        for successor in self.successors[node]:
+            self.num_predecessors[successor] -= 1
+            if self.num_predecessors[successor] == 0:
+                self.ready[successor] = None
+        return step_bytes
+
+    def undo(self, node: _core.Node, live_bytes: int) -> None:
+        """Revert :meth:`run`, given the live bytes before running the node."""
+        for successor in self.successors[node]:
+            if self.num_predecessors[successor] == 0:
+                del self.ready[successor]
+            self.num_predecessors[successor] += 1
+        for value in self.used_values[node]:
+            self.remaining_consumers[value] += 1
+        self.ready[node] = None
+        self.live_bytes = live_bytes
+
+    def greedy_order(self) -> list[_core.Node]:
+        """Run the ready node increasing the live bytes the least at each step."""
+        scores: dict[_core.Node, int] = {}
+        heap: list[tuple[int, int, _core.Node]] = []
+
+        def push(node: _core.Node) -> None:
+            scores[node] = self.score(node)
+            heapq.heappush(heap, (scores[node], self.index_of[node], node))
+
+        for node in self.ready:
+            push(node)
+        order: list[_core.Node] = []
+        scheduled: set[_core.Node] = set()
+        while heap:
+            node_score, _, node = heapq.heappop(heap)
+            if node in scheduled or node_score != scores[node]:
+                # Outdated entry of a node whose score changed
+                continue
+            self.run(node)
+            order.append(node)
+            scheduled.add(node)
+            for value in self.used_values[node]:
+                if self.remaining_consumers[value] == 1:
+                    # The last consumer now frees the value
+                    (last,) = (user for user in self.consumers[value] if user not in scheduled)
+                    if last in self.ready:
+                        push(last)
+            for successor in self.successors[node]:
+                if successor in self.ready and successor not in scores:
+                    push(successor)
+        return order
+
+    def lookahead_order(self, lookahead: int) -> list[_core.Node]:
+        """Run the node minimizing the peak of the next steps when followed greedily."""
+        order: list[_core.Node] = []
+        while self.ready:
+            candidates = heapq.nsmallest(_LOOKAHEAD_CANDIDATES, self.ready, key=self.rank)
+            best = min(candidates, key=lambda node: self._evaluate(node, lookahead))
+            self.run(best)
+            order.append(best)
+        return order
+
+    def _evaluate(self, node: _core.Node, lookahead: int) -> tuple[int, int, int, int]:
+        """Return the peak and the final live bytes of a greedy schedule starting with node."""
+        rank = self.rank(node)
+        trail = [(node, self.live_bytes)]
+        peak = self.run(node)
+        for _ in range(lookahead - 1):
+            if not self.ready:
+                break
+            next_node = min(self.ready, key=self.rank)
+            trail.append((next_node, self.live_bytes))
+            peak = max(peak, self.run(next_node))
+        live_bytes = self.live_bytes
+        for trail_node, trail_live_bytes in reversed(trail):
+            self.undo(trail_node, trail_live_bytes)
+        return (peak, live_bytes, *rank)
+
+
+def memory_aware_order(
+    graph: GraphLike, dim_values: Mapping[str, int] | None = None, *, lookahead: int = 1
+) -> list[_core.Node]:
+    """Return a topological order of the nodes chosen to reduce the peak memory.
+
+    With the default ``lookahead`` of 1, the order is built greedily: among the nodes
+    whose inputs are available, the node increasing the live memory the least is run
+    first, counting the outputs it allocates and the inputs it is the last node to
+    use. With a larger ``lookahead``, the best ranked available nodes are each
+    followed by ``lookahead - 1`` greedy steps, and the node leading to the lowest
+    peak over these steps is run first. This avoids some of the traps of the greedy
+    order, like delaying a node that allocates a tensor but lets several others be
+    freed, at the cost of a slower ordering.
+
+    Ties are broken by the order of the graph, so the result is deterministic. The
+    nodes of subgraphs are not reordered.
+
+    Args:
+        graph: The graph or function.
+        dim_values: The sizes of the symbolic dimensions by name.
+        lookahead: The number of steps simulated to choose each node.
+
+    Returns:
+        The nodes of the graph in the new order.
+
+    Raises:
+        ValueError: If the graph contains a cycle, or if ``lookahead`` is less than 1.
+    """
+    if lookahead < 1:
+        raise ValueError(f"lookahead must be at least 1, got {lookahead}")
+    scheduler = _Scheduler(graph, dim_values)
+    if lookahead == 1:
+        order = scheduler.greedy_order()
+    else:
+        order = scheduler.lookahead_order(lookahead)
+    if len(order) != len(scheduler.nodes):
+        raise ValueError("Graph contains a cycle, topological sort is not possible.")
+    return order
+
+
+def memory_aware_sort(
+    graph: GraphLike, dim_values: Mapping[str, int] | None = None, *, lookahead: int = 1
+) -> MemoryEstimate:
+    """Reorder the nodes of a graph to reduce its peak memory.
+
+    The order of :func:`memory_aware_order` is applied only when its estimated peak
+    is lower than the peak of the current order.
+
+    Args:
+        graph: The graph or function.
+        dim_values: The sizes of the symbolic dimensions by name.
+        lookahead: The number of steps simulated to choose each node. See
+            :func:`memory_aware_order`.
+
+    Returns:
+        The memory estimate of the resulting order.
+
+    Raises:
+        ValueError: If the graph contains a cycle, or if ``lookahead`` is less than 1.
+    """
+    current = estimate_memory(graph, dim_values)
+    reordered = estimate_memory(
+        graph, dim_values, order=memory_aware_order(graph, dim_values, lookahead=lookahead)
+    )
+    if reordered.peak_bytes >= current.peak_bytes:
+        return current
+    graph.extend(reordered.order)
+    return reordered
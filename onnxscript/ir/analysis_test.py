@@ -0,0 +1,204 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+import onnx.parser
+
+from onnxscript import ir
+from onnxscript.ir import analysis
+
+
+class GraphSnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.graph = ir.serde.deserialize_graph(
+            onnx.parser.parse_graph(
+                """
+                main (float[N] x, float[N] y) => (float[N] z, float[N] w)
+                <float[1] c = {1.0}>
+                {
+                    a = Add(x, c)
+                    b = Mul(a, a)
+                    z = Sub(b, y)
+                    w = Relu(y)
+                    unused = Neg(x)
+                }
+                """
+            )
+        )
+        self.snapshot = self.graph.snapshot()
+
+    def test_nodes_and_values_are_numbered_densely(self):
+        snapshot = self.snapshot
+        self.assertEqual(snapshot.nodes, tuple(self.graph))
+        self.assertEqual(len(snapshot.values), 8)
+        for i, node in enumerate(self.graph):
+            self.assertEqual(snapshot.node_id(node), i)
+        for i, value in enumerate(snapshot.values):
+            self.assertEqual(snapshot.value_id(value), i)
+        self.assertEqual([snapshot.values[i].name for i in snapshot.graph_inputs], ["x", "y"])
+        self.assertEqual([snapshot.values[i].name for i in snapshot.initializers], ["c"])
+        self.assertEqual([snapshot.values[i].name for i in snapshot.graph_outputs], ["z", "w"])
+
+    def test_edges_match_the_graph(self):
+        snapshot = self.snapshot
+        for node_id, node in enumerate(snapshot.nodes):
+            inputs = snapshot.node_inputs[
+                snapshot.node_inputs_indptr[node_id] : snapshot.node_inputs_indptr[node_id + 1]
+            ]
+            self.assertEqual([snapshot.values[i] for i in inputs], list(node.inputs))
+            outputs = snapshot.node_outputs[
+                snapshot.node_outputs_indptr[node_id] : snapshot.node_outputs_indptr[
+                    node_id + 1
+                ]
+            ]
+            self.assertEqual([snapshot.values[i] for i in outputs], list(node.outputs))
+        for value_id, value in enumerate(snapshot.values):
+            producer = snapshot.value_producers[value_id]
+            self.assertIs(
+                snapshot.nodes[producer] if producer >= 0 else None, value.producer()
+            )
+            consumers = snapshot.value_consumers[
+                snapshot.value_consumers_indptr[value_id] : snapshot.value_consumers_indptr[
+                    value_id + 1
+                ]
+            ]
+            self.assertEqual(
+                [snapshot.nodes[i] for i in consumers], [node for node, _ in value.uses()]
+            )
+        np.testing.assert_array_equal(
+            snapshot.num_uses(), [value.num_uses() for value in snapshot.values]
+        )
+
+    def test_arrays_are_read_only(self):
+        with self.assertRaises(ValueError):
+            self.snapshot.value_producers[0] = 1
+
+    def test_reachable_nodes(self):
+        snapshot = self.snapshot
+        add = snapshot.node_id(self.graph.node(0))
+        np.testing.assert_array_equal(
+            snapshot.reachable_nodes([add]), [True, True, True, False, False]
+        )
+        sub = snapshot.node_id(self.graph.node(2))
+        np.testing.assert_array_equal(
+            snapshot.reachable_nodes([sub], backward=True), [True, True, True, False, False]
+        )
+        np.testing.assert_array_equal(
+            snapshot.reachable_nodes([]), [False, False, False, False, False]
+        )
+
+
+class MemoryEstimateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Two branches each producing a large tensor reduced to a small one
+        self.graph = ir.serde.deserialize_graph(
+            onnx.parser.parse_graph(
+                """
+                main (float[N] x) => (float[N] e)
+                <float[N, 100] a, float[N, 100] b, float[N] c, float[N] d, float[1] w = {1.0}>
+                {
+                    a = Expand(x, w)
+                    b = Expand(x, w)
+                    c = ReduceSum(a)
+                    d = ReduceSum(b)
+                    e = Add(c, d)
+                }
+                """
+            )
+        )
+        self.values = {node.outputs[0].name: node.outputs[0] for node in self.graph}
+        self.values["x"] = self.graph.inputs[0]
+
+    def test_value_nbytes(self):
+        self.assertEqual(analysis.value_nbytes(self.values["a"], {"N": 10}), 4000)
+        self.assertIsNone(analysis.value_nbytes(self.values["a"]))
+        self.assertIsNone(analysis.value_nbytes(self.values["a"], {"M": 10}))
+        self.assertIsNone(analysis.value_nbytes(ir.Value(name="untyped")))
+
+    def test_estimate_memory(self):
+        estimate = analysis.estimate_memory(self.graph, {"N": 10})
+        self.assertEqual(estimate.live_bytes, [4040, 8040, 8040, 4080, 120])
+        self.assertEqual(estimate.peak_bytes, 8040)
+        self.assertEqual(estimate.peak_step, 1)
+        self.assertEqual(estimate.unknown_values, ())
+        lifetime = estimate.lifetimes[self.values["a"]]
+        self.assertEqual((lifetime.nbytes, lifetime.start, lifetime.end), (4000, 0, 2))
+        self.assertEqual(
+            [lifetime.value.name for lifetime in estimate.top_contributors(2)], ["a", "b"]
+        )
+
+    def test_estimate_memory_counts_unknown_sizes_as_zero(self):
+        estimate = analysis.estimate_memory(self.graph)
+        self.assertEqual(estimate.peak_bytes, 0)
+        self.assertEqual(len(estimate.unknown_values), 6)
+
+    def test_estimate_memory_raises_when_order_is_not_topological(self):
+        with self.assertRaisesRegex(ValueError, "before the producer"):
+            analysis.estimate_memory(self.graph, order=list(reversed(self.graph)))
+        with self.assertRaisesRegex(ValueError, "every node"):
+            analysis.estimate_memory(self.graph, order=[self.graph.node(0)])
+
+    def test_values_captured_by_subgraphs_are_alive_until_the_node_owning_them(self):
+        graph = ir.serde.deserialize_graph(
+            onnx.parser.parse_graph(
+                """
+                main (bool cond, float[N] x) => (float[N] z)
+                {
+                    y = Relu(x)
+                    t = Neg(x)
+                    z = If (cond) <
+                        then_branch = g1 () => (float[N] y_out) { y_out = Identity(y) },
+                        else_branch = g2 () => (float[N] t_out) { t_out = Identity(t) }
+                    >
+                }
+                """
+            )
+        )
+        estimate = analysis.estimate_memory(graph)
+        y = graph.node(0).outputs[0]
+        self.assertEqual(estimate.lifetimes[y].end, 2)
+
+    def test_plan_buffers_reuses_buffers_of_dead_tensors(self):
+        plan = analysis.estimate_memory(self.graph, {"N": 10}).plan_buffers()
+        names = {value.name: buffer for value, buffer in plan.assignment.items()}
+        # Graph inputs and outputs are not planned
+        self.assertEqual(names.keys(), {"a", "b", "c", "d"})
+        self.assertEqual(names["d"], names["a"])
+        self.assertEqual(plan.buffer_sizes, [4000, 4000, 40])
+        self.assertEqual(plan.total_bytes, 8040)
+        self.assertEqual(plan.unplanned_bytes, 8080)
+
+    def test_memory_aware_order_runs_branches_one_after_the_other(self):
+        order = analysis.memory_aware_order(self.graph, {"N": 10})
+        self.assertEqual([node.outputs[0].name for node in order], ["a", "c", "b", "d", "e"])
+        # The graph is not modified
+        self.assertEqual(
+            [node.outputs[0].name for node in self.graph], ["a", "b", "c", "d", "e"]
+        )
+
+    def test_memory_aware_order_with_lookahead_is_a_topological_order(self):
+        order = analysis.memory_aware_order(self.graph, {"N": 10}, lookahead=3)
+        self.assertEqual([node.outputs[0].name for node in order], ["a", "c", "b", "d", "e"])
+        with self.assertRaises(ValueError):
+            analysis.memory_aware_order(self.graph, lookahead=0)
+
+    def test_memory_aware_sort_reorders_the_graph_when_the_peak_is_reduced(self):
+        estimate = analysis.memory_aware_sort(self.graph, {"N": 10})
+        self.assertEqual(estimate.peak_bytes, 4080)
+        self.assertEqual(
+            [node.outputs[0].name for node in self.graph], ["a", "c", "b", "d", "e"]
+        )
+        self.assertEqual(analysis.estimate_memory(self.graph, {"N": 10}), estimate)
+
+    def test_memory_aware_sort_keeps_the_order_without_sizes(self):
+        analysis.memory_aware_sort(self.graph)
+        self.assertEqual(
+            [node.outputs[0].name for node in self.graph], ["a", "b", "c", "d", "e"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,15 +10,19 @@ __all__ = [
     "load_to_model",
     "convert_tensors_to_external",
     "convert_tensors_from_external",
+    "release_mapped_files",
 ]
 
+import concurrent.futures
+import contextlib
 import dataclasses
 import logging
 import os
-from typing import Iterator, Sequence
+import threading
+from typing import Hashable, Sequence
 
-from onnxscript.ir import _core, _enums, _protocols
-from onnxscript.ir import traversal as _traversal
+from onnxscript.ir import _core, _enums, _mmap_cache, _protocols, _tensor_buffers
+from onnxscript.ir import serde as _serde
 from onnxscript.ir._polyfill import zip
 
 # Note: If needed in future, add these as parameters to the function calls
@@ -29,6 +33,10 @@ _ALIGN_THRESHOLD = 1048576  # 1MB
 # allocation_granularity: The allocation Granularity for mmap() support. Typically 64KB for Windows & 4KB for other OSes.
 _ALLOCATION_GRANULARITY = 65536  # 64KB
 
+# os.pwrite is not available on Windows
+_HAS_PWRITE = hasattr(os, "pwrite")
+_SEEK_LOCK = threading.Lock()
+
 
 logger = logging.getLogger(__name__)
 
@@ -49,45 +57,90 @@ class _ExternalDataInfo:
     length: int
 
 
-def _all_tensors(
-    graph: _core.Graph | _core.GraphView, include_attributes: bool = False
-) -> Iterator[_protocols.TensorProtocol]:
-    """Iterate over all tensors in the graph.
+@dataclasses.dataclass
+class _ExternalDataFile:
+    """
+    A file that a group of tensors is to be stored in as external data.
+
+    Attributes:
+        path: The path to the file. For shards, this is relative to the ONNX file until the file is written.
+        tensors: The tensors stored in the file.
+        external_data_infos: External data information for each tensor, in the same order.
+    """
+
+    path: str | os.PathLike
+    tensors: list[_protocols.TensorProtocol]
+    external_data_infos: list[_ExternalDataInfo]
+
+
+def _shard_path(relative_path: str | os.PathLike, index: int) -> str:
+    """Return the path of the shard with the 0-based index, e.g. "model.data.00001"."""
+    return f"{os.fspath(relative_path)}.{index + 1:05d}"
 
-    Args:
-        graph: The graph to traverse tensors on.
-        include_attributes: Whether to include tensors in attributes.
 
-    Yields:
-        Tensors in the graph.
+def _stale_shard_paths(
+    base_dir: str | os.PathLike, relative_path: str | os.PathLike, num_shards: int
+) -> list[str]:
+    """Return the existing shard files of a previous save that are beyond the new shards.
+
+    Args:
+        base_dir: Path of base directory.
+        relative_path: Path of the external data, relative to :param:`base_dir`.
+        num_shards: The number of shards that are written. 0 when the data is not sharded.
     """
-    # Yield all tensors in initializers
-    for value in graph.initializers.values():
-        if value.const_value is not None:
-            yield value.const_value
-    if not include_attributes:
-        return
-    # Look at constant attributes in nodes
-    for node in _traversal.RecursiveGraphIterator(graph):
-        for attr in node.attributes.values():
-            if isinstance(attr, _core.RefAttr):
-                continue
-            if attr.type == _enums.AttributeType.TENSOR and attr.value is not None:
-                yield attr.value
-            elif attr.type == _enums.AttributeType.TENSORS and attr.value is not None:
-                yield from attr.value
+    stale_paths = []
+    index = num_shards
+    while os.path.exists(path := os.path.join(base_dir, _shard_path(relative_path, index))):
+        stale_paths.append(path)
+        index += 1
+    return stale_paths
 
 
 def set_base_dir(graph: _core.Graph | _core.GraphView, base_dir: str | os.PathLike) -> None:
-    """Set the base directory for external data in a graph.
+    """Set the base directory for external data in a graph and all its subgraphs.
+
+    Subgraphs that are not yet deserialized (see ``lazy`` in :func:`onnxscript.ir.load`)
+    are not decoded. They receive the base directory when they are first accessed.
 
     Args:
         graph: The graph to traverse tensors on.
         base_dir: The base directory. This is the directory where the ONNX file is.
     """
-    for tensor in _all_tensors(graph, include_attributes=True):
-        if isinstance(tensor, _core.ExternalTensor):
-            tensor.base_dir = base_dir
+    for value in graph.initializers.values():
+        if isinstance(value.const_value, _core.ExternalTensor):
+            value.const_value.base_dir = base_dir
+    for node in graph:
+        for attr in node.attributes.values():
+            if isinstance(attr, _core.RefAttr):
+                continue
+            if (
+                isinstance(attr, _serde._LazyGraphAttr)  # pylint: disable=protected-access
+                and not attr.is_materialized()
+            ):
+                attr.base_dir = base_dir
+            elif attr.type == _enums.AttributeType.TENSOR:
+                if isinstance(attr.value, _core.ExternalTensor):
+                    attr.value.base_dir = base_dir
+            elif attr.type == _enums.AttributeType.TENSORS:
+                for tensor in attr.value:
+                    if isinstance(tensor, _core.ExternalTensor):
+                        tensor.base_dir = base_dir
+            elif attr.type == _enums.AttributeType.GRAPH:
+                set_base_dir(attr.value, base_dir)
+            elif attr.type == _enums.AttributeType.GRAPHS:
+                for subgraph in attr.value:
+                    set_base_dir(subgraph, base_dir)
+
+
+def release_mapped_files() -> None:
+    """Close the memory mapped external data files that are not used by any tensor.
+
+    External tensors referring to the same file share one memory mapping. Mappings that
+    are no longer used by any tensor (see :meth:`onnxscript.ir.ExternalTensor.release`)
+    are kept open in a bounded cache for reuse. Call this function to close them, e.g.
+    before deleting or modifying the files.
+    """
+    _mmap_cache.MAPPED_FILES.clear()
 
 
 def _external_tensor_to_memory_tensor(
@@ -140,11 +193,15 @@ def _compute_new_offset(
 def _compute_external_data_info(
     tensor: _protocols.TensorProtocol,
     current_offset: int,
+    align_offset: bool = _ALIGN_OFFSET,
+    align_threshold: int = _ALIGN_THRESHOLD,
 ) -> _ExternalDataInfo:
     """Capture information about a tensor that is to be stored as external data."""
     tensor_size = tensor.nbytes
     # Calculate updated offset and align tensors
-    current_offset = _compute_new_offset(current_offset, tensor_size)
+    current_offset = _compute_new_offset(
+        current_offset, tensor_size, align_offset=align_offset, align_threshold=align_threshold
+    )
     # Store offset and tensor size as ExternalDataInfo
     external_data_info = _ExternalDataInfo(
         tensor.name,
@@ -154,10 +211,32 @@ def _compute_external_data_info(
     return external_data_info
 
 
+def _pwrite(fd: int, data, offset: int) -> None:
+    """Write all of the bytes-like data to the file descriptor at the offset."""
+    with memoryview(data) as view:
+        written = 0
+        while written < len(view):
+            if _HAS_PWRITE:
+                written += os.pwrite(fd, view[written:], offset + written)
+            else:
+                with _SEEK_LOCK:
+                    os.lseek(fd, offset + written, os.SEEK_SET)
+                    written += os.write(fd, view[written:])
+
+
+def _write_tensor_data(fd: int, tensor: _protocols.TensorProtocol, offset: int) -> None:
+    """Write the bytes of a tensor to the file descriptor without an intermediate copy."""
+    with _tensor_buffers.open_tensor_data(tensor) as data:
+        _pwrite(fd, data, offset)
+    if isinstance(tensor, _core.ExternalTensor):
+        tensor.release()
+
+
 def _write_external_data(
     tensors: Sequence[_protocols.TensorProtocol],
     external_data_infos: Sequence[_ExternalDataInfo],
     file_path: str | os.PathLike,
+    max_workers: int | None = None,
 ) -> None:
     """Write tensor data to an external file according to information stored in ExternalDataInfo objects.
 
@@ -165,22 +244,59 @@ def _write_external_data(
         tensors: Tensors to be written as external data.
         external_data_infos: External data information stored for each tensor to be written as external data.
         file_path: Location to which external data is to be stored.
+        max_workers: The maximum number of threads used to write the data. Use the default
+            of :class:`concurrent.futures.ThreadPoolExecutor` when None.
     """
-    assert len(tensors) == len(external_data_infos), (
-        "Number of tensors and external data infos should match"
+    _write_external_data_files(
+        [_ExternalDataFile(file_path, list(tensors), list(external_data_infos))],
+        max_workers=max_workers,
     )
-    with open(file_path, "wb") as data_file:
-        for tensor, tensor_info in zip(tensors, external_data_infos, strict=True):
-            current_offset = tensor_info.offset
-            assert tensor is not None
-            raw_data = tensor.tobytes()
-            if isinstance(tensor, _core.ExternalTensor):
-                tensor.release()
-            # Pad file to required offset if needed
-            file_size = data_file.tell()
-            if current_offset > file_size:
-                data_file.write(b"\0" * (current_offset - file_size))
-            data_file.write(raw_data)
+
+
+def _write_external_data_files(
+    data_files: Sequence[_ExternalDataFile], max_workers: int | None = None
+) -> None:
+    """Write tensor data to one or more external files.
+
+    Every file is first resized to its final size, which fills the alignment padding with
+    zeros. The tensors of all files are then written to their offsets from a single
+    thread pool.
+
+    Args:
+        data_files: The files to write.
+        max_workers: The maximum number of threads used to write the data. Use the default
+            of :class:`concurrent.futures.ThreadPoolExecutor` when None.
+    """
+    for data_file in data_files:
+        assert len(data_file.tensors) == len(data_file.external_data_infos), (
+            "Number of tensors and external data infos should match"
+        )
+    if not _HAS_PWRITE:
+        # Writes are serialized by a lock when pwrite is not available
+        max_workers = 1
+    with contextlib.ExitStack() as stack:
+        fds = []
+        for data_file in data_files:
+            # Close the cached mapping of the file so that it can be truncated
+            _mmap_cache.MAPPED_FILES.evict(data_file.path)
+            f = stack.enter_context(open(data_file.path, "wb"))
+            file_size = max(
+                (info.offset + info.length for info in data_file.external_data_infos),
+                default=0,
+            )
+            os.ftruncate(f.fileno(), file_size)
+            fds.append(f.fileno())
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_write_tensor_data, fd, tensor, tensor_info.offset)
+                for fd, data_file in zip(fds, data_files, strict=True)
+                for tensor, tensor_info in zip(
+                    data_file.tensors, data_file.external_data_infos, strict=True
+                )
+            ]
+            for future in futures:
+                # Raise any exception from the workers
+                future.result()
 
 
 def _create_external_tensor(
@@ -225,73 +341,182 @@ def convert_tensors_from_external(
     return [_external_tensor_to_memory_tensor(tensor) for tensor in tensors]
 
 
+def _assign_external_data_files(
+    tensors: Sequence[_protocols.TensorProtocol],
+    relative_path: str | os.PathLike,
+    *,
+    align_offset: bool,
+    align_threshold: int,
+    max_shard_size_bytes: int | None,
+    content_keys: Sequence[Hashable] | None = None,
+) -> tuple[list[_ExternalDataFile], list[tuple[_ExternalDataFile, _ExternalDataInfo]]]:
+    """Compute the file and offset of every tensor.
+
+    The tensors are placed in order. When :param:`max_shard_size_bytes` is set, a new
+    shard is started when the next tensor does not fit in the current one. A tensor larger
+    than the limit is placed in a shard of its own.
+
+    When :param:`content_keys` is provided, a tensor whose key was seen before reuses
+    the location of the first tensor with that key and is not added to any file.
+
+    Returns:
+        A tuple of the files to write and the (file, external data info) of each tensor.
+    """
+    if max_shard_size_bytes is None:
+        data_file = _ExternalDataFile(relative_path, [], [])
+    else:
+        data_file = _ExternalDataFile(_shard_path(relative_path, 0), [], [])
+    data_files = [data_file]
+    placements: list[tuple[_ExternalDataFile, _ExternalDataInfo]] = []
+    placed: dict[Hashable, tuple[_ExternalDataFile, _ExternalDataInfo]] = {}
+    current_offset = 0
+    for i, tensor in enumerate(tensors):
+        if content_keys is not None and content_keys[i] in placed:
+            placements.append(placed[content_keys[i]])
+            continue
+        external_info = _compute_external_data_info(
+            tensor, current_offset, align_offset=align_offset, align_threshold=align_threshold
+        )
+        if (
+            max_shard_size_bytes is not None
+            and data_file.tensors
+            and external_info.offset + external_info.length > max_shard_size_bytes
+        ):
+            data_file = _ExternalDataFile(_shard_path(relative_path, len(data_files)), [], [])
+            data_files.append(data_file)
+            external_info = _compute_external_data_info(
+                tensor, 0, align_offset=align_offset, align_threshold=align_threshold
+            )
+        data_file.tensors.append(tensor)
+        data_file.external_data_infos.append(external_info)
+        placements.append((data_file, external_info))
+        if content_keys is not None:
+            placed[content_keys[i]] = placements[-1]
+        current_offset = external_info.offset + external_info.length
+    return data_files, placements
+
+
+def _refers_to_any_file(
+    tensor: _protocols.TensorProtocol, paths: Sequence[str | os.PathLike]
+) -> bool:
+    if not isinstance(tensor, _core.ExternalTensor) or not os.path.exists(tensor.path):
+        return False
+    return any(os.path.samefile(path, tensor.path) for path in paths)
+
+
+def _invalidate_overwritten_tensor(tensor: _core.ExternalTensor) -> None:
+    # Mark the original external tensor as invalid because it is now pointing
+    # to a file that is going to be overwritten.
+    tensor.invalidate()
+    logger.warning(
+        "External tensor %s is referring to the same file as the destination path. "
+        "It has been invalidated because the data file is changed. To avoid this, "
+        "save the external data to a different path or load the newly saved model back "
+        "with ir.load().",
+        tensor,
+    )
+
+
 def convert_tensors_to_external(
     tensors: Sequence[_protocols.TensorProtocol],
     base_dir: str | os.PathLike,
     relative_path: str | os.PathLike,
+    *,
+    align_offset: bool = _ALIGN_OFFSET,
+    align_threshold: int = _ALIGN_THRESHOLD,
+    max_shard_size_bytes: int | None = None,
+    deduplicate: bool = False,
 ) -> list[_core.ExternalTensor]:
     """Convert a sequence of any TensorProtocol tensors to external tensors.
 
     Existing external tensors are loaded to memory if they are referring to the
-    same file path as the destination path.
+    same file path as the destination path. The data is written to the file in parallel.
+
+    When :param:`max_shard_size_bytes` is set, the data is split into shards named after
+    :param:`relative_path` with a 1-based index suffix, e.g. ``model.data.00001``,
+    ``model.data.00002``. Each shard holds at most :param:`max_shard_size_bytes` bytes
+    unless it contains a single tensor larger than the limit. Shards left over from a
+    previous save to the same path that are not overwritten are removed.
 
     Args:
         tensors: Tensors to be converted to external tensors. They can be external tensors themselves.
         base_dir: Path of base directory.
         relative_path: Path to which external data is to be stored, relative to the ONNX file.
+        align_offset: Whether to align the data of tensors larger than :param:`align_threshold`
+            to the page size and allocation granularity so that they can be memory mapped
+            efficiently.
+        align_threshold: Size in bytes above which the tensor data is aligned. Set to 0 to
+            align all tensors.
+        max_shard_size_bytes: The maximum size of an external data file. If None, all data
+            is stored in :param:`relative_path`.
+        deduplicate: Whether to store the data of tensors with identical content only once.
+            The external tensors of duplicates refer to the same location in the file.
+            Tensors with the same data type and size are hashed to find duplicates.
 
     Returns:
         A list of external tensors derived from a list of input tensors. The order
         should match the input tensor order.
-    """
-    path = os.path.join(base_dir, relative_path)
-
-    # Check if output path exists. Load pre-existing external data if it does.
-    if os.path.exists(path):
-        # Check if any tensor provided is using the destination file
-        new_tensors = []
-        for tensor in tensors:
-            if (
-                isinstance(tensor, _core.ExternalTensor)
-                and os.path.exists(tensor.path)
-                and os.path.samefile(path, tensor.path)
-            ):
-                # FIXME(shubhambhokare1): If there is a non-initializer tensor that
-                # is referring to this file, that tensor is now invalid.
-                # This is a special case we are ok not handling right now.
-                new_tensors.append(_external_tensor_to_memory_tensor(tensor))
-                # Mark the original external tensor as invalid because it is now pointing
-                # to a file that is going to be overwritten.
-                tensor.invalidate()
-                logger.warning(
-                    "External tensor %s is referring to the same file as the destination path. "
-                    "It has been invalidated because the data file is changed. To avoid this, "
-                    "save the external data to a different path or load the newly saved model back "
-                    "with ir.load().",
-                    tensor,
-                )
-            else:
-                new_tensors.append(tensor)
-        tensors = new_tensors
 
-    external_data_infos: list[_ExternalDataInfo] = []
+    Raises:
+        ValueError: If :param:`max_shard_size_bytes` is not positive.
+    """
+    if max_shard_size_bytes is not None and max_shard_size_bytes <= 0:
+        raise ValueError(f"max_shard_size_bytes must be positive, got {max_shard_size_bytes}.")
     # Sort all tensors based on tensor sizes, in order to avoid unnecessary alignment.
     # All the smaller tensors are written earlier and alignment is performed for the larger tensors.
     sorted_indices = sorted(range(len(tensors)), key=lambda i: tensors[i].nbytes)
     sorted_tensors = [tensors[i] for i in sorted_indices]
+    data_files, placements = _assign_external_data_files(
+        sorted_tensors,
+        relative_path,
+        align_offset=align_offset,
+        align_threshold=align_threshold,
+        max_shard_size_bytes=max_shard_size_bytes,
+        content_keys=_tensor_buffers.content_keys(sorted_tensors) if deduplicate else None,
+    )
 
-    # Compute external data information for each tensor and write to disk
-    current_offset = 0
-    for tensor in sorted_tensors:
-        external_info = _compute_external_data_info(tensor, current_offset)
-        external_data_infos.append(external_info)
-        current_offset = external_info.offset + external_info.length
-    _write_external_data(sorted_tensors, external_data_infos, path)
+    # Check if any output path exists. Load pre-existing external data if it does.
+    paths = [os.path.join(base_dir, data_file.path) for data_file in data_files]
+    # Shards of a previous save that are not overwritten are removed after writing
+    stale_paths = _stale_shard_paths(
+        base_dir, relative_path, len(data_files) if max_shard_size_bytes is not None else 0
+    )
+    existing_paths = [path for path in paths if os.path.exists(path)] + stale_paths
+    if existing_paths:
+        # Check if any tensor provided is using a destination file
+        for data_file in data_files:
+            for i, tensor in enumerate(data_file.tensors):
+                if not _refers_to_any_file(tensor, existing_paths):
+                    continue
+                # FIXME(shubhambhokare1): If there is a non-initializer tensor that
+                # is referring to this file, that tensor is now invalid.
+                # This is a special case we are ok not handling right now.
+                data_file.tensors[i] = _external_tensor_to_memory_tensor(tensor)
+                _invalidate_overwritten_tensor(tensor)  # type: ignore[arg-type]
+        # Duplicates are not written but are invalidated as well
+        for tensor in sorted_tensors:
+            if (
+                isinstance(tensor, _core.ExternalTensor)
+                and tensor.valid()
+                and _refers_to_any_file(tensor, existing_paths)
+            ):
+                _invalidate_overwritten_tensor(tensor)
+
+    # Write all files to disk
+    _write_external_data_files(
+        [
+            _ExternalDataFile(path, data_file.tensors, data_file.external_data_infos)
+            for path, data_file in zip(paths, data_files, strict=True)
+        ]
+    )
+    for path in stale_paths:
+        _mmap_cache.MAPPED_FILES.evict(path)
+        os.remove(path)
 
     # Create external tensor objects
     external_tensors: list[_core.ExternalTensor] = [
-        _create_external_tensor(tensor, external_info, base_dir, relative_path)
-        for tensor, external_info in zip(sorted_tensors, external_data_infos, strict=True)
+        _create_external_tensor(tensor, external_info, base_dir, data_file.path)
+        for tensor, (data_file, external_info) in zip(sorted_tensors, placements, strict=True)
     ]
 
     # Sort external_tensors based on original key order. So that it can match the input tensor order
@@ -334,8 +559,12 @@ def unload_from_model(
     relative_path: str | os.PathLike,
     *,
     size_threshold_bytes: int = 0,
+    align_offset: bool = _ALIGN_OFFSET,
+    align_threshold: int = _ALIGN_THRESHOLD,
+    max_shard_size_bytes: int | None = None,
+    deduplicate: bool = False,
 ) -> _core.Model:
-    """Convert all initializers equal or above size_threshold_bytes to external tensors in-place and save data to a single data file.
+    """Convert all initializers equal or above size_threshold_bytes to external tensors in-place and save data to a single data file or to shards.
 
     It should only replace the initializers in the model with external tensors
     and not make any other modifications to the model.
@@ -352,6 +581,14 @@ def unload_from_model(
         relative_path: Path to which external data is to be stored, relative to the ONNX file.
             E.g. "model.data"
         size_threshold_bytes: Save to external data if the tensor size in bytes is larger than this threshold.
+        align_offset: Whether to align the data of large tensors for efficient memory mapping.
+            See :func:`convert_tensors_to_external`.
+        align_threshold: Size in bytes above which the tensor data is aligned.
+        max_shard_size_bytes: When set, split the data into files of at most this size
+            named ``{relative_path}.00001``, ``{relative_path}.00002``, etc.
+            See :func:`convert_tensors_to_external`.
+        deduplicate: Whether to store the data of initializers with identical content only
+            once. See :func:`convert_tensors_to_external`.
 
     Returns:
         An ir.Model with all initializer data equal or above :param:`size_threshold_bytes`
@@ -379,6 +616,10 @@ def unload_from_model(
         [v.const_value for v in initializers_to_become_external],  # type: ignore[misc]
         base_dir=base_dir,
         relative_path=relative_path,
+        align_offset=align_offset,
+        align_threshold=align_threshold,
+        max_shard_size_bytes=max_shard_size_bytes,
+        deduplicate=deduplicate,
     )
 
     # Replace the initializer values with external tensors and save the model
@@ -492,6 +492,145 @@ class OffloadExternalTensorTest(unittest.TestCase):
                 self.assertEqual(tensor_data, tensor_bytes)
                 self.assertEqual(tensor_data, expected_tensor_order[i])
 
+    def test_external_data_aligned_when_align_threshold_is_zero(self):
+        model_with_external_data = external_data.unload_from_model(
+            self.model_with_mixed_external_data,
+            self.base_path,
+            self.external_data_name,
+            align_threshold=0,
+        )
+        file_path = os.path.join(self.base_path, self.external_data_name)
+        expected_size = 0
+        for value in model_with_external_data.graph.initializers.values():
+            tensor = value.const_value
+            self.assertIsInstance(tensor, ir.ExternalTensor)
+            self.assertEqual(tensor.offset % 65536, 0)
+            expected_size = max(expected_size, tensor.offset + tensor.length)
+        self.assertEqual(os.path.getsize(file_path), expected_size)
+        self.assertEqual(
+            model_with_external_data.graph.initializers["tensor1"].const_value.tobytes(),
+            self.data.tobytes(),
+        )
+        self.assertEqual(
+            model_with_external_data.graph.initializers["tensor_ext2_1"].const_value.tobytes(),
+            self.data_ext2_1.tobytes(),
+        )
+
+    def test_write_external_data_fills_padding_with_zeros(self):
+        tensors = [
+            ir.tensor(np.array([1, 2], dtype=np.int32), name="a"),
+            ir.tensor(np.array([3.0], dtype=np.float32), name="b"),
+        ]
+        infos = [
+            external_data._ExternalDataInfo("a", 4, 8),  # pylint: disable=protected-access
+            external_data._ExternalDataInfo("b", 16, 4),  # pylint: disable=protected-access
+        ]
+        file_path = os.path.join(self.base_path, self.external_data_name)
+        external_data._write_external_data(tensors, infos, file_path, max_workers=2)  # pylint: disable=protected-access
+        with open(file_path, "rb") as f:
+            content = f.read()
+        self.assertEqual(
+            content,
+            b"\0" * 4
+            + np.array([1, 2], dtype="<i4").tobytes()
+            + b"\0" * 4
+            + np.array([3.0], dtype="<f4").tobytes(),
+        )
+
+    def test_external_data_sharded(self):
+        # tensor2 (168 bytes) and tensor1 (336 bytes) fit in the first shard. The rest
+        # do not fit together and each tensor larger than the limit gets its own shard.
+        model_with_external_data = external_data.unload_from_model(
+            self.model_with_mixed_external_data,
+            self.base_path,
+            self.external_data_name,
+            max_shard_size_bytes=600,
+        )
+        locations = {
+            name: (value.const_value.location, value.const_value.offset)
+            for name, value in model_with_external_data.graph.initializers.items()
+        }
+        self.assertEqual(locations["tensor2"], (f"{self.external_data_name}.00001", 0))
+        self.assertEqual(locations["tensor_ext1_1"], (f"{self.external_data_name}.00001", 168))
+        shard_names = {location for location, _ in locations.values()}
+        for shard_name in shard_names:
+            self.assertLessEqual(
+                os.path.getsize(os.path.join(self.base_path, shard_name)), 600
+            )
+        self.assertEqual(
+            model_with_external_data.graph.initializers["tensor_ext2_1"].const_value.tobytes(),
+            self.data_ext2_1.tobytes(),
+        )
+        self.assertEqual(
+            model_with_external_data.graph.initializers["custom_tensor"].const_value.tobytes(),
+            self.custom_data.tobytes(),
+        )
+
+    def test_external_data_sharded_removes_stale_shards(self):
+        model_with_external_data = external_data.unload_from_model(
+            self.model_with_mixed_external_data,
+            self.base_path,
+            self.external_data_name,
+            max_shard_size_bytes=600,
+        )
+        num_shards = len(
+            {
+                value.const_value.location
+                for value in model_with_external_data.graph.initializers.values()
+            }
+        )
+        self.assertGreater(num_shards, 2)
+        # Save again into fewer shards
+        model_with_external_data = external_data.unload_from_model(
+            model_with_external_data,
+            self.base_path,
+            self.external_data_name,
+            max_shard_size_bytes=1_000_000,
+        )
+        shard_names = sorted(
+            name
+            for name in os.listdir(self.base_path)
+            if name.startswith(f"{self.external_data_name}.")
+        )
+        self.assertEqual(shard_names, [f"{self.external_data_name}.00001"])
+        self.assertEqual(
+            model_with_external_data.graph.initializers["tensor_ext2_1"].const_value.tobytes(),
+            self.data_ext2_1.tobytes(),
+        )
+        # Saving without shards removes all of them
+        external_data.unload_from_model(
+            model_with_external_data, self.base_path, self.external_data_name
+        )
+        self.assertFalse(
+            any(
+                name.startswith(f"{self.external_data_name}.")
+                for name in os.listdir(self.base_path)
+            )
+        )
+
+    def test_external_data_sharded_raises_for_non_positive_shard_size(self):
+        with self.assertRaises(ValueError):
+            external_data.unload_from_model(
+                self.model, self.base_path, self.external_data_name, max_shard_size_bytes=0
+            )
+
+    def test_external_data_deduplicated(self):
+        tensors = [
+            ir.tensor(np.arange(4, dtype=np.float32), name="a"),
+            ir.tensor(np.arange(4, dtype=np.float32) + 1, name="b"),
+            ir.tensor(np.arange(4, dtype=np.float32), name="c"),
+        ]
+        external_tensors = external_data.convert_tensors_to_external(
+            tensors, self.base_path, self.external_data_name, deduplicate=True
+        )
+        self.assertEqual([tensor.offset for tensor in external_tensors], [0, 16, 0])
+        self.assertEqual([tensor.name for tensor in external_tensors], ["a", "b", "c"])
+        self.assertEqual(
+            os.path.getsize(os.path.join(self.base_path, self.external_data_name)), 32
+        )
+        for tensor, external_tensor in zip(tensors, external_tensors):
+            np.testing.assert_array_equal(external_tensor.numpy(), tensor.numpy())
+
 
 if __name__ == "__main__":
     unittest.main()
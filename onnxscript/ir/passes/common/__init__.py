@@ -0,0 +1,10 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+__all__ = [
+    "DeduplicateInitializersPass",
+]
+
+from onnxscript.ir.passes.common.initializer_deduplication import (
+    DeduplicateInitializersPass,
+)
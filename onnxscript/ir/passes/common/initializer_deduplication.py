@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Pass for removing initializers with duplicated content."""
+
+from __future__ import annotations
+
+__all__ = [
+    "DeduplicateInitializersPass",
+]
+
+import logging
+
+from onnxscript import ir
+from onnxscript.ir import _tensor_buffers
+
+logger = logging.getLogger(__name__)
+
+
+class DeduplicateInitializersPass(ir.passes.PassBase):
+    """Merge initializers of the main graph that have identical content.
+
+    Initializers with the same data type, shape and bytes are considered duplicates.
+    Only initializers sharing their data type and size with another initializer are
+    hashed. Hashing reads the data in chunks directly from the tensor buffers or the
+    memory mapped external data files, so the data is not copied.
+
+    All uses of a duplicate are replaced with the first initializer that has the same
+    content, and the duplicate is removed from the graph. Initializers that are graph
+    inputs or graph outputs are kept because their names are part of the model interface.
+
+    Attributes:
+        bytes_saved: The total size in bytes of the initializers removed by the last run.
+        num_removed: The number of initializers removed by the last run.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.bytes_saved = 0
+        self.num_removed = 0
+
+    def call(self, model: ir.Model) -> ir.passes.PassResult:
+        self.bytes_saved = 0
+        self.num_removed = 0
+        graph = model.graph
+        interface = {id(value) for value in graph.inputs}
+        interface.update(id(value) for value in graph.outputs)
+        candidates = [
+            value
+            for value in graph.initializers.values()
+            if value.const_value is not None and id(value) not in interface
+        ]
+        keys = _tensor_buffers.content_keys(
+            [value.const_value for value in candidates]  # type: ignore[misc]
+        )
+        first_values: dict[object, ir.Value] = {}
+        for value, key in zip(candidates, keys):
+            tensor = value.const_value
+            assert tensor is not None
+            # The shape is not part of the content key used for external data
+            key = (key, tuple(tensor.shape))
+            if key not in first_values:
+                first_values[key] = value
+                continue
+            first = first_values[key]
+            logger.debug("Replacing initializer '%s' with '%s'", value.name, first.name)
+            ir.convenience.replace_all_uses_with(value, first)
+            assert value.name is not None
+            del graph.initializers[value.name]
+            self.bytes_saved += tensor.nbytes
+            self.num_removed += 1
+        if self.num_removed:
+            logger.info(
+                "Removed %s duplicated initializers, saving %s bytes",
+                self.num_removed,
+                self.bytes_saved,
+            )
+        return ir.passes.PassResult(model, modified=bool(self.num_removed))
@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from onnxscript import ir
+from onnxscript.ir.passes.common import initializer_deduplication
+
+
+def _create_model(arrays: dict[str, np.ndarray]) -> ir.Model:
+    graph = ir.Graph([], [], nodes=[], opset_imports={"": 20})
+    for name, array in arrays.items():
+        tensor = ir.tensor(array, name=name)
+        value = ir.Value(
+            name=name, shape=tensor.shape, type=ir.TensorType(tensor.dtype), const_value=tensor
+        )
+        graph.register_initializer(value)
+        node = ir.Node("", "Identity", [value])
+        graph.append(node)
+        graph.outputs.append(node.outputs[0])
+    return ir.Model(graph, ir_version=10)
+
+
+class DeduplicateInitializersPassTest(unittest.TestCase):
+    def test_duplicates_are_merged_into_the_first_initializer(self):
+        model = _create_model(
+            {
+                "a": np.zeros((2, 3), dtype=np.float32),
+                "b": np.ones((2, 3), dtype=np.float32),
+                "c": np.zeros((2, 3), dtype=np.float32),
+                "d": np.zeros((2, 3), dtype=np.float32),
+            }
+        )
+        pass_ = initializer_deduplication.DeduplicateInitializersPass()
+        result = pass_(model)
+        self.assertTrue(result.modified)
+        self.assertEqual(list(model.graph.initializers), ["a", "b"])
+        self.assertEqual([node.inputs[0].name for node in model.graph], ["a", "b", "a", "a"])
+        self.assertEqual(pass_.num_removed, 2)
+        self.assertEqual(pass_.bytes_saved, 48)
+
+    def test_different_shapes_or_dtypes_are_not_merged(self):
+        model = _create_model(
+            {
+                "a": np.zeros((2, 3), dtype=np.float32),
+                "b": np.zeros((3, 2), dtype=np.float32),
+                "c": np.zeros((2, 3), dtype=np.int32),
+            }
+        )
+        result = initializer_deduplication.DeduplicateInitializersPass()(model)
+        self.assertFalse(result.modified)
+        self.assertEqual(list(model.graph.initializers), ["a", "b", "c"])
+
+    def test_graph_inputs_are_kept(self):
+        model = _create_model(
+            {"a": np.zeros((2,), dtype=np.float32), "b": np.zeros((2,), dtype=np.float32)}
+        )
+        model.graph.inputs.append(model.graph.initializers["b"])
+        result = initializer_deduplication.DeduplicateInitializersPass()(model)
+        self.assertFalse(result.modified)
+        self.assertEqual(list(model.graph.initializers), ["a", "b"])
+
+    def test_external_duplicates_are_merged(self):
+        model = _create_model(
+            {
+                "a": np.arange(256, dtype=np.float32),
+                "b": np.arange(256, dtype=np.float32),
+                "c": np.arange(256, dtype=np.float32) + 1,
+            }
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "model.onnx")
+            ir.save(model, path, external_data="model.data", size_threshold_bytes=0)
+            loaded = ir.load(path)
+            result = initializer_deduplication.DeduplicateInitializersPass()(loaded)
+            self.assertTrue(result.modified)
+            self.assertEqual(list(loaded.graph.initializers), ["a", "c"])
+            ir.external_data.release_mapped_files()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -71,7 +71,6 @@ from onnxscript.ir import _core, _enums, _metadata, _protocols, _type_casting
 
 if typing.TYPE_CHECKING:
     import google.protobuf.internal.containers as proto_containers
-    import numpy.typing as npt
 
 logger = logging.getLogger(__name__)
 
@@ -115,11 +114,19 @@ def _little_endian_dtype(dtype) -> np.dtype:
     return np.dtype(dtype).newbyteorder("<")
 
 
-def _unflatten_complex(
-    array: npt.NDArray[np.float32 | np.float64],
-) -> npt.NDArray[np.complex64 | np.complex128]:
-    """Convert the real representation of a complex dtype to the complex dtype."""
-    return array[::2] + 1j * array[1::2]
+# The unsigned integer types holding the bit patterns of the types stored in int32_data
+# that are not integers, or that are packed
+_INT32_DATA_STORAGE_DTYPES = {
+    _enums.DataType.FLOAT16: np.uint16,
+    _enums.DataType.BFLOAT16: np.uint16,
+    _enums.DataType.FLOAT8E4M3FN: np.uint8,
+    _enums.DataType.FLOAT8E4M3FNUZ: np.uint8,
+    _enums.DataType.FLOAT8E5M2: np.uint8,
+    _enums.DataType.FLOAT8E5M2FNUZ: np.uint8,
+    _enums.DataType.INT4: np.uint8,
+    _enums.DataType.UINT4: np.uint8,
+    _enums.DataType.FLOAT4E2M1: np.uint8,
+}
 
 
 @typing.overload
@@ -248,6 +255,10 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
             proto.metadata_props
         )
         self._metadata: _metadata.MetadataStore | None = None
+        self._shape: _core.Shape | None = None
+        # Cache of numpy(), valid while the signature of the proto data is unchanged
+        self._array: np.ndarray | None = None
+        self._array_signature: tuple | None = None
 
     @property
     def name(self) -> str:
@@ -262,7 +273,13 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
 
     @property
     def shape(self) -> _core.Shape:
-        return _core.Shape(self._proto.dims, frozen=True)
+        # The frozen shape is cached. It is created again if the dims of the proto
+        # were modified through ``raw``.
+        shape = self._shape
+        dims = self._proto.dims
+        if shape is None or shape._dims != dims:  # pylint: disable=protected-access
+            shape = self._shape = _core.Shape(dims, frozen=True)
+        return shape
 
     @property
     def dtype(self) -> _enums.DataType:
@@ -287,7 +304,9 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
         return self.numpy().__array__(dtype)
 
     def __dlpack__(self, *, stream: Any = None) -> Any:
-        return self.numpy().__dlpack__(stream=stream)
+        # The array cached by numpy() is read-only, which the DLPack protocol cannot
+        # signal. The consumer gets a copy so it cannot modify the cache.
+        return self.numpy().copy().__dlpack__(stream=stream)
 
     def __dlpack_device__(self) -> tuple[int, int]:
         return self.numpy().__dlpack_device__()
@@ -309,12 +328,60 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
         of bytes instead of a numpy array of strings, to follow the ONNX
         specification.
 
+        .. note::
+            The decoded array is cached and read-only, so later calls do not decode the
+            proto again. Earlier versions returned a new writable array on every call.
+            Writing to the array, or to arrays sharing its memory like the ones created
+            with ``np.frombuffer``, raises a ``ValueError``. Call ``numpy().copy()`` to
+            get an array that can be modified.
+
+        The cache is dropped when the data type, the dims, the data field in use or
+        the number of elements of a data field of the proto change. Call
+        :meth:`invalidate_cache` after other modifications of the data of the proto
+        through :attr:`raw`, like assigning elements in place or replacing
+        ``raw_data`` with data of the same size.
+
         External tensors are not supported by this class. Use
         :class:`onnxscript.ir.ExternalTensor` instead.
 
         Raises:
             ValueError: If the data type is UNDEFINED.
         """
+        signature = self._data_signature()
+        array = self._array
+        if array is not None and self._array_signature == signature:
+            return array
+        array = self._decode()
+        array.flags.writeable = False
+        self._array = array
+        self._array_signature = signature
+        return array
+
+    def _data_signature(self) -> tuple:
+        """Return the properties of the proto data that can be checked in O(1) time."""
+        proto = self._proto
+        # Reading raw_data would copy it, so only its presence is checked
+        return (
+            proto.data_type,
+            tuple(proto.dims),
+            proto.HasField("raw_data"),
+            len(proto.int32_data),
+            len(proto.int64_data),
+            len(proto.uint64_data),
+            len(proto.float_data),
+            len(proto.double_data),
+            len(proto.string_data),
+        )
+
+    def invalidate_cache(self) -> None:
+        """Drop the array cached by :meth:`numpy`.
+
+        Call this method after modifying the data of the proto in a way that does not
+        change its signature, like assigning elements of a data field in place.
+        """
+        self._array = None
+
+    def _decode(self) -> np.ndarray:
         dtype = self.dtype
         if dtype == _enums.DataType.UNDEFINED:
             raise ValueError("Cannot convert UNDEFINED tensor to numpy array.")
@@ -323,35 +390,36 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
                 "Cannot convert external tensor to numpy array. Use ir.ExternalTensor instead."
             )
 
+        # The typed fields are converted with np.asarray, which uses the buffer
+        # of the repeated field when the protobuf implementation provides one
         if self._proto.HasField("raw_data"):
             array = np.frombuffer(self._proto.raw_data, dtype=dtype.numpy().newbyteorder("<"))
             # Cannot return now, because we may need to unpack 4bit tensors
         elif dtype == _enums.DataType.STRING:
             return np.array(self._proto.string_data).reshape(self._proto.dims)
         elif self._proto.int32_data:
-            array = np.array(self._proto.int32_data, dtype=_little_endian_dtype(np.int32))
-            if dtype in {_enums.DataType.FLOAT16, _enums.DataType.BFLOAT16}:
-                # Reinterpret the int32 as float16 or bfloat16
-                array = array.astype(np.uint16).view(dtype.numpy())
-            elif dtype in {
-                _enums.DataType.FLOAT8E4M3FN,
-                _enums.DataType.FLOAT8E4M3FNUZ,
-                _enums.DataType.FLOAT8E5M2,
-                _enums.DataType.FLOAT8E5M2FNUZ,
-            }:
-                array = array.astype(np.uint8).view(dtype.numpy())
+            # 8 and 16 bit types are stored as their bit patterns in int32_data.
+            # They are cast to an unsigned integer of the same size in one step
+            # and reinterpreted as the target dtype
+            storage_dtype = _INT32_DATA_STORAGE_DTYPES.get(dtype)
+            if storage_dtype is None:
+                array = np.asarray(self._proto.int32_data, dtype=dtype.numpy())
+            else:
+                array = np.asarray(self._proto.int32_data, dtype=storage_dtype)
+                if dtype not in _core._PACKED_4BIT_TYPES:  # pylint: disable=protected-access
+                    array = array.view(dtype.numpy())
         elif self._proto.int64_data:
-            array = np.array(self._proto.int64_data, dtype=_little_endian_dtype(np.int64))
+            array = np.asarray(self._proto.int64_data, dtype=np.int64)
         elif self._proto.uint64_data:
-            array = np.array(self._proto.uint64_data, dtype=_little_endian_dtype(np.uint64))
+            array = np.asarray(self._proto.uint64_data, dtype=np.uint64)
         elif self._proto.float_data:
-            array = np.array(self._proto.float_data, dtype=_little_endian_dtype(np.float32))
+            array = np.asarray(self._proto.float_data, dtype=np.float32)
             if dtype == _enums.DataType.COMPLEX64:
-                array = _unflatten_complex(array)
+                array = array.view(np.complex64)
         elif self._proto.double_data:
-            array = np.array(self._proto.double_data, dtype=_little_endian_dtype(np.float64))
+            array = np.asarray(self._proto.double_data, dtype=np.float64)
             if dtype == _enums.DataType.COMPLEX128:
-                array = _unflatten_complex(array)
+                array = array.view(np.complex128)
         else:
             # Empty tensor
             if not self._proto.dims:
@@ -368,9 +436,10 @@ class TensorProtoTensor(_core.TensorBase):  # pylint: disable=too-many-ancestors
         elif dtype == _enums.DataType.FLOAT4E2M1:
             return _type_casting.unpack_float4e2m1(array.astype(np.uint8), self._proto.dims)
         else:
-            # Otherwise convert to the correct dtype and reshape
+            # Otherwise convert to the correct dtype and reshape. The array is not
+            # copied when it already has the dtype, like arrays read from raw_data.
             # Note we cannot use view() here because the storage dtype may not be the same size as the target
-            return array.astype(dtype.numpy()).reshape(self._proto.dims)
+            return array.astype(dtype.numpy(), copy=False).reshape(self._proto.dims)
 
     def tobytes(self) -> bytes:
         """Return the tensor as a byte string conformed to the ONNX specification, in little endian.
@@ -500,13 +569,29 @@ def _parse_experimental_function_value_info_name(
     return function_domain, function_name, value_name
 
 
-def deserialize_model(proto: onnx.ModelProto) -> _core.Model:
-    graph = _deserialize_graph(proto.graph, [])
+def deserialize_model(proto: onnx.ModelProto, *, lazy: bool = False) -> _core.Model:
+    """Deserialize a model proto.
+
+    Args:
+        proto: The model proto to deserialize.
+        lazy: When True, the bodies of model functions and the subgraphs held by
+            graph attributes (e.g. ``If``/``Loop``/``Scan`` bodies) are deserialized
+            on first access instead of up front. The proto fragments are released
+            once they are decoded. A subgraph is also decoded when the uses of an
+            outer value it refers to are read, so that passes see all the uses.
+
+    Returns:
+        IR Model.
+    """
+    graph = _deserialize_graph(proto.graph, [], lazy=lazy)
     graph.opset_imports.update(deserialize_opset_import(proto.opset_import))
 
-    functions = []
+    functions: list[_core.Function] = []
     for func in proto.functions:
-        functions.append(deserialize_function(func))
+        if lazy:
+            functions.append(_LazyFunction(func))
+        else:
+            functions.append(deserialize_function(func))
 
     model = _core.Model(
         graph,
@@ -563,19 +648,28 @@ def _deserialized_experimental_value_info_for_function_ir9(
             continue
         function_value_value_info_mapping[function_id][value_name] = value_info_proto
     for function_id, function in functions.items():
-        for input in function.inputs:
-            if input.name in function_value_value_info_mapping[function_id]:
-                deserialize_value_info_proto(
-                    function_value_value_info_mapping[function_id][input.name], input
-                )
-        for node in function:
-            for output in node.outputs:
-                if output.name in function_value_value_info_mapping[function_id]:
-                    deserialize_value_info_proto(
-                        function_value_value_info_mapping[function_id][output.name],
-                        output,
-                    )
-            # The function outputs are handled as well because they are also node outputs
+        value_info = function_value_value_info_mapping[function_id]
+        if isinstance(function, _LazyFunction) and not function.is_materialized():
+            # Defer until the function body is decoded
+            function._pending_value_info = value_info  # pylint: disable=protected-access
+            continue
+        _fill_in_function_value_info(function, value_info)
+
+
+def _fill_in_function_value_info(
+    function: _core.Function, value_info: Mapping[str, onnx.ValueInfoProto]
+) -> None:
+    """Fill in the value info of function inputs and node outputs from a name to proto mapping."""
+    if not value_info:
+        return
+    for input in function.inputs:
+        if input.name in value_info:
+            deserialize_value_info_proto(value_info[input.name], input)
+    for node in function:
+        for output in node.outputs:
+            if output.name in value_info:
+                deserialize_value_info_proto(value_info[output.name], output)
+        # The function outputs are handled as well because they are also node outputs
 
 
 def deserialize_graph(proto: onnx.GraphProto) -> _core.Graph:
@@ -590,9 +684,11 @@ def deserialize_graph(proto: onnx.GraphProto) -> _core.Graph:
     return _deserialize_graph(proto, [])
 
 
-@_capture_errors(lambda proto, scoped_values: proto.name)
+@_capture_errors(lambda proto, scoped_values, lazy=False: proto.name)
 def _deserialize_graph(
-    proto: onnx.GraphProto, scoped_values: list[dict[str, _core.Value]]
+    proto: onnx.GraphProto,
+    scoped_values: list[dict[str, _core.Value]],
+    lazy: bool = False,
 ) -> _core.Graph:
     """Deserialize a graph proto, recursively if needed.
 
@@ -601,7 +697,8 @@ def _deserialize_graph(
         scoped_values: A list of dictionaries mapping value names to their corresponding Value objects.
             Every time we enter a new graph, a new scope is created and appended to this list to include
             all values defined in the scope.
-        scoped_value_info: A list of dictionaries mapping value names to their corresponding ValueInfoProto.
+        lazy: Whether to defer the deserialization of subgraphs in graph attributes
+            until they are accessed.
 
     Returns:
         IR Graph.
@@ -639,7 +736,9 @@ def _deserialize_graph(
     value_info = {info.name: info for info in proto.value_info}
 
     # Deserialize nodes with all known values
-    nodes = [_deserialize_node(node, scoped_values, value_info) for node in proto.node]
+    nodes = [
+        _deserialize_node(node, scoped_values, value_info, lazy=lazy) for node in proto.node
+    ]
 
     # Fill in values for graph outputs
     outputs = [deserialize_value_info_proto(info, values[info.name]) for info in proto.output]
@@ -657,6 +756,18 @@ def _deserialize_graph(
 
 @_capture_errors(lambda proto: proto.name)
 def deserialize_function(proto: onnx.FunctionProto) -> _core.Function:
+    return _core.Function(
+        domain=proto.domain,
+        name=proto.name,
+        overload=getattr(proto, "overload", ""),
+        graph=_deserialize_function_graph(proto),
+        attributes=_deserialize_function_attributes(proto),
+        metadata_props=deserialize_metadata_props(proto.metadata_props),
+    )
+
+
+def _deserialize_function_graph(proto: onnx.FunctionProto) -> _core.Graph:
+    """Deserialize the body of a function proto into a graph."""
     inputs = [_core.Input(name) for name in proto.input]
     values: dict[str, _core.Value] = {v.name: v for v in inputs}  # type: ignore[misc]
     value_info = {info.name: info for info in getattr(proto, "value_info", [])}
@@ -664,7 +775,7 @@ def deserialize_function(proto: onnx.FunctionProto) -> _core.Function:
     # TODO(justinchuby): Handle unsorted nodes
     nodes = [_deserialize_node(node, [values], value_info=value_info) for node in proto.node]
     outputs = [values[name] for name in proto.output]
-    graph = _core.Graph(
+    return _core.Graph(
         inputs,
         outputs,
         nodes=nodes,
@@ -677,19 +788,65 @@ def deserialize_function(proto: onnx.FunctionProto) -> _core.Function:
             else ""
         ),
     )
+
+
+def _deserialize_function_attributes(proto: onnx.FunctionProto) -> list[_core.Attr]:
     attributes = [_deserialize_attribute(attr, []) for attr in proto.attribute_proto]
     # Attributes without defaults
     attributes += [
         _core.Attr(name, _enums.AttributeType.UNDEFINED, None) for name in proto.attribute
     ]
-    return _core.Function(
-        domain=proto.domain,
-        name=proto.name,
-        overload=getattr(proto, "overload", ""),
-        graph=graph,
-        attributes=typing.cast(List[_core.Attr], attributes),
-        metadata_props=deserialize_metadata_props(proto.metadata_props),
-    )
+    return typing.cast(List[_core.Attr], attributes)
+
+
+class _LazyFunction(_core.Function):  # pylint: disable=too-many-ancestors
+    """A function whose body is deserialized from the proto on first access.
+
+    The signature (identifier, attributes and metadata) is decoded eagerly. The
+    nodes, inputs and outputs are decoded when the function body is first accessed,
+    after which the proto is released.
+    """
+
+    __slots__ = ("_function_graph", "_pending_value_info", "_proto")
+
+    def __init__(self, proto: onnx.FunctionProto) -> None:
+        self._proto: onnx.FunctionProto | None = proto
+        self._function_graph: _core.Graph | None = None
+        # Value info stored in the experimental IR9 format in the main graph
+        self._pending_value_info: Mapping[str, onnx.ValueInfoProto] | None = None
+        super().__init__(
+            domain=proto.domain,
+            name=proto.name,
+            overload=getattr(proto, "overload", ""),
+            graph=None,  # type: ignore[arg-type]
+            attributes=_deserialize_function_attributes(proto),
+            metadata_props=deserialize_metadata_props(proto.metadata_props),
+        )
+
+    def is_materialized(self) -> bool:
+        """Whether the function body has been deserialized."""
+        return self._function_graph is not None
+
+    @property  # type: ignore[override]
+    def _graph(self) -> _core.Graph:
+        if self._function_graph is None:
+            assert self._proto is not None
+            self._function_graph = _deserialize_function_graph(self._proto)
+            # Release the proto now that the body is decoded
+            self._proto = None
+            if self._pending_value_info is not None:
+                _fill_in_function_value_info(self, self._pending_value_info)
+                self._pending_value_info = None
+        return self._function_graph
+
+    @_graph.setter
+    def _graph(self, value: _core.Graph | None) -> None:
+        if value is None:
+            # Set by the base initializer. The body is decoded lazily.
+            return
+        self._function_graph = value
+        self._proto = None
+        self._pending_value_info = None
 
 
 @_capture_errors(lambda proto, value: str(proto))
@@ -711,11 +868,23 @@ def deserialize_value_info_proto(
 def deserialize_tensor_shape(proto: onnx.TensorShapeProto) -> _core.Shape:
     # This logic handles when the shape is [] as well
     dim_protos = proto.dim
-    deserialized_dim_denotations = [
-        deserialize_dimension(dim_proto) for dim_proto in dim_protos
-    ]
-    dims = [dim for dim, _ in deserialized_dim_denotations]
-    denotations = [denotation for _, denotation in deserialized_dim_denotations]
+    dims: list[int | _core.SymbolicDim] = []
+    has_denotation = False
+    for dim_proto in dim_protos:
+        # Inline the common cases of deserialize_dimension to avoid its overhead
+        value_field = dim_proto.WhichOneof("value")
+        if value_field == "dim_value":
+            dims.append(dim_proto.dim_value)
+        elif value_field == "dim_param":
+            dims.append(_core._interned_symbolic_dim(dim_proto.dim_param))  # pylint: disable=protected-access
+        else:
+            dims.append(_core._interned_symbolic_dim(None))  # pylint: disable=protected-access
+        has_denotation = has_denotation or dim_proto.HasField("denotation")
+    denotations = (
+        [_get_field(dim_proto, "denotation") for dim_proto in dim_protos]
+        if has_denotation
+        else None
+    )
     return _core.Shape(dims, denotations=denotations, frozen=True)
 
 
@@ -799,8 +968,8 @@ def deserialize_dimension(
         if value_field == "dim_value":
             return value, denotation
         if value_field == "dim_param":
-            return _core.SymbolicDim(value), denotation
-    return _core.SymbolicDim(None), denotation
+            return _core._interned_symbolic_dim(value), denotation  # pylint: disable=protected-access
+    return _core._interned_symbolic_dim(None), denotation  # pylint: disable=protected-access
 
 
 @_capture_errors(lambda proto, base_path: proto.name)
@@ -848,9 +1017,11 @@ def deserialize_attribute(proto: onnx.AttributeProto) -> _core.Attr | _core.RefA
     return _deserialize_attribute(proto, [])
 
 
-@_capture_errors(lambda proto, scoped_values: str(proto))
+@_capture_errors(lambda proto, scoped_values, lazy=False: str(proto))
 def _deserialize_attribute(
-    proto: onnx.AttributeProto, scoped_values: list[dict[str, _core.Value]]
+    proto: onnx.AttributeProto,
+    scoped_values: list[dict[str, _core.Value]],
+    lazy: bool = False,
 ) -> _core.Attr | _core.RefAttr:
     name = proto.name
     doc_string = _get_field(proto, "doc_string")
@@ -876,6 +1047,8 @@ def _deserialize_attribute(
     if type_ == _enums.AttributeType.TENSOR:
         return _core.AttrTensor(name, deserialize_tensor(proto.t), doc_string=doc_string)
     if type_ == _enums.AttributeType.GRAPH:
+        if lazy:
+            return _LazyGraphAttr(name, type_, proto.g, scoped_values, doc_string=doc_string)
         return _core.AttrGraph(
             name, _deserialize_graph(proto.g, scoped_values), doc_string=doc_string
         )
@@ -886,6 +1059,10 @@ def _deserialize_attribute(
             doc_string=doc_string,
         )
     if type_ == _enums.AttributeType.GRAPHS:
+        if lazy:
+            return _LazyGraphAttr(
+                name, type_, proto.graphs, scoped_values, doc_string=doc_string
+            )
         return _core.AttrGraphs(
             name,
             [_deserialize_graph(g, scoped_values) for g in proto.graphs],
@@ -917,15 +1094,115 @@ def _deserialize_attribute(
     raise ValueError(f"Unsupported attribute type: '{type_}'")
 
 
+def _referenced_names(graph_protos: Sequence[onnx.GraphProto]) -> set[str]:
+    """Returns the names of the values used by the graphs and their subgraphs."""
+    names: set[str] = set()
+    stack = list(graph_protos)
+    while stack:
+        graph_proto = stack.pop()
+        for node in graph_proto.node:
+            names.update(node.input)
+            for attr in node.attribute:
+                if attr.type == onnx.AttributeProto.GRAPH:
+                    stack.append(attr.g)
+                elif attr.type == onnx.AttributeProto.GRAPHS:
+                    stack.extend(attr.graphs)
+        names.update(output.name for output in graph_proto.output)
+    names.discard("")
+    return names
+
+
+class _LazyGraphAttr(_core.Attr):
+    """A GRAPH or GRAPHS attribute whose subgraphs are deserialized on first access.
+
+    The scope chain of the enclosing graphs is captured at creation so that the
+    subgraphs can resolve references to outer values when they are decoded. The
+    proto and the captured scopes are released once the subgraphs are decoded.
+    """
+
+    __slots__ = ("_attr_value", "_proto", "_scoped_values", "base_dir")
+
+    def __init__(
+        self,
+        name: str,
+        type: _enums.AttributeType,
+        proto: onnx.GraphProto | Sequence[onnx.GraphProto],
+        scoped_values: list[dict[str, _core.Value]],
+        *,
+        doc_string: str | None = None,
+    ) -> None:
+        self._attr_value: Any = None
+        super().__init__(name, type, None, doc_string=doc_string)
+        self._proto: onnx.GraphProto | Sequence[onnx.GraphProto] | None = proto
+        # Copy the list because the deserializer pushes and pops scopes on it.
+        # The scope dictionaries themselves are shared with the outer graphs.
+        self._scoped_values: list[dict[str, _core.Value]] | None = list(scoped_values)
+        # Base directory for external tensors in the subgraphs, applied when they are decoded
+        self.base_dir: str | os.PathLike = ""
+        # Decode the subgraphs before the uses of the outer values they refer to are
+        # read, so that passes do not remove or replace those values without them
+        graph_protos = [proto] if type == _enums.AttributeType.GRAPH else list(proto)  # type: ignore[list-item]
+        for value_name in _referenced_names(graph_protos):  # type: ignore[arg-type]
+            for scope in reversed(scoped_values):
+                if value_name in scope:
+                    scope[value_name]._add_pending_uses(self._materialize)  # pylint: disable=protected-access
+                    break
+
+    def _materialize(self) -> None:
+        _ = self.value
+
+    def is_materialized(self) -> bool:
+        """Whether the subgraphs have been deserialized."""
+        return self._proto is None
+
+    @property  # type: ignore[override]
+    def value(self) -> Any:
+        if self._proto is not None:
+            assert self._scoped_values is not None
+            if self.type == _enums.AttributeType.GRAPH:
+                self._attr_value = _deserialize_graph(
+                    self._proto,  # type: ignore[arg-type]
+                    self._scoped_values,
+                    lazy=True,
+                )
+            else:
+                self._attr_value = [
+                    _deserialize_graph(graph_proto, self._scoped_values, lazy=True)
+                    for graph_proto in self._proto  # type: ignore[union-attr]
+                ]
+            self._proto = None
+            self._scoped_values = None
+            if self.base_dir:
+                from onnxscript.ir import (  # pylint: disable=import-outside-toplevel
+                    external_data,
+                )
+
+                graphs = (
+                    [self._attr_value]
+                    if self.type == _enums.AttributeType.GRAPH
+                    else self._attr_value
+                )
+                for graph in graphs:
+                    external_data.set_base_dir(graph, self.base_dir)
+        return self._attr_value
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        self._attr_value = value
+        self._proto = None
+        self._scoped_values = None
+
+
 def deserialize_node(proto: onnx.NodeProto) -> _core.Node:
     return _deserialize_node(proto, scoped_values=[], value_info={})
 
 
-@_capture_errors(lambda proto, scoped_values, value_info: str(proto))
+@_capture_errors(lambda proto, scoped_values, value_info, lazy=False: str(proto))
 def _deserialize_node(
     proto: onnx.NodeProto,
     scoped_values: list[dict[str, _core.Value]],
     value_info: dict[str, onnx.ValueInfoProto],
+    lazy: bool = False,
 ) -> _core.Node:
     node_inputs: list[_core.Value | None] = []
     for input_name in proto.input:
@@ -1014,7 +1291,7 @@ def _deserialize_node(
         proto.domain,
         proto.op_type,
         node_inputs,
-        [_deserialize_attribute(a, scoped_values) for a in proto.attribute],
+        [_deserialize_attribute(a, scoped_values, lazy=lazy) for a in proto.attribute],
         overload=getattr(proto, "overload", ""),
         outputs=node_outputs,
         name=proto.name,
@@ -1040,6 +1317,26 @@ def serialize_model_into(
     model_proto: onnx.ModelProto, from_: _protocols.ModelProtocol
 ) -> onnx.ModelProto:
     """Serialize an IR model to an ONNX model proto."""
+    _serialize_model_metadata_into(model_proto, from_)
+    serialize_graph_into(model_proto.graph, from_.graph)
+
+    create_value_info_in_functions = from_.ir_version >= _FUNCTION_VALUE_INFO_SUPPORTED_VERSION
+    for func in from_.functions.values():
+        serialize_function_into(
+            model_proto.functions.add(),
+            from_=func,
+            create_value_info=create_value_info_in_functions,
+        )
+        if not create_value_info_in_functions:
+            # Create them in the main graph instead
+            _serialize_experimental_value_info_for_function_ir9_into(model_proto.graph, func)
+    return model_proto
+
+
+def _serialize_model_metadata_into(
+    model_proto: onnx.ModelProto, from_: _protocols.ModelProtocol
+) -> None:
+    """Serialize the fields of a model other than the graph and the functions."""
     model_proto.ir_version = from_.ir_version
     if from_.producer_name:
         model_proto.producer_name = from_.producer_name
@@ -1055,19 +1352,6 @@ def serialize_model_into(
     _serialize_opset_imports_into(model_proto.opset_import, from_.opset_imports)
     if from_.metadata_props:
         _serialize_metadata_props_into(model_proto.metadata_props, from_.metadata_props)
-    serialize_graph_into(model_proto.graph, from_.graph)
-
-    create_value_info_in_functions = from_.ir_version >= _FUNCTION_VALUE_INFO_SUPPORTED_VERSION
-    for func in from_.functions.values():
-        serialize_function_into(
-            model_proto.functions.add(),
-            from_=func,
-            create_value_info=create_value_info_in_functions,
-        )
-        if not create_value_info_in_functions:
-            # Create them in the main graph instead
-            _serialize_experimental_value_info_for_function_ir9_into(model_proto.graph, func)
-    return model_proto
 
 
 def _should_create_value_info_for_value(value: _protocols.ValueProtocol) -> bool:
@@ -1216,9 +1500,12 @@ def serialize_graph_into(
                 "Initializer '%s' does not have a constant value set.", initializer.name
             )
             continue
-        # Make sure the tensor's name is the same as the value's name
-        initializer.const_value.name = initializer.name
-        serialize_tensor_into(graph_proto.initializer.add(), from_=initializer.const_value)
+        tensor_proto = graph_proto.initializer.add()
+        serialize_tensor_into(tensor_proto, from_=initializer.const_value)
+        # The tensor is named after the value. Name the proto only because the tensor
+        # can be shared with a clone of the graph.
+        if initializer.name:
+            tensor_proto.name = initializer.name
     for node in from_:
         serialize_node_into(graph_proto.node.add(), from_=node)
         for node_output in node.outputs:
@@ -260,6 +260,114 @@ class TensorProtoTensorTest(unittest.TestCase):
         # Test dlpack
         np.testing.assert_array_equal(np.from_dlpack(tensor), tensor.numpy())
 
+    def test_tensor_proto_tensor_shape_is_cached_until_dims_change(self):
+        tensor_proto = onnx.helper.make_tensor(
+            "test_tensor", onnx.TensorProto.FLOAT, [1, 2], [1.0, 2.0]
+        )
+        tensor = serde.TensorProtoTensor(tensor_proto)
+        shape = tensor.shape
+        self.assertIs(tensor.shape, shape)
+        with self.assertRaises(TypeError):
+            shape[0] = 2
+        tensor_proto.dims[:] = [2, 1]
+        self.assertEqual(tensor.shape, ir.Shape([2, 1]))
+
+    def test_tensor_proto_tensor_numpy_is_cached_and_read_only(self):
+        tensor_proto = onnx.helper.make_tensor(
+            "test_tensor", onnx.TensorProto.FLOAT, [1, 2], [1.0, 2.0]
+        )
+        tensor = serde.TensorProtoTensor(tensor_proto)
+        array = tensor.numpy()
+        self.assertIs(tensor.numpy(), array)
+        self.assertFalse(array.flags.writeable)
+        # The cache is dropped when the dims change
+        tensor_proto.dims[:] = [2, 1]
+        np.testing.assert_array_equal(tensor.numpy(), np.array([[1.0], [2.0]]))
+
+    @parameterized.parameterized.expand([("float_data", False), ("raw_data", True)])
+    def test_tensor_proto_tensor_numpy_raises_on_write(self, _: str, raw: bool):
+        tensor_proto = onnx.helper.make_tensor(
+            "test_tensor",
+            onnx.TensorProto.FLOAT,
+            [2],
+            np.array([1.0, 2.0], dtype="<f4").tobytes() if raw else [1.0, 2.0],
+            raw=raw,
+        )
+        tensor = serde.TensorProtoTensor(tensor_proto)
+        with self.assertRaisesRegex(ValueError, "read-only"):
+            tensor.numpy()[0] = 3.0
+        with self.assertRaisesRegex(ValueError, "read-only"):
+            np.frombuffer(tensor.numpy(), dtype=np.float32)[0] = 3.0
+        # A copy can be modified without changing the tensor
+        array = tensor.numpy().copy()
+        array[0] = 3.0
+        np.testing.assert_array_equal(tensor.numpy(), np.array([1.0, 2.0]))
+
+    def test_tensor_proto_tensor_numpy_cache_is_dropped_when_the_data_changes_size(self):
+        tensor_proto = onnx.helper.make_tensor(
+            "test_tensor", onnx.TensorProto.FLOAT, [2], [1.0, 2.0]
+        )
+        tensor = serde.TensorProtoTensor(tensor_proto)
+        np.testing.assert_array_equal(tensor.numpy(), np.array([1.0, 2.0]))
+        tensor_proto.float_data.append(3.0)
+        tensor_proto.dims[:] = [3]
+        np.testing.assert_array_equal(tensor.numpy(), np.array([1.0, 2.0, 3.0]))
+        # Moving the data to raw_data with the same dims drops the cache as well
+        tensor_proto.ClearField("float_data")
+        tensor_proto.raw_data = np.array([4.0, 5.0, 6.0], dtype="<f4").tobytes()
+        np.testing.assert_array_equal(tensor.numpy(), np.array([4.0, 5.0, 6.0]))
+
+    def test_tensor_proto_tensor_invalidate_cache(self):
+        tensor_proto = onnx.helper.make_tensor(
+            "test_tensor", onnx.TensorProto.INT64, [2], [1, 2]
+        )
+        tensor = serde.TensorProtoTensor(tensor_proto)
+        np.testing.assert_array_equal(tensor.numpy(), np.array([1, 2]))
+        tensor_proto.int64_data[0] = 3
+        tensor.invalidate_cache()
+        np.testing.assert_array_equal(tensor.numpy(), np.array([3, 2]))
+
+    @parameterized.parameterized.expand(
+        [
+            ("FLOAT16", onnx.TensorProto.FLOAT16, np.float16),
+            ("BFLOAT16", onnx.TensorProto.BFLOAT16, ml_dtypes.bfloat16),
+            ("FLOAT8E5M2", onnx.TensorProto.FLOAT8E5M2, ml_dtypes.float8_e5m2),
+        ]
+    )
+    def test_tensor_proto_tensor_reads_bit_patterns_in_int32_data(
+        self, _: str, dtype: int, np_dtype
+    ):
+        expected_array = np.array([-1.5, 0.0, 2.0], dtype=np_dtype)
+        bits = expected_array.view(np.uint16 if expected_array.itemsize == 2 else np.uint8)
+        tensor_proto = onnx.TensorProto(
+            dims=[3], data_type=dtype, int32_data=bits.astype(np.int32).tolist()
+        )
+        array = serde.TensorProtoTensor(tensor_proto).numpy()
+        self.assertEqual(array.dtype, np_dtype)
+        np.testing.assert_array_equal(array.view(bits.dtype), bits)
+
+
+class DeserializeTensorShapeTest(unittest.TestCase):
+    def test_deserialize_tensor_shape(self):
+        shape_proto = onnx.TensorShapeProto()
+        shape_proto.dim.add().dim_value = 42
+        shape_proto.dim.add().dim_param = "batch"
+        shape_proto.dim.add()
+        shape = serde.deserialize_tensor_shape(shape_proto)
+        self.assertEqual(shape, ir.Shape([42, "batch", None]))
+        self.assertIsNone(shape.get_denotation(0))
+        self.assertIs(shape[1], serde.deserialize_tensor_shape(shape_proto)[1])
+
+    def test_deserialize_tensor_shape_with_denotations(self):
+        shape_proto = onnx.TensorShapeProto()
+        shape_proto.dim.add().dim_value = 42
+        dim_proto = shape_proto.dim.add()
+        dim_proto.dim_param = "channel"
+        dim_proto.denotation = "DATA_CHANNEL"
+        shape = serde.deserialize_tensor_shape(shape_proto)
+        self.assertIsNone(shape.get_denotation(0))
+        self.assertEqual(shape.get_denotation(1), "DATA_CHANNEL")
+
 
 class DeserializeGraphTest(unittest.TestCase):
     def test_deserialize_graph_handles_unsorted_graph(self):
@@ -290,5 +398,81 @@ class DeserializeGraphTest(unittest.TestCase):
         self.assertEqual(deserialized_graph[1].op_type, "Op_0")
 
 
+class LazyDeserializeModelTest(unittest.TestCase):
+    def setUp(self):
+        self.model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 10, opset_import: ["" : 17, "custom" : 1]>
+            agraph (bool cond, float[N] x) => (float[N] z) {
+                y = custom.Double (x)
+                z = If (cond) <
+                    then_branch = then_graph () => (float[N] then_out) {
+                        then_out = Neg (y)
+                    },
+                    else_branch = else_graph () => (float[N] else_out) {
+                        else_out = Identity (y)
+                    }
+                >
+            }
+            <domain: "custom", opset_import: ["" : 17]>
+            Double (a) => (b) {
+                b = Add (a, a)
+            }
+            """
+        )
+
+    def test_subgraphs_and_functions_are_deserialized_on_first_access(self):
+        model = serde.deserialize_model(self.model_proto, lazy=True)
+        if_node = model.graph.node(1)
+        then_attr = if_node.attributes["then_branch"]
+        function = model.functions["custom", "Double", ""]
+        self.assertFalse(then_attr.is_materialized())
+        self.assertFalse(function.is_materialized())
+
+        then_graph = then_attr.as_graph()
+        self.assertTrue(then_attr.is_materialized())
+        self.assertFalse(if_node.attributes["else_branch"].is_materialized())
+        # The subgraph refers to the value in the outer scope
+        self.assertIs(then_graph.node(0).inputs[0], model.graph.node(0).outputs[0])
+
+        self.assertEqual(function.inputs[0].name, "a")
+        self.assertTrue(function.is_materialized())
+        self.assertEqual([node.op_type for node in function], ["Add"])
+
+    def test_lazy_model_serializes_to_the_same_proto(self):
+        eager_model = serde.deserialize_model(self.model_proto)
+        lazy_model = serde.deserialize_model(self.model_proto, lazy=True)
+        self.assertEqual(
+            serde.serialize_model(lazy_model).SerializeToString(),
+            serde.serialize_model(eager_model).SerializeToString(),
+        )
+
+    def test_uses_of_outer_values_include_lazy_subgraphs(self):
+        model = serde.deserialize_model(self.model_proto, lazy=True)
+        y = model.graph.node(0).outputs[0]
+        if_node = model.graph.node(1)
+        self.assertFalse(if_node.attributes["then_branch"].is_materialized())
+        self.assertEqual(y.num_uses(), 2)
+        self.assertTrue(if_node.attributes["then_branch"].is_materialized())
+        self.assertTrue(if_node.attributes["else_branch"].is_materialized())
+
+    def test_replace_all_uses_with_replaces_uses_in_lazy_subgraphs(self):
+        model = serde.deserialize_model(self.model_proto, lazy=True)
+        x = model.graph.inputs[1]
+        y = model.graph.node(0).outputs[0]
+        ir.convenience.replace_all_uses_with(y, x)
+        then_graph = model.graph.node(1).attributes["then_branch"].as_graph()
+        self.assertIs(then_graph.node(0).inputs[0], x)
+        self.assertFalse(y.has_uses())
+
+    def test_setting_value_replaces_lazy_subgraph(self):
+        model = serde.deserialize_model(self.model_proto, lazy=True)
+        attr = model.graph.node(1).attributes["else_branch"]
+        graph = ir.Graph([], [], nodes=[])
+        attr.value = graph
+        self.assertTrue(attr.is_materialized())
+        self.assertIs(attr.value, graph)
+
+
 if __name__ == "__main__":
     unittest.main()
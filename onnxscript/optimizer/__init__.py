@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 __all__ = [
+    "MemoryAwareSchedulingPass",
     "fold_constants",
     "fold_constants_ir",
     "remove_unused_nodes",
@@ -10,6 +11,7 @@ __all__ = [
     "optimize_ir",
     "basic_constant_propagation",
     "inline",
+    "schedule_for_memory",
 ]
 
 import onnx
@@ -19,6 +21,10 @@ import onnxscript.optimizer._legacy._optimizer as legacy_optimizer
 import onnxscript.optimizer._legacy.constant_folding as legacy_constant_folding
 from onnxscript import ir
 from onnxscript.optimizer._inliner import inline
+from onnxscript.optimizer._memory_scheduling import (
+    MemoryAwareSchedulingPass,
+    schedule_for_memory,
+)
 from onnxscript.optimizer._optimizer import optimize_ir
 from onnxscript.optimizer._remove_unused import remove_unused_nodes
 
@@ -5,11 +5,14 @@
 
 from __future__ import annotations
 
+import collections
 import dataclasses
+import hashlib
 import logging
 import math
+import struct
 import typing
-from typing import Any, Callable, Iterable, Sequence, Union
+from typing import Any, Callable, Hashable, Iterable, Sequence, Union
 
 import numpy as np
 import onnx
@@ -18,11 +21,14 @@ import onnx.reference.ops
 import onnxscript.ir as ir
 import onnxscript.rewriter.pattern as orp
 import onnxscript.utils.utils as utils
+from onnxscript.optimizer import _numpy_kernels, _shape_inference
 
 DEFAULT_CONSTANT_FOLD_INPUT_SIZE_LIMIT = 1024
 
 DEFAULT_CONSTANT_FOLD_OUTPUT_SIZE_LIMIT = 1024 * 1024
 
+DEFAULT_CONSTANT_FOLD_CACHE_SIZE_LIMIT = 16 * 1024 * 1024
+
 
 def is_control_flow_op(node: ir.Node) -> bool:
     graph_types = {ir.AttributeType.GRAPH, ir.AttributeType.GRAPHS}
@@ -58,8 +64,9 @@ logger = logging.getLogger(__name__)
 
 # "Standard" evaluators are used to perform constant-folding.
 # The API below works only for non-control-flow ops (ops without any graph-attributes).
-# This currently used ONNX's reference implementation. But we could also
-# use ORT's implementation if we want to.
+# Common ops are evaluated with the NumPy kernels of _numpy_kernels. Other ops
+# use ONNX's reference implementation. But we could also use ORT's implementation
+# if we want to.
 
 
 def _process_constant_node(node: ir.Node) -> None:
@@ -381,23 +388,143 @@ def gather(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     input_sym_value = state.get_shape_value(input)
     if input_sym_value is None:
         return None
-    axis = _get_int_attribute(node, "axis", None)
+    axis = _get_int_attribute(node, "axis", 0)
     if axis != 0:
         return None
     indices_numpy_value = _get_numpy_value(indices)
     if indices_numpy_value is None:
         return None
-    if indices_numpy_value.ndim != 1:
+    if indices_numpy_value.ndim > 1:
         return None
-    gathered = [input_sym_value[i] for i in indices_numpy_value]
+    gathered = [input_sym_value[i] for i in indices_numpy_value.reshape(-1).tolist()]
     output = _get_output(node, 0)
     if output is not None:
         state.set_sym_value(output, ir.Shape(gathered))
+        if indices_numpy_value.ndim == 0 and output.shape is None:
+            # Record the rank of the scalar to track it through Unsqueeze
+            output.shape = ir.Shape([])
     if all(isinstance(d, int) for d in gathered):
+        if indices_numpy_value.ndim == 0:
+            return op.Constant(value_int=gathered[0])
         return op.Constant(value_ints=gathered)
     return None
 
 
+def _get_scalar_or_shape_value(
+    state: OptimizerState, value: ir.Value | None
+) -> ir.Shape | None:
+    """Returns the symbolic value of a shape tensor or of a scalar INT64 tensor."""
+    shape_value = state.get_shape_value(value)
+    if shape_value is not None:
+        return shape_value
+    const_value = _get_numpy_value(value, ir.DataType.INT64, size_limit=1)
+    if const_value is not None and const_value.ndim == 0:
+        return ir.Shape([const_value.item()])
+    return None
+
+
+def _is_unknown_dim(dim: int | ir.SymbolicDim) -> bool:
+    return isinstance(dim, ir.SymbolicDim) and dim.value is None
+
+
+def _is_non_negative_dim(dim: int | ir.SymbolicDim) -> bool:
+    if isinstance(dim, int):
+        return dim >= 0
+    return dim.is_non_negative()
+
+
+@register("Add")
+@register("Sub")
+@register("Mul")
+@register("Div")
+def shape_arithmetic(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
+    """Compute the symbolic value of arithmetic on shape tensors.
+
+    Handles computations like ``Shape(x)[1] * 4``, producing symbolic expressions
+    that later evaluators, like Reshape, can compare to the shapes of values.
+    """
+    del op
+    if len(node.inputs) != 2:
+        return None
+    output = _get_output(node, 0)
+    if output is None:
+        return None
+    if not any(isinstance(state.get_sym_value(input), ir.Shape) for input in node.inputs):
+        # Constant inputs are folded by the standard evaluators
+        return None
+    operands = [_get_scalar_or_shape_value(state, input) for input in node.inputs]
+    if operands[0] is None or operands[1] is None:
+        return None
+    dims1, dims2 = operands[0].dims, operands[1].dims
+    if len(dims1) == 1:
+        dims1 = dims1 * len(dims2)
+    elif len(dims2) == 1:
+        dims2 = dims2 * len(dims1)
+    if len(dims1) != len(dims2):
+        return None
+    result: list[int | ir.SymbolicDim] = []
+    for dim1, dim2 in zip(dims1, dims2):
+        if node.op_type == "Add":
+            result.append(dim1 + dim2)
+        elif node.op_type == "Sub":
+            result.append(dim1 - dim2)
+        elif node.op_type == "Mul":
+            result.append(dim1 * dim2)
+        elif not _is_non_negative_dim(dim1) or not _is_non_negative_dim(dim2) or dim2 == 0:
+            # Division truncates toward zero, which is floor division only for
+            # non-negative dividends and positive divisors
+            return None
+        else:
+            result.append(dim1 // dim2)
+    state.set_sym_value(output, ir.Shape(result))
+    input_shapes = [input.shape for input in node.inputs if input is not None]
+    if output.shape is None and all(shape is not None for shape in input_shapes):
+        output.shape = ir.Shape(
+            [len(result)] if any(len(shape) for shape in input_shapes) else []  # type: ignore[arg-type]
+        )
+    return None
+
+
+@register("Unsqueeze")
+def unsqueeze(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
+    """Track the symbolic value of a scalar shape element unsqueezed to a 1-D tensor."""
+    del op
+    input = _get_input(node, 0)
+    output = _get_output(node, 0)
+    if input is None or output is None:
+        return None
+    if input.shape is None or len(input.shape) != 0:
+        return None
+    sym_value = state.get_sym_value(input)
+    if not isinstance(sym_value, ir.Shape) or len(sym_value) != 1:
+        return None
+    axes = _get_numpy_value(_get_input(node, 1))
+    if axes is None:
+        attr = node.attributes.get("axes")
+        axes = np.array(attr.value) if isinstance(attr, ir.Attr) else None
+    if axes is None or axes.reshape(-1).tolist() not in ([0], [-1]):
+        return None
+    state.set_sym_value(output, sym_value)
+    return None
+
+
+@register("Squeeze")
+def squeeze(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
+    """Track the symbolic value of a single shape element squeezed to a scalar."""
+    del op
+    input = _get_input(node, 0)
+    output = _get_output(node, 0)
+    if input is None or output is None:
+        return None
+    sym_value = state.get_shape_value(input)
+    if sym_value is None or len(sym_value) != 1:
+        return None
+    state.set_sym_value(output, sym_value)
+    if output.shape is None:
+        output.shape = ir.Shape([])
+    return None
+
+
 @register("Reshape")
 def reshape(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     """Replace a Reshape node by Identity when applicable."""
@@ -419,9 +546,61 @@ def reshape(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     # No need to check for special values like -1, 0, etc. here
     if _same_shape(input_shape, shape_value):
         return op.Identity(input)
+    output_shape = _reshaped_shape(
+        input_shape, shape_value, _get_int_attribute(node, "allowzero", 0)
+    )
+    if output_shape is None:
+        return None
+    if _same_shape(input_shape, output_shape):
+        return op.Identity(input)
+    output = _get_output(node, 0)
+    if output is not None and output.shape is None:
+        output.shape = output_shape
+    if shape.const_value is None and not _get_int_attribute(node, "allowzero", 0):
+        # A symbolic dim copied from the same axis of the input can be replaced by 0,
+        # making the target shape constant so its computation can be removed
+        target_dims = []
+        for i, dim in enumerate(shape_value):
+            if isinstance(dim, int):
+                target_dims.append(dim)
+            elif i < len(input_shape) and not _is_unknown_dim(dim) and input_shape[i] == dim:
+                target_dims.append(0)
+            else:
+                return None
+        return op.Reshape(input, op.Constant(value_ints=target_dims))
     return None
 
 
+def _reshaped_shape(
+    input_shape: ir.Shape, target_shape: ir.Shape, allowzero: int | None
+) -> ir.Shape | None:
+    """Returns the output shape of a Reshape, resolving the special dims 0 and -1."""
+    dims = list(target_shape.dims)
+    for i, dim in enumerate(dims):
+        if dim == 0 and not allowzero:
+            if i >= len(input_shape):
+                return None
+            dims[i] = input_shape[i]
+    if dims.count(-1) > 1 or any(isinstance(dim, int) and dim < -1 for dim in dims):
+        return None
+    if -1 in dims:
+        if any(_is_unknown_dim(dim) for dim in input_shape) or any(
+            _is_unknown_dim(dim) for dim in dims
+        ):
+            return None
+        input_size: int | ir.SymbolicDim = 1
+        for dim in input_shape:
+            input_size = input_size * dim
+        known_size: int | ir.SymbolicDim = 1
+        for dim in dims:
+            if dim != -1:
+                known_size = known_size * dim
+        if known_size == 0:
+            return None
+        dims[dims.index(-1)] = input_size // known_size
+    return ir.Shape(dims)
+
+
 @register("Cast")
 def cast(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     input = _get_input(node, 0)
@@ -623,7 +802,9 @@ def expand(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     if (expanded_shape := _get_numpy_value(node.inputs[1])) is None:
         # Target shape is not known.
         expanded_sym_shape = state.get_shape_value(node.inputs[1])
-        if expanded_sym_shape is None or not _same_shape(input_shape, expanded_sym_shape):
+        if expanded_sym_shape is None or not _expands_to_same_shape(
+            input_shape, expanded_sym_shape
+        ):
             return None
         return op.Identity(input)
     if expanded_shape.ndim != 1:
@@ -634,6 +815,20 @@ def expand(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     return None
 
 
+def _expands_to_same_shape(input_shape: ir.Shape, expanded_shape: ir.Shape) -> bool:
+    """Returns True if expanding the input shape to the shape leaves it unchanged."""
+    if len(expanded_shape) > len(input_shape):
+        return False
+    for input_dim, expanded_dim in zip(
+        reversed(input_shape.dims), reversed(expanded_shape.dims)
+    ):
+        if expanded_dim == 1:
+            continue
+        if _is_unknown_dim(input_dim) or input_dim != expanded_dim:
+            return False
+    return True
+
+
 @register("ConcatFromSequence")
 def concat_from_sequence(node: ir.Node, op, state: OptimizerState) -> ReturnValue:
     input = node.inputs[0]
@@ -797,6 +992,93 @@ def _merge_shapes(shape1: ir.Shape | None, shape2: ir.Shape | None) -> ir.Shape
     return ir.Shape([merge_dims(dim1, dim2) for dim1, dim2 in zip(shape1, shape2)])
 
 
+def _array_key(array: np.ndarray) -> Hashable | None:
+    """Returns a key identifying the content of an array, or None for object arrays."""
+    if array.dtype.hasobject:
+        return None
+    digest = hashlib.blake2b(np.ascontiguousarray(array).data, digest_size=16).digest()
+    return (array.dtype.str, array.shape, digest)
+
+
+def _attribute_key(attr: ir.Attr | ir.RefAttr) -> Hashable | None:
+    """Returns a canonical key of an attribute, or None if it cannot be cached."""
+    if not isinstance(attr, ir.Attr):
+        return None
+    if attr.type == ir.AttributeType.TENSOR:
+        return _array_key(attr.as_tensor().numpy())
+    # Floats are keyed by their bits so that 0.0 and -0.0 differ and NaN equals itself
+    if attr.type == ir.AttributeType.FLOAT:
+        return struct.pack("<f", attr.value)
+    if attr.type == ir.AttributeType.FLOATS:
+        return struct.pack(f"<{len(attr.value)}f", *attr.value)
+    if attr.type in (ir.AttributeType.INTS, ir.AttributeType.STRINGS):
+        return tuple(attr.value)
+    if attr.type in (ir.AttributeType.INT, ir.AttributeType.STRING):
+        return attr.value
+    # Graphs and types are not compared
+    return None
+
+
+@dataclasses.dataclass
+class _CachedFold:
+    array: np.ndarray
+    # The output of the Constant node created for the first fold, if any
+    value: ir.Value | None = None
+
+
+class _FoldCache:
+    """A cache of constant folded values, bounded by the total size of the values.
+
+    The values are keyed by the op, its attributes and the content of its inputs, and
+    the least recently used values are evicted first.
+    """
+
+    def __init__(self, size_limit: int) -> None:
+        self.size_limit = size_limit
+        self.size = 0
+        self.hits = 0
+        self._entries: collections.OrderedDict[Hashable, _CachedFold] = (
+            collections.OrderedDict()
+        )
+
+    def key(
+        self, node: ir.Node, version: int, inputs: Sequence[np.ndarray]
+    ) -> Hashable | None:
+        """Returns the key of the fold of a node, or None if it cannot be cached."""
+        if self.size_limit <= 0:
+            return None
+        attributes = []
+        for name, attr in sorted(node.attributes.items()):
+            attr_key = _attribute_key(attr)
+            if attr_key is None:
+                return None
+            attributes.append((name, attr_key))
+        input_keys = []
+        for array in inputs:
+            input_key = _array_key(array)
+            if input_key is None:
+                return None
+            input_keys.append(input_key)
+        return (node.domain, node.op_type, version, tuple(attributes), tuple(input_keys))
+
+    def get(self, key: Hashable) -> _CachedFold | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, array: np.ndarray) -> _CachedFold | None:
+        if array.dtype.hasobject or array.nbytes > self.size_limit:
+            return None
+        entry = self._entries[key] = _CachedFold(array)
+        self.size += array.nbytes
+        while self.size > self.size_limit:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.array.nbytes
+        return entry
+
+
 class ConstantFolder:
     opset_imports: dict[str, int]
 
@@ -807,11 +1089,13 @@ class ConstantFolder:
         shape_inference: bool,
         input_size_limit: int,
         output_size_limit: int,
+        cache_size_limit: int = DEFAULT_CONSTANT_FOLD_CACHE_SIZE_LIMIT,
     ) -> None:
         self._external_data_folder = external_data_folder
         self._shape_inference = shape_inference
         self._input_size_limit = input_size_limit
         self._output_size_limit = output_size_limit
+        self._cache_size_limit = cache_size_limit
         self._init()
 
     def _init(self) -> None:
@@ -819,8 +1103,42 @@ class ConstantFolder:
         self.sizes: dict[str, int] = {}
         self.modified = False
         self._state = OptimizerState()
+        self._cache = _FoldCache(self._cache_size_limit)
 
     def _do_inference(self, node: ir.Node) -> None:
+        version = self.opset_imports.get(node.domain)
+        if version is not None:
+            try:
+                inferred = _shape_inference.infer_outputs(node, version)
+            except Exception as e:
+                logger.debug(
+                    "Falling back to ONNX shape inference for node %s due to exception: %s",
+                    node.name,
+                    e,
+                )
+                inferred = None
+            if inferred is not None:
+                for output, (dtype, shape) in zip(node.outputs, inferred):
+                    if shape is not None:
+                        if output.shape is None:
+                            output.shape = shape.copy()
+                        else:
+                            try:
+                                output.shape = _merge_shapes(output.shape, shape)
+                            except ValueError as e:
+                                logger.debug(
+                                    "Skipping shape inference for node %s due to exception: %s",
+                                    node.name,
+                                    e,
+                                )
+                                return
+                    if dtype is not None:
+                        output.type = ir.TensorType(dtype)
+                return
+        # Use the ONNX inferencer for the ops without an inference function
+        self._do_onnx_inference(node)
+
+    def _do_onnx_inference(self, node: ir.Node) -> None:
         output_types = {}
 
         # TODO: handle optional inputs
@@ -896,7 +1214,7 @@ class ConstantFolder:
             # as long as weight has no other uses. This won't increase model size.
             removed_input_size = 0
             for input in node.inputs:
-                if (input is not None) and (len(input.uses()) == 1):
+                if (input is not None) and (input.num_uses() == 1):
                     array = _get_numpy_value(input)
                     if array is not None:
                         removed_input_size += array.nbytes
@@ -976,23 +1294,41 @@ class ConstantFolder:
                 )
             return None
 
-        # Filter out bfloat16 cases?
-        def convert(av):
-            if av.type == ir.AttributeType.TENSOR:
-                return ir.serde.serialize_tensor(av.value)
-            return av.value
-
-        attr_values = {name: convert(attr) for name, attr in node.attributes.items()}
-        outputs = _reference_evaluator.evaluate(
-            node.domain, node.op_type, version, *input_values, **attr_values
-        )
+        if is_onnx_op(node, "ConstantOfShape"):
+            # The node is kept instead of being replaced, so its fold is not cached
+            cache_key = None
+        else:
+            cache_key = self._cache.key(node, version, input_values)  # type: ignore[arg-type]
+        cached = self._cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            shared_value = self._shared_constant(node, cached)
+            if shared_value is not None:
+                return Replacement([shared_value], [])
+            outputs = cached.array
+        else:
+            outputs = _numpy_kernels.evaluate(node, version, input_values)  # type: ignore[arg-type]
+        if outputs is None:
+            # Filter out bfloat16 cases?
+            def convert(av):
+                if av.type == ir.AttributeType.TENSOR:
+                    return ir.serde.serialize_tensor(av.value)
+                return av.value
+
+            attr_values = {name: convert(attr) for name, attr in node.attributes.items()}
+            outputs = _reference_evaluator.evaluate(
+                node.domain, node.op_type, version, *input_values, **attr_values
+            )
 
         if outputs is None:
             return None
         if len(node.outputs) == 1 and not isinstance(outputs, (tuple, list)):
+            if cached is None and cache_key is not None and isinstance(outputs, np.ndarray):
+                cached = self._cache.put(cache_key, outputs)
             replacement = self.new_constant(node, outputs)
             if is_onnx_op(node, "ConstantOfShape") or replacement is None:
                 return None
+            if cached is not None and cached.value is None:
+                cached.value = replacement.outputs[0]
             return Replacement(replacement.outputs, [replacement])
         else:
             logger.warning(
@@ -1000,12 +1336,36 @@ class ConstantFolder:
             )
         return None
 
+    def _shared_constant(self, node: ir.Node, cached: _CachedFold) -> ir.Value | None:
+        """Returns the output of an identical fold that the node output can be replaced with.
+
+        The output is shared when its Constant node is still in the graph before the node.
+        """
+        if cached.value is None or node.outputs[0].is_graph_output():
+            return None
+        producer = cached.value.producer()
+        graph = node.graph
+        if producer is None or graph is None or producer.graph is not graph:
+            return None
+        if not graph.is_before(producer, node):
+            return None
+        return cached.value
+
     def replace_node(self, node: ir.Node, replacement, root: ir.Graph | ir.Function):
         logger.debug("Replacing node: %s::%s %s", node.domain, node.op_type, node.name)
 
+        if not replacement.new_nodes:
+            # The node is replaced by the output of an identical earlier fold. That value
+            # keeps its own name, so the name of the node output is dropped.
+            ir.convenience.replace_all_uses_with(node.outputs, replacement.new_outputs)
+            root.remove(node, safe=True)
+            self.modified = True
+            return
+
         ir.convenience.replace_nodes_and_values(
             root, node, [node], replacement.new_nodes, node.outputs, replacement.new_outputs
         )
+        self.modified = True
 
         # TODO: what about new opset_imports?
         # TODO: track statistics about replaced nodes and sizes of new constants
@@ -1061,16 +1421,23 @@ def fold_constants(
     onnx_shape_inference: bool = False,
     input_size_limit: int = DEFAULT_CONSTANT_FOLD_INPUT_SIZE_LIMIT,
     output_size_limit: int = DEFAULT_CONSTANT_FOLD_OUTPUT_SIZE_LIMIT,
+    cache_size_limit: int = DEFAULT_CONSTANT_FOLD_CACHE_SIZE_LIMIT,
 ) -> bool:
     """
     Applies constant folding optimization to the model.
     Returns true iff the model was modified.
+
+    Identical folds, with the same op, attributes and input values, are computed once.
+    The computed values are cached up to a total size of ``cache_size_limit`` bytes,
+    and the later folds reuse the output of the first one when possible. Set
+    ``cache_size_limit`` to 0 to disable the cache.
     """
     folder = ConstantFolder(
         external_data_folder=external_data_folder,
         shape_inference=onnx_shape_inference,
         input_size_limit=input_size_limit,
         output_size_limit=output_size_limit,
+        cache_size_limit=cache_size_limit,
     )
     folder.visit_model(model)
     for op in folder.counts:
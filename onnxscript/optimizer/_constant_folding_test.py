@@ -562,6 +562,136 @@ class FoldConstantsIrTest(unittest.TestCase):
         optimized = self._fold(model)
         self.assertEqual(optimized.graph.node(-1).op_type, "Identity")
 
+    def test_gather_scalar_unsqueeze_symdim(self):
+        model = """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[B, 256] x) => (float[B, 256] z)
+            {
+                shape_x = Shape (x)
+                index_0 = Constant <value = int64 {0}> ()
+                b = Gather (shape_x, index_0)
+                axes = Constant <value_ints=[0]> ()
+                b_1d = Unsqueeze (b, axes)
+                const_256 = Constant <value_ints=[256]> ()
+                shape = Concat <axis=0> (b_1d, const_256)
+                z = Reshape (x, shape)
+            }
+        """
+        optimized = self._fold(model)
+        self.assertEqual(optimized.graph.node(-1).op_type, "Identity")
+
+    def test_reshape_identity_symbolic_expression(self):
+        model = """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[B, S, 64] x) => (float[B, S, 64] w)
+            {
+                shape_x = Shape (x)
+                index_1 = Constant <value_ints=[1]> ()
+                s = Gather (shape_x, index_1)
+                const_4 = Constant <value_ints=[4]> ()
+                s_4 = Mul (s, const_4)
+                const_16 = Constant <value_ints=[16]> ()
+                zero = Constant <value_ints=[0]> ()
+                shape_y = Concat <axis=0> (zero, s_4, const_16)
+                y = Reshape (x, shape_y)
+                minus_one = Constant <value_ints=[-1]> ()
+                shape_z = Concat <axis=0> (zero, s, minus_one)
+                z = Reshape (y, shape_z)
+                w = Reshape (z, shape_z)
+            }
+        """
+        optimized = self._fold(model)
+        nodes = {node.outputs[0].name: node for node in optimized.graph}
+        self.assertEqual(
+            nodes["y"].outputs[0].shape, ir.Shape(["B", ir.SymbolicDim("S") * 4, 16])
+        )
+        self.assertEqual(nodes["z"].outputs[0].shape, ir.Shape(["B", "S", 64]))
+        # The reshape of z to its own shape is removed
+        self.assertEqual(nodes["w"].op_type, "Identity")
+
+    @parameterized.parameterized.expand(
+        [
+            ("non_negative_dividend", "s", "S//4"),
+            # Div truncates toward zero, which differs from floor division when S < 10
+            ("dividend_may_be_negative", "s_minus_10", None),
+        ]
+    )
+    def test_symbolic_div_is_folded_only_for_non_negative_dividends(
+        self, _: str, dividend: str, expected: str | None
+    ):
+        model = f"""
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[B, S, 64] x) => (float[B, S, 64] z)
+            {{
+                shape_x = Shape (x)
+                index_1 = Constant <value_ints=[1]> ()
+                s = Gather (shape_x, index_1)
+                ten = Constant <value_ints=[10]> ()
+                s_minus_10 = Sub (s, ten)
+                four = Constant <value_ints=[4]> ()
+                quotient = Div ({dividend}, four)
+                zero = Constant <value_ints=[0]> ()
+                const_256 = Constant <value_ints=[256]> ()
+                shape_y = Concat <axis=0> (zero, quotient, const_256)
+                y = Reshape (x, shape_y)
+                z = Reshape (y, shape_x)
+            }}
+        """
+        optimized = self._fold(model)
+        nodes = {node.outputs[0].name: node for node in optimized.graph}
+        shape = nodes["y"].outputs[0].shape
+        if expected is None:
+            self.assertIsNone(shape)
+        else:
+            self.assertEqual(shape[1].value, expected)
+
+    def test_errors_in_shape_inference_do_not_abort_folding(self):
+        model = """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x) => (float[M] z)
+            {
+                start = Constant <value=float {0.0}> ()
+                limit = Constant <value=float {4.0}> ()
+                delta = Constant <value=float[2] {1.0, 2.0}> ()
+                z = Range (start, limit, delta)
+            }
+        """
+        # The delta is not a scalar, so the shape of the output cannot be inferred
+        optimized = self._fold(model, onnx_shape_inference=True)
+        self.assertEqual(optimized.graph.node(-1).op_type, "Range")
+
+    def test_reshape_copied_symdims_become_constant_shape(self):
+        model = """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[B, S, 64] x) => (float[B, S, 4, 16] z)
+            {
+                b_s = Shape <start=0, end=2> (x)
+                const_4_16 = Constant <value_ints=[4, 16]> ()
+                shape = Concat <axis=0> (b_s, const_4_16)
+                z = Reshape (x, shape)
+            }
+        """
+        optimized = self._fold(model)
+        self.assertEqual([node.op_type for node in optimized.graph], ["Constant", "Reshape"])
+        shape = optimized.graph.node(-1).inputs[1]
+        self.assertEqual(shape.const_value.numpy().tolist(), [0, 0, 4, 16])
+
+    def test_expand_identity_broadcast_symdim(self):
+        model = """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[B, S, 256] x) => (float[B, S, 256] z)
+            {
+                shape_x = Shape (x)
+                index_1 = Constant <value_ints=[1]> ()
+                s = Gather (shape_x, index_1)
+                one = Constant <value_ints=[1]> ()
+                shape = Concat <axis=0> (one, s, one)
+                z = Expand (x, shape)
+            }
+        """
+        optimized = self._fold(model)
+        self.assertEqual(optimized.graph.node(-1).op_type, "Identity")
+
     def test_large_transpose(self):
         model = """
             <ir_version: 7, opset_import: [ "" : 17]>
@@ -589,5 +719,98 @@ class FoldConstantsIrTest(unittest.TestCase):
         self.assertEqual(ops, ["Constant", "MatMul"])
 
 
+class FoldCacheTest(unittest.TestCase):
+    _MODEL = """
+        <ir_version: 7, opset_import: [ "" : 17]>
+        agraph (float[4] x) => (float[4] z1, float[4] z2)
+        {
+            shape1 = Constant <value_ints=[4]> ()
+            ones1 = ConstantOfShape <value=float {1.0}> (shape1)
+            two1 = Add (ones1, ones1)
+            z1 = Mul (x, two1)
+            shape2 = Constant <value_ints=[4]> ()
+            ones2 = ConstantOfShape <value=float {1.0}> (shape2)
+            two2 = Add (ones2, ones2)
+            z2 = Mul (x, two2)
+        }
+    """
+
+    def _fold(self, **kwargs) -> ir.Model:
+        model = serde.deserialize_model(onnx.parser.parse_model(self._MODEL))
+        _constant_folding.fold_constants(model, **kwargs)
+        optimizer.remove_unused_nodes(model)
+        return model
+
+    def test_identical_folds_share_one_constant(self):
+        model = self._fold()
+        ops = [node.op_type for node in model.graph]
+        self.assertEqual(ops, ["Constant", "Mul", "Mul"])
+        mul1, mul2 = model.graph.node(1), model.graph.node(2)
+        self.assertIs(mul1.inputs[1], mul2.inputs[1])
+        np.testing.assert_array_equal(mul1.inputs[1].const_value.numpy(), [2.0] * 4)
+
+    def test_identical_folds_are_not_shared_without_cache(self):
+        model = self._fold(cache_size_limit=0)
+        ops = [node.op_type for node in model.graph]
+        self.assertEqual(ops, ["Constant", "Mul", "Constant", "Mul"])
+
+    def test_cache_keys_depend_on_attributes_and_inputs(self):
+        cache = _constant_folding._FoldCache(1024)
+        node = ir.Node("", "Concat", [], attributes=[ir.AttrInt64("axis", 0)])
+        other_axis = ir.Node("", "Concat", [], attributes=[ir.AttrInt64("axis", 1)])
+        inputs = [np.ones((2, 2), np.float32)]
+        self.assertEqual(cache.key(node, 17, inputs), cache.key(node, 17, inputs))
+        self.assertNotEqual(cache.key(node, 17, inputs), cache.key(other_axis, 17, inputs))
+        self.assertNotEqual(cache.key(node, 17, inputs), cache.key(node, 17, [inputs[0] * 2]))
+        self.assertNotEqual(
+            cache.key(node, 17, inputs), cache.key(node, 17, [inputs[0].astype(np.float64)])
+        )
+        self.assertIsNone(cache.key(node, 17, [np.array(["a"], dtype=object)]))
+
+    def test_cache_keys_compare_float_attributes_by_their_bits(self):
+        cache = _constant_folding._FoldCache(1024)
+        inputs = [np.ones((2,), np.float32)]
+
+        def key(alpha):
+            node = ir.Node("", "LeakyRelu", [], attributes=[ir.AttrFloat32("alpha", alpha)])
+            return cache.key(node, 17, inputs)
+
+        self.assertNotEqual(key(0.0), key(-0.0))
+        self.assertEqual(key(float("nan")), key(float("nan")))
+        self.assertEqual(key(0.5), key(0.5))
+
+        def floats_key(values):
+            node = ir.Node("", "Op", [], attributes=[ir.AttrFloat32s("values", values)])
+            return cache.key(node, 17, inputs)
+
+        self.assertNotEqual(floats_key([0.0, 1.0]), floats_key([-0.0, 1.0]))
+        self.assertEqual(floats_key([float("nan")]), floats_key([float("nan")]))
+
+    def test_constant_of_shape_is_not_cached(self):
+        model = serde.deserialize_model(onnx.parser.parse_model(self._MODEL))
+        folder = _constant_folding.ConstantFolder(
+            external_data_folder="",
+            shape_inference=True,
+            input_size_limit=_constant_folding.DEFAULT_CONSTANT_FOLD_INPUT_SIZE_LIMIT,
+            output_size_limit=_constant_folding.DEFAULT_CONSTANT_FOLD_OUTPUT_SIZE_LIMIT,
+        )
+        folder.visit_model(model)
+        # Only the result of the first Add is cached. The second Add hits it.
+        self.assertEqual(folder._cache.size, 4 * 4)
+        self.assertEqual(folder._cache.hits, 1)
+
+    def test_cache_evicts_least_recently_used_values_beyond_size_limit(self):
+        cache = _constant_folding._FoldCache(size_limit=16)
+        cache.put("a", np.zeros(2, np.float32))
+        cache.put("b", np.zeros(2, np.float32))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", np.zeros(2, np.float32))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.size, 16)
+        self.assertIsNone(cache.put("d", np.zeros(8, np.float32)))
+
+
 if __name__ == "__main__":
     unittest.main()
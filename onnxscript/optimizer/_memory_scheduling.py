@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Pass for reordering the nodes of a model to lower its peak memory."""
+
+from __future__ import annotations
+
+__all__ = [
+    "MemoryAwareSchedulingPass",
+    "schedule_for_memory",
+]
+
+import logging
+from typing import Literal, Mapping
+
+from onnxscript import ir
+from onnxscript.ir import analysis
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryAwareSchedulingPass(ir.passes.PassBase):
+    """Reorder the nodes of the main graph to lower the peak size of the live tensors.
+
+    Runtimes like ONNX Runtime execute the nodes in the order of the graph, so the
+    order decides which intermediate tensors are alive together. The sizes of the
+    tensors are computed from the types and shapes of the values, see
+    :func:`onnxscript.ir.analysis.estimate_memory`. The new order is applied only
+    when its estimated peak is lower than the peak of the current order.
+
+    Strategies:
+        - ``"greedy"``: Run the available node increasing the live memory the least.
+        - ``"lookahead"``: Simulate ``lookahead`` steps for the best ranked available
+          nodes and run the one leading to the lowest peak. It is slower but avoids
+          some of the traps of the greedy strategy.
+
+    Attributes:
+        peak_bytes_before: The estimated peak of the main graph before the last run.
+        peak_bytes_after: The estimated peak of the main graph after the last run.
+    """
+
+    def __init__(
+        self,
+        dim_values: Mapping[str, int] | None = None,
+        strategy: Literal["greedy", "lookahead"] = "greedy",
+        lookahead: int = 4,
+    ) -> None:
+        """Initialize the pass.
+
+        Args:
+            dim_values: The sizes of the symbolic dimensions by name. Tensors of
+                unknown sizes are counted as 0 bytes.
+            strategy: The scheduling strategy, ``"greedy"`` or ``"lookahead"``.
+            lookahead: The number of steps simulated to choose each node with the
+                ``"lookahead"`` strategy.
+        """
+        super().__init__()
+        if strategy not in ("greedy", "lookahead"):
+            raise ValueError(
+                f"Unknown strategy {strategy!r}, expected 'greedy' or 'lookahead'"
+            )
+        if lookahead < 1:
+            raise ValueError(f"lookahead must be at least 1, got {lookahead}")
+        self.dim_values = dim_values
+        self.strategy = strategy
+        self.lookahead = lookahead
+        self.peak_bytes_before = 0
+        self.peak_bytes_after = 0
+
+    def call(self, model: ir.Model) -> ir.passes.PassResult:
+        graph = model.graph
+        before = analysis.estimate_memory(graph, self.dim_values)
+        after = analysis.memory_aware_sort(
+            graph,
+            self.dim_values,
+            lookahead=self.lookahead if self.strategy == "lookahead" else 1,
+        )
+        self.peak_bytes_before = before.peak_bytes
+        self.peak_bytes_after = after.peak_bytes
+        modified = after.order != before.order
+        if modified:
+            logger.info(
+                "Reordered the nodes to lower the estimated peak memory from %s to %s bytes",
+                before.peak_bytes,
+                after.peak_bytes,
+            )
+        else:
+            logger.info(
+                "Kept the order of the nodes with an estimated peak memory of %s bytes",
+                before.peak_bytes,
+            )
+        if before.unknown_values:
+            logger.debug(
+                "Values of unknown sizes counted as 0 bytes: %s",
+                [value.name for value in before.unknown_values],
+            )
+        return ir.passes.PassResult(model, modified=modified)
+
+
+def schedule_for_memory(
+    model: ir.Model,
+    dim_values: Mapping[str, int] | None = None,
+    *,
+    strategy: Literal["greedy", "lookahead"] = "greedy",
+    lookahead: int = 4,
+) -> tuple[int, int]:
+    """Reorder the nodes of the main graph in place to lower its peak memory.
+
+    See :class:`MemoryAwareSchedulingPass` for the arguments.
+
+    Returns:
+        The estimated peak memory in bytes before and after the reordering.
+    """
+    pass_ = MemoryAwareSchedulingPass(dim_values, strategy=strategy, lookahead=lookahead)
+    pass_(model)
+    return pass_.peak_bytes_before, pass_.peak_bytes_after
@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import unittest
+
+import onnx.parser
+
+import onnxscript.optimizer
+from onnxscript import ir
+
+
+def _model() -> ir.Model:
+    # Running Expand to a first, then reducing it, lowers the peak. The greedy
+    # strategy runs Expand to c first because it allocates less.
+    return ir.serde.deserialize_model(
+        onnx.parser.parse_model(
+            """
+            <ir_version: 10, opset_import: ["" : 20]>
+            agraph (float[10] x) => (float[20] e)
+            <float[50] a, float[1] b, float[20] c, int64[1] s50 = {50}, int64[1] s20 = {20}>
+            {
+                c = Expand(x, s20)
+                a = Expand(x, s50)
+                b = ReduceSum(a)
+                e = Add(b, c)
+            }
+            """
+        )
+    )
+
+
+def _output_names(model: ir.Model) -> list[str]:
+    return [node.outputs[0].name for node in model.graph]  # type: ignore[misc]
+
+
+class MemoryAwareSchedulingPassTest(unittest.TestCase):
+    def test_greedy_strategy_keeps_the_order_when_it_does_not_lower_the_peak(self):
+        model = _model()
+        pass_ = onnxscript.optimizer.MemoryAwareSchedulingPass()
+        result = pass_(model)
+        self.assertFalse(result.modified)
+        self.assertEqual(_output_names(model), ["c", "a", "b", "e"])
+        self.assertEqual(pass_.peak_bytes_before, 320)
+        self.assertEqual(pass_.peak_bytes_after, 320)
+
+    def test_lookahead_strategy_lowers_the_peak(self):
+        model = _model()
+        pass_ = onnxscript.optimizer.MemoryAwareSchedulingPass(
+            strategy="lookahead", lookahead=2
+        )
+        result = pass_(model)
+        self.assertTrue(result.modified)
+        self.assertEqual(_output_names(model), ["a", "b", "c", "e"])
+        self.assertEqual(pass_.peak_bytes_before, 320)
+        self.assertEqual(pass_.peak_bytes_after, 244)
+
+    def test_schedule_for_memory_returns_the_peaks(self):
+        model = _model()
+        self.assertEqual(
+            onnxscript.optimizer.schedule_for_memory(model, strategy="lookahead"), (320, 244)
+        )
+        ir.serde.serialize_model(model)
+
+    def test_symbolic_dims_are_bound_to_the_given_sizes(self):
+        model = ir.serde.deserialize_model(
+            onnx.parser.parse_model(
+                """
+                <ir_version: 10, opset_import: ["" : 20]>
+                agraph (float[N] x) => (float[N] z) {
+                    y = Relu(x)
+                    z = Neg(y)
+                }
+                """
+            )
+        )
+        model.graph.node(0).outputs[0].shape = ir.Shape(["N"])
+        model.graph.node(0).outputs[0].dtype = ir.DataType.FLOAT
+        self.assertEqual(onnxscript.optimizer.schedule_for_memory(model, {"N": 4}), (32, 32))
+
+    def test_init_raises_for_unknown_strategy(self):
+        with self.assertRaisesRegex(ValueError, "strategy"):
+            onnxscript.optimizer.MemoryAwareSchedulingPass(strategy="optimal")  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,325 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""NumPy implementations of common ONNX ops used by the constant folder.
+
+Evaluating an op with the ONNX reference implementation creates an evaluator and
+serializes its attributes to protos, which dominates the time to fold the small
+tensors of shape computations. The kernels below compute the ops directly with
+NumPy. A kernel returns None when it does not support its inputs or attributes, in
+which case the constant folder falls back to the reference implementation.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "KernelRegistry",
+    "evaluate",
+    "register",
+    "registry",
+]
+
+import dataclasses
+import logging
+from typing import Callable, Sequence
+
+import numpy as np
+
+import onnxscript.ir as ir
+import onnxscript.utils.utils as utils
+
+logger = logging.getLogger(__name__)
+
+# A kernel takes the node and the values of its inputs, and returns the value of its
+# single output, or None if it cannot evaluate the node.
+Kernel = Callable[..., "np.ndarray | None"]
+
+# The types supported by the arithmetic kernels. Other types, like bfloat16 or
+# float8, are evaluated with the reference implementation.
+_NUMPY_DTYPES = frozenset(
+    np.dtype(dtype)
+    for dtype in (
+        np.bool_,
+        np.int8,
+        np.int16,
+        np.int32,
+        np.int64,
+        np.uint8,
+        np.uint16,
+        np.uint32,
+        np.uint64,
+        np.float16,
+        np.float32,
+        np.float64,
+    )
+)
+
+
+@dataclasses.dataclass
+class _VersionedKernel:
+    min_version: int | None
+    max_version: int | None
+    function: Kernel
+
+    def valid_for(self, version: int) -> bool:
+        return (self.min_version is None or version >= self.min_version) and (
+            self.max_version is None or version <= self.max_version
+        )
+
+
+class KernelRegistry:
+    """A registry of NumPy kernels for ops of the ONNX domain."""
+
+    def __init__(self) -> None:
+        self.op_kernels: dict[str, list[_VersionedKernel]] = {}
+
+    def lookup(self, domain: str, op_type: str, version: int) -> Kernel | None:
+        if not utils.is_onnx_domain(domain):
+            return None
+        for kernel in self.op_kernels.get(op_type, ()):
+            if kernel.valid_for(version):
+                return kernel.function
+        return None
+
+    def register(
+        self, op_type: str, version: int | tuple[int | None, int | None] | None = None
+    ) -> Callable[[Kernel], Kernel]:
+        if version is None:
+            min_version, max_version = None, None
+        elif isinstance(version, int):
+            min_version, max_version = version, version
+        else:
+            min_version, max_version = version
+
+        def decorator(function: Kernel) -> Kernel:
+            self.op_kernels.setdefault(op_type, []).append(
+                _VersionedKernel(min_version, max_version, function)
+            )
+            return function
+
+        return decorator
+
+
+registry = KernelRegistry()
+
+register = registry.register
+
+
+def evaluate(node: ir.Node, version: int, inputs: Sequence[np.ndarray]) -> np.ndarray | None:
+    """Evaluate a node with a registered kernel.
+
+    Returns:
+        The value of the single output of the node, or None if there is no kernel
+        for the op or if the kernel does not support the inputs.
+    """
+    kernel = registry.lookup(node.domain, node.op_type, version)
+    if kernel is None or len(node.outputs) != 1:
+        return None
+    try:
+        result = kernel(node, *inputs)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # The reference implementation reports the error, if any
+        logger.debug("NumPy kernel for %s failed: %s", node.op_type, e)
+        return None
+    if result is None:
+        return None
+    return np.asarray(result)
+
+
+def _int_attribute(node: ir.Node, name: str, default: int | None = None) -> int | None:
+    attr = node.attributes.get(name)
+    if attr is None:
+        return default
+    if not isinstance(attr, ir.Attr) or attr.type != ir.AttributeType.INT:
+        return None
+    return attr.value
+
+
+def _ints_attribute(node: ir.Node, name: str) -> list[int] | None:
+    attr = node.attributes.get(name)
+    if not isinstance(attr, ir.Attr) or attr.type != ir.AttributeType.INTS:
+        return None
+    return list(attr.value)
+
+
+def _is_numpy_dtype(*arrays: np.ndarray) -> bool:
+    return all(array.dtype in _NUMPY_DTYPES for array in arrays)
+
+
+def _same_numpy_dtype(*arrays: np.ndarray) -> bool:
+    dtype = arrays[0].dtype
+    return dtype in _NUMPY_DTYPES and all(array.dtype == dtype for array in arrays)
+
+
+@register("Add")
+def add(node: ir.Node, a: np.ndarray, b: np.ndarray) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(a, b):
+        return None
+    return np.add(a, b)
+
+
+@register("Sub")
+def sub(node: ir.Node, a: np.ndarray, b: np.ndarray) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(a, b):
+        return None
+    return np.subtract(a, b)
+
+
+@register("Mul")
+def mul(node: ir.Node, a: np.ndarray, b: np.ndarray) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(a, b):
+        return None
+    return np.multiply(a, b)
+
+
+@register("Div")
+def div(node: ir.Node, a: np.ndarray, b: np.ndarray) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(a, b):
+        return None
+    if np.issubdtype(a.dtype, np.integer):
+        if not np.all(b):
+            return None
+        # Integer division truncates toward zero
+        quotient = np.floor_divide(a, b)
+        needs_adjustment = (np.remainder(a, b) != 0) & ((a < 0) ^ (b < 0))
+        return quotient + needs_adjustment.astype(quotient.dtype)
+    return np.divide(a, b)
+
+
+@register("Equal")
+def equal(node: ir.Node, a: np.ndarray, b: np.ndarray) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(a, b):
+        return None
+    return np.equal(a, b)
+
+
+@register("Where")
+def where(
+    node: ir.Node, condition: np.ndarray, x: np.ndarray, y: np.ndarray
+) -> np.ndarray | None:
+    del node
+    if condition.dtype != np.bool_ or not _same_numpy_dtype(x, y):
+        return None
+    return np.where(condition, x, y)
+
+
+@register("Cast")
+def cast(node: ir.Node, input: np.ndarray) -> np.ndarray | None:
+    to = _int_attribute(node, "to")
+    if to is None:
+        return None
+    dtype = np.dtype(ir.DataType(to).numpy())
+    if not _is_numpy_dtype(input) or dtype not in _NUMPY_DTYPES:
+        return None
+    return input.astype(dtype)
+
+
+@register("Shape")
+def shape(node: ir.Node, input: np.ndarray) -> np.ndarray | None:
+    start = _int_attribute(node, "start", 0)
+    end = _int_attribute(node, "end", None)
+    return np.array(input.shape[start:end], dtype=np.int64)
+
+
+@register("Gather")
+def gather(node: ir.Node, data: np.ndarray, indices: np.ndarray) -> np.ndarray | None:
+    axis = _int_attribute(node, "axis", 0)
+    if axis is None or not np.issubdtype(indices.dtype, np.integer):
+        return None
+    return np.take(data, indices, axis=axis)
+
+
+@register("Slice", version=(10, None))
+def slice_(
+    node: ir.Node,
+    data: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    axes: np.ndarray | None = None,
+    steps: np.ndarray | None = None,
+) -> np.ndarray | None:
+    del node
+    if axes is None:
+        axes = np.arange(len(starts))
+    if steps is None:
+        steps = np.ones(len(starts), dtype=np.int64)
+    if not len(starts) == len(ends) == len(axes) == len(steps):
+        return None
+    slices = [slice(None)] * data.ndim
+    for start, end, axis, step in zip(
+        starts.tolist(), ends.tolist(), axes.tolist(), steps.tolist()
+    ):
+        if step == 0:
+            return None
+        # Python slices clamp the starts and ends like ONNX does
+        slices[axis] = slice(start, end, step)
+    return data[tuple(slices)]
+
+
+@register("Concat")
+def concat(node: ir.Node, *inputs: np.ndarray) -> np.ndarray | None:
+    axis = _int_attribute(node, "axis")
+    if axis is None or not _same_numpy_dtype(*inputs):
+        return None
+    return np.concatenate(inputs, axis=axis)
+
+
+@register("Unsqueeze")
+def unsqueeze(
+    node: ir.Node, data: np.ndarray, axes: np.ndarray | None = None
+) -> np.ndarray | None:
+    axes_list = _ints_attribute(node, "axes") if axes is None else axes.tolist()
+    if axes_list is None:
+        return None
+    return np.expand_dims(data, tuple(np.atleast_1d(axes_list).tolist()))
+
+
+@register("Squeeze")
+def squeeze(
+    node: ir.Node, data: np.ndarray, axes: np.ndarray | None = None
+) -> np.ndarray | None:
+    axes_list = _ints_attribute(node, "axes") if axes is None else axes.tolist()
+    if axes_list is None:
+        return np.squeeze(data)
+    return np.squeeze(data, axis=tuple(np.atleast_1d(axes_list).tolist()))
+
+
+@register("Reshape", version=(5, None))
+def reshape(node: ir.Node, data: np.ndarray, shape: np.ndarray) -> np.ndarray | None:
+    new_shape = shape.tolist()
+    if not _int_attribute(node, "allowzero", 0):
+        # A zero copies the dimension of the input
+        new_shape = [
+            data.shape[i] if dim == 0 and i < data.ndim else dim
+            for i, dim in enumerate(new_shape)
+        ]
+    return np.reshape(data, new_shape)
+
+
+@register("Range")
+def range_(
+    node: ir.Node, start: np.ndarray, limit: np.ndarray, delta: np.ndarray
+) -> np.ndarray | None:
+    del node
+    if not _same_numpy_dtype(start, limit, delta) or start.dtype == np.bool_:
+        return None
+    if delta == 0:
+        return None
+    return np.arange(start, limit, delta, dtype=start.dtype)
+
+
+@register("ConstantOfShape")
+def constant_of_shape(node: ir.Node, shape: np.ndarray) -> np.ndarray | None:
+    attr = node.attributes.get("value")
+    if attr is None:
+        return np.zeros(shape.tolist(), dtype=np.float32)
+    if not isinstance(attr, ir.Attr) or attr.type != ir.AttributeType.TENSOR:
+        return None
+    value = attr.as_tensor().numpy()
+    if value.size != 1:
+        return None
+    return np.full(shape.tolist(), value.reshape(()), dtype=value.dtype)
@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+import onnx.reference.ops
+import parameterized
+
+from onnxscript import ir
+from onnxscript.optimizer import _numpy_kernels
+
+_OPSET_VERSION = 20
+
+
+def _node(op_type: str, num_inputs: int, attributes: dict) -> ir.Node:
+    return ir.Node(
+        "",
+        op_type,
+        [ir.Value(name=f"input_{i}") for i in range(num_inputs)],
+        attributes=ir.convenience.convert_attributes(attributes),
+    )
+
+
+def _reference(op_type: str, inputs, attributes: dict) -> np.ndarray:
+    attributes = {
+        name: ir.serde.serialize_tensor(value)
+        if isinstance(value, ir.TensorProtocol)
+        else value
+        for name, value in attributes.items()
+    }
+    evaluator = onnx.reference.ops.load_op("", op_type, _OPSET_VERSION)
+    return evaluator.eval(*inputs, **attributes)
+
+
+def _int64(*values) -> np.ndarray:
+    return np.array(values, dtype=np.int64)
+
+
+class NumpyKernelsTest(unittest.TestCase):
+    @parameterized.parameterized.expand(
+        [
+            ("add", "Add", [_int64(1, 2), _int64(3)], {}),
+            ("sub", "Sub", [np.array([1.5, 2.0], np.float32), np.float32(0.5)], {}),
+            ("mul", "Mul", [_int64(2, 3), _int64(4, 5)], {}),
+            ("div_float", "Div", [np.array([1.0, 3.0]), np.array([2.0, -4.0])], {}),
+            ("div_int_truncates", "Div", [_int64(7, -7, 7, -7), _int64(2, 2, -2, -2)], {}),
+            ("equal", "Equal", [_int64(1, 2, 3), _int64(1, 0, 3)], {}),
+            (
+                "where",
+                "Where",
+                [np.array([True, False]), _int64(1, 2), _int64(3, 4)],
+                {},
+            ),
+            ("cast", "Cast", [np.array([1.7, -1.7], np.float32)], {"to": ir.DataType.INT64}),
+            ("cast_to_bool", "Cast", [_int64(0, 2)], {"to": ir.DataType.BOOL}),
+            ("shape", "Shape", [np.zeros((2, 3, 4))], {}),
+            ("shape_start_end", "Shape", [np.zeros((2, 3, 4))], {"start": 1, "end": -1}),
+            ("gather", "Gather", [_int64(5, 6, 7), _int64(-1, 0)], {}),
+            ("gather_scalar", "Gather", [_int64(5, 6, 7), np.array(1, np.int64)], {}),
+            (
+                "gather_axis",
+                "Gather",
+                [np.arange(6).reshape(2, 3), _int64(2)],
+                {"axis": 1},
+            ),
+            ("slice", "Slice", [np.arange(10), _int64(2), _int64(-2)], {}),
+            (
+                "slice_axes_steps",
+                "Slice",
+                [
+                    np.arange(12).reshape(3, 4),
+                    _int64(-1),
+                    _int64(-(2**63)),
+                    _int64(1),
+                    _int64(-2),
+                ],
+                {},
+            ),
+            ("slice_clamped", "Slice", [np.arange(5), _int64(1), _int64(2**63 - 1)], {}),
+            ("concat", "Concat", [_int64(1), _int64(2, 3), _int64()], {"axis": 0}),
+            ("unsqueeze", "Unsqueeze", [np.array(3, np.int64), _int64(0)], {}),
+            ("unsqueeze_negative", "Unsqueeze", [_int64(1, 2), _int64(-1, 0)], {}),
+            ("squeeze", "Squeeze", [np.zeros((1, 2, 1)), _int64(0)], {}),
+            ("squeeze_all", "Squeeze", [np.zeros((1, 2, 1))], {}),
+            ("reshape", "Reshape", [np.arange(6), _int64(2, -1)], {}),
+            ("reshape_zero", "Reshape", [np.zeros((2, 3)), _int64(0, 3, 1)], {}),
+            (
+                "reshape_allowzero",
+                "Reshape",
+                [np.zeros((0, 3)), _int64(3, 0)],
+                {"allowzero": 1},
+            ),
+            (
+                "range",
+                "Range",
+                [np.array(1, np.int64), np.array(10, np.int64), np.array(3, np.int64)],
+                {},
+            ),
+            (
+                "range_float",
+                "Range",
+                [np.float32(1.0), np.float32(-1.0), np.float32(-0.5)],
+                {},
+            ),
+            ("constant_of_shape", "ConstantOfShape", [_int64(2, 3)], {}),
+            (
+                "constant_of_shape_value",
+                "ConstantOfShape",
+                [_int64(2)],
+                {"value": ir.tensor([7], dtype=ir.DataType.INT64)},
+            ),
+        ]
+    )
+    def test_kernel_matches_reference_implementation(
+        self, _: str, op_type: str, inputs: list, attributes: dict
+    ):
+        inputs = [np.asarray(input) for input in inputs]
+        node = _node(op_type, len(inputs), attributes)
+        result = _numpy_kernels.evaluate(node, _OPSET_VERSION, inputs)
+        self.assertIsNotNone(result)
+        expected = _reference(op_type, inputs, attributes)
+        self.assertEqual(result.dtype, expected.dtype)
+        np.testing.assert_array_equal(result, expected)
+
+    @parameterized.parameterized.expand(
+        [
+            ("mixed_dtypes", "Add", [_int64(1), np.array([1], np.int32)], {}),
+            ("integer_division_by_zero", "Div", [_int64(1), _int64(0)], {}),
+            (
+                "zero_step",
+                "Slice",
+                [np.arange(4), _int64(0), _int64(4), _int64(0), _int64(0)],
+                {},
+            ),
+            ("unsupported_dtype", "Cast", [_int64(1)], {"to": ir.DataType.BFLOAT16}),
+            ("invalid_reshape", "Reshape", [np.arange(6), _int64(4, -1)], {}),
+            ("op_without_kernel", "Relu", [np.ones(2)], {}),
+        ]
+    )
+    def test_evaluate_returns_none_when_not_supported(
+        self, _: str, op_type: str, inputs: list, attributes: dict
+    ):
+        node = _node(op_type, len(inputs), attributes)
+        self.assertIsNone(_numpy_kernels.evaluate(node, _OPSET_VERSION, inputs))
+
+    def test_kernels_are_not_used_for_other_domains(self):
+        node = ir.Node("com.microsoft", "Add", [ir.Value(), ir.Value()])
+        self.assertIsNone(_numpy_kernels.evaluate(node, 1, [_int64(1), _int64(2)]))
+
+    def test_kernels_are_not_used_for_older_versions(self):
+        node = _node("Slice", 1, {"starts": [0], "ends": [1]})
+        self.assertIsNone(_numpy_kernels.evaluate(node, 9, [np.arange(4)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
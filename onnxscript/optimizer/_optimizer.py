@@ -2,10 +2,13 @@
 # Licensed under the MIT License.
 from __future__ import annotations
 
+import collections
+import itertools
 import logging
+from typing import Iterable, Sequence
 
 from onnxscript import ir, rewriter
-from onnxscript.optimizer import _constant_folding, _inliner
+from onnxscript.optimizer import _constant_folding, _inliner, _remove_unused_function
 from onnxscript.optimizer._remove_unused import remove_unused_nodes
 from onnxscript.rewriter import (
     broadcast_to_matmul,
@@ -13,6 +16,7 @@ from onnxscript.rewriter import (
     collapse_slices,
     gemm_to_matmul_add,
     no_op,
+    pattern,
 )
 
 logger = logging.getLogger(__name__)
@@ -26,6 +30,168 @@ _DEFAULT_REWRITE_RULES = [
 ]
 
 
+class _WorklistOptimizer(_constant_folding.ConstantFolder):
+    """Folds constants and applies rewrite rules to a model until nothing changes.
+
+    The nodes of the main graph and of the functions are visited in order. When
+    a node is folded or rewritten, only the nodes that a rule or a fold may now
+    apply to are added to the worklist:
+
+    - the new nodes;
+    - the consumers of the new values, and their consumers down to the depth of the
+      largest rule pattern, for rules rooted further downstream;
+    - the producers of the inputs of the removed nodes and their consumers down to
+      the same depth, since a rewrite may only be valid once a value has no other
+      consumers.
+
+    Subgraphs are constant folded once, like by the constant folder.
+    """
+
+    def __init__(
+        self,
+        rules: pattern.RewriteRuleSet,
+        *,
+        max_visits: int,
+        shape_inference: bool,
+        input_size_limit: int,
+        output_size_limit: int,
+    ) -> None:
+        super().__init__(
+            external_data_folder="",
+            shape_inference=shape_inference,
+            input_size_limit=input_size_limit,
+            output_size_limit=output_size_limit,
+        )
+        self._rules = rules
+        # The consumers of a changed value may match a rule rooted this many nodes below
+        self._downstream_depth = max(rules.max_pattern_size() - 1, 1)
+        self._max_visits = max_visits
+        self._model: ir.Model | None = None
+        self.num_folded = 0
+        self.num_rewritten = 0
+
+    def visit_model(self, model: ir.Model) -> None:
+        self._model = model
+        self.num_folded = 0
+        self.num_rewritten = 0
+        super().visit_model(model)
+
+    def visit_graph(self, graph: ir.Graph) -> None:
+        assert self._model is not None
+        if graph is not self._model.graph:
+            super().visit_graph(graph)
+            return
+        self._state.push_initializer_inputs()
+        for input in graph.inputs:
+            if input.const_value is not None:
+                self._state.add_initializer_input(input)
+        self._visit_to_fixpoint(graph)
+        self._state.pop_initializer_inputs()
+
+    def visit_function(self, function: ir.Function) -> None:
+        self._visit_to_fixpoint(function)
+
+    def _visit_to_fixpoint(self, root: ir.Graph | ir.Function) -> None:
+        for rule in self._rules:
+            if rule.graph_pre_visitor:
+                rule.graph_pre_visitor()
+
+        # Each entry of the worklist has a unique generation. A node is moved to the
+        # front by adding a new entry, which makes its older entry stale. Stale entries
+        # are skipped when they are reached instead of being removed from the deque.
+        generations = itertools.count()
+        queued: dict[ir.Node, int] = {node: next(generations) for node in root}
+        worklist = collections.deque(queued.items())
+        visits: collections.Counter[ir.Node] = collections.Counter()
+
+        def enqueue(node: ir.Node) -> None:
+            if node not in queued:
+                generation = queued[node] = next(generations)
+                worklist.append((node, generation))
+
+        def enqueue_consumers(values: Iterable[ir.Value | None], graph: ir.Graph) -> None:
+            visited: set[ir.Node] = set()
+            for _ in range(self._downstream_depth):
+                users = []
+                for value in values:
+                    if value is None:
+                        continue
+                    for user, _ in value.uses():
+                        # Nodes of subgraphs using the value are not in the worklist
+                        if user.graph is graph and user not in visited:
+                            visited.add(user)
+                            users.append(user)
+                            enqueue(user)
+                values = [output for user in users for output in user.outputs]
+
+        def enqueue_next(nodes: Sequence[ir.Node]) -> None:
+            # The new nodes are visited first to visit the producers before the consumers
+            for node in reversed(nodes):
+                generation = queued[node] = next(generations)
+                worklist.appendleft((node, generation))
+
+        while worklist:
+            node, generation = worklist.popleft()
+            if queued.get(node) != generation:
+                # A newer entry of the node supersedes this one
+                continue
+            del queued[node]
+            if node.graph is None:
+                # The node was removed by an earlier replacement
+                continue
+            if visits[node] >= self._max_visits:
+                continue
+            visits[node] += 1
+            graph = node.graph
+            changes = self._optimize_node(node, root, first_visit=visits[node] == 1)
+            if changes is None:
+                continue
+            new_nodes, new_values, removed_inputs = changes
+            enqueue_next(new_nodes)
+            enqueue_consumers(new_values, graph)
+            producers: dict[ir.Node, None] = {}
+            for value in removed_inputs:
+                producer = value.producer() if value is not None else None
+                if producer is not None and producer.graph is graph:
+                    producers[producer] = None
+            for producer in producers:
+                enqueue(producer)
+            enqueue_consumers(
+                [output for producer in producers for output in producer.outputs], graph
+            )
+
+        for rule in self._rules:
+            if rule.graph_post_visitor:
+                rule.graph_post_visitor()
+
+    def _optimize_node(
+        self, node: ir.Node, root: ir.Graph | ir.Function, *, first_visit: bool
+    ) -> tuple[Sequence[ir.Node], Sequence[ir.Value | None], Sequence[ir.Value | None]] | None:
+        """Fold or rewrite the node.
+
+        Returns:
+            The new nodes, the new values and the inputs of the removed nodes, or None
+            if the node is unchanged.
+        """
+        replacement = self.process_node(node)
+        if replacement is not None:
+            removed_inputs = list(node.inputs)
+            self.replace_node(node, replacement, root)
+            self.num_folded += 1
+            return replacement.new_nodes, replacement.new_outputs, removed_inputs
+        if first_visit:
+            # Constant fold the subgraphs
+            for attr in node.attributes.values():
+                self.visit_attribute(attr)
+        assert self._model is not None
+        delta = self._rules.apply_to_node(self._model, root, node)
+        if delta is None:
+            return None
+        self.modified = True
+        self.num_rewritten += 1
+        return delta.new_nodes, delta.new_outputs, delta.removed_inputs
+
+
 def optimize_ir(
     model: ir.Model,
     num_iterations: int = 2,
@@ -39,23 +205,44 @@ def optimize_ir(
 
     Args:
         model: The model to be optimized.
-        num_iterations: Number of times the optimization loop is repeated.
+        num_iterations: The maximum number of times each node is optimized. Nodes are
+            optimized again only when a node upstream or a consumer of their
+            producers changed. When
+            ``stop_if_no_change`` is False, the number of times the whole model
+            is optimized.
         onnx_shape_inference: Applies node-level shape-inference as part of optimization
         input_size_limit: Will not apply constant folding to ops with any input of size
             greater than this. Does not apply to special ops like Shape() and Size().
         output_size_limit: Will not rewrite any foldable-op into a Constant op if the size
             of the output tensor is greater than this.
-        stop_if_no_change: Not supported currently (has no effect). Meant to stop the
-            outer optimization loop if no change is detected in one iteration.
+        stop_if_no_change: Stop optimizing as soon as no node can be folded or
+            rewritten. Nodes are tracked in a worklist and visited again only when
+            the nodes near them changed. When False, constant folding and the rewrite rules
+            are applied to the whole model ``num_iterations`` times.
     """
-    del stop_if_no_change  # Looks like rewriter doesn't support this yet.
     _inliner.inline(model)
-    for _ in range(num_iterations):
-        _constant_folding.fold_constants(
-            model,
-            onnx_shape_inference=onnx_shape_inference,
+    if stop_if_no_change:
+        optimizer = _WorklistOptimizer(
+            pattern.RewriteRuleSet(_DEFAULT_REWRITE_RULES),
+            max_visits=num_iterations,
+            shape_inference=onnx_shape_inference,
             input_size_limit=input_size_limit,
             output_size_limit=output_size_limit,
         )
-        rewriter.rewrite(model, pattern_rewrite_rules=_DEFAULT_REWRITE_RULES)
+        optimizer.visit_model(model)
+        logger.info(
+            "Constant-folded %s nodes and applied %s rewrite rules.",
+            optimizer.num_folded,
+            optimizer.num_rewritten,
+        )
+        _remove_unused_function.remove_unused_functions(model)
+    else:
+        for _ in range(num_iterations):
+            _constant_folding.fold_constants(
+                model,
+                onnx_shape_inference=onnx_shape_inference,
+                input_size_limit=input_size_limit,
+                output_size_limit=output_size_limit,
+            )
+            rewriter.rewrite(model, pattern_rewrite_rules=_DEFAULT_REWRITE_RULES)
     remove_unused_nodes(model)
@@ -7,6 +7,8 @@ import onnx
 
 import onnxscript.ir as ir
 import onnxscript.optimizer as optimizer
+from onnxscript.optimizer import _constant_folding, _optimizer
+from onnxscript.rewriter import pattern
 
 
 class OptimizerTest(unittest.TestCase):
@@ -78,6 +80,94 @@ class OptimizerTest(unittest.TestCase):
         self.assertEqual(len(model_ir.graph.node(0).outputs), 2)
         self.assertEqual(model_ir.graph.node(0).op_type, "Split")
 
+    def _foldable_model(self) -> ir.Model:
+        # Sub is folded to 1, which makes Mul(x, 1) a no-op removed by the rewrite rules
+        return ir.serde.deserialize_model(
+            onnx.parser.parse_model(
+                """
+                <ir_version: 10, opset_import: ["" : 20]>
+                agraph (float[4] x) => (float[4] z)
+                {
+                    two = Constant <value_float = 2.0> ()
+                    one = Constant <value_float = 1.0> ()
+                    difference = Sub(two, one)
+                    y = Mul(x, difference)
+                    z = Relu(y)
+                }
+                """
+            )
+        )
+
+    def test_optimize_ir_folds_and_rewrites_until_no_change(self):
+        model_ir = self._foldable_model()
+        optimizer.optimize_ir(model_ir, onnx_shape_inference=False)
+        self.assertEqual([node.op_type for node in model_ir.graph], ["Relu"])
+        self.assertIs(model_ir.graph.node(0).inputs[0], model_ir.graph.inputs[0])
+
+    def test_optimize_ir_without_stop_if_no_change_runs_all_iterations(self):
+        model_ir = self._foldable_model()
+        optimizer.optimize_ir(
+            model_ir, num_iterations=3, onnx_shape_inference=False, stop_if_no_change=False
+        )
+        self.assertEqual([node.op_type for node in model_ir.graph], ["Relu"])
+
+    def test_rewrite_is_retried_when_a_consumer_of_its_match_is_removed(self):
+        def relu_neg_pattern(op, x):
+            return op.Relu(op.Neg(x))
+
+        def neg_relu(op, x):
+            return op.NegRelu(x, _domain="custom")
+
+        model_ir = ir.serde.deserialize_model(
+            onnx.parser.parse_model(
+                """
+                <ir_version: 8, opset_import: ["" : 17, "custom" : 1]>
+                agraph (float[4] x) => (float[4] z, int64[1] s)
+                <float[4] y>
+                {
+                    y = Neg (x)
+                    z = Relu (y)
+                    s = Shape (y)
+                }
+                """
+            )
+        )
+        worklist_optimizer = _optimizer._WorklistOptimizer(  # pylint: disable=protected-access
+            pattern.RewriteRuleSet([pattern.RewriteRule(relu_neg_pattern, neg_relu)]),
+            max_visits=2,
+            shape_inference=False,
+            input_size_limit=_constant_folding.DEFAULT_CONSTANT_FOLD_INPUT_SIZE_LIMIT,
+            output_size_limit=_constant_folding.DEFAULT_CONSTANT_FOLD_OUTPUT_SIZE_LIMIT,
+        )
+        worklist_optimizer.visit_model(model_ir)
+        # The rewrite of the Relu is only valid once the Shape of y is folded
+        self.assertEqual(worklist_optimizer.num_folded, 1)
+        self.assertEqual(worklist_optimizer.num_rewritten, 1)
+        self.assertEqual([node.op_type for node in model_ir.graph], ["NegRelu", "Constant"])
+
+    def test_optimize_lazily_loaded_model_keeps_values_used_by_subgraphs(self):
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 8, opset_import: ["" : 17]>
+            agraph (float[N] x, bool cond) => (float[N] z) {
+                y = Cast <to=1> (x)
+                z = If (cond) <
+                    then_branch = then_graph () => (float[N] then_out) {
+                        then_out = Abs (y)
+                    },
+                    else_branch = else_graph () => (float[N] else_out) {
+                        else_out = Neg (y)
+                    }
+                >
+            }
+            """
+        )
+        model_ir = ir.serde.deserialize_model(model_proto, lazy=True)
+        optimizer.optimize(model_ir)
+        # The redundant Cast is removed and the branches use x instead
+        self.assertEqual([node.op_type for node in model_ir.graph], ["If"])
+        onnx.checker.check_model(ir.serde.serialize_model(model_ir))
+
 
 if __name__ == "__main__":
     unittest.main()
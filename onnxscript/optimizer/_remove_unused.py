@@ -28,7 +28,7 @@ def remove_unused_optional_outputs(
         def is_used_output(i: int) -> bool:
             if i < len(node.outputs):
                 val = node.outputs[i]
-                return val in graph_outputs or bool(val.uses())
+                return val in graph_outputs or val.has_uses()
             return False
 
         if is_used_output(1) or is_used_output(2):
@@ -51,7 +51,7 @@ def remove_unused_optional_outputs(
         return
 
     for i, out in enumerate(node.outputs):
-        if out not in graph_outputs and (not out.uses()) and optional_info[i] is True:
+        if out not in graph_outputs and (not out.has_uses()) and optional_info[i] is True:
             out.name = ""
 
 
@@ -62,7 +62,7 @@ def process_function_or_graph(function_or_graph: ir.Function | ir.Graph) -> int:
     for node in reversed(function_or_graph):
         removable = True
         for output in node.outputs:
-            if output in graph_outputs or output.uses():
+            if output in graph_outputs or output.has_uses():
                 removable = False
                 break
         if removable:
@@ -88,7 +88,7 @@ def _remove_unused_nodes(model: ir.Model) -> None:
     graph_outputs = frozenset(model.graph.outputs)
     initializers = model.graph.initializers
     for init in list(initializers.values()):
-        if not (init in graph_outputs or init.uses()):
+        if not (init in graph_outputs or init.has_uses()):
             del initializers[init.name]  # type: ignore[arg-type]
             count += 1
 
@@ -0,0 +1,628 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Type and shape inference of ONNX ops on the IR.
+
+The constant folder infers the types and shapes of the outputs of each node it
+visits. Calling the ONNX inferencer requires serializing the node and the types of
+its inputs to protos and deserializing the results, which dominates the time to
+optimize large models. The inference functions below compute the types and shapes
+of the common ops directly from :class:`ir.Shape` objects, keeping the symbolic
+dimensions. :func:`infer_outputs` returns None for other ops, or when an inference
+function cannot handle the node, so the caller can use the ONNX inferencer.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "InferredType",
+    "infer_outputs",
+]
+
+import sys
+from typing import Callable, Sequence, Tuple, Union
+
+import numpy as np
+
+import onnxscript.ir as ir
+import onnxscript.utils.utils as utils
+
+# The inferred data type and shape of an output. None means unknown.
+InferredType = Tuple[Union[ir.DataType, None], Union[ir.Shape, None]]
+InferenceFunction = Callable[[ir.Node, int], Union[Sequence[InferredType], None]]
+
+_INFERENCE_FUNCTIONS: dict[str, InferenceFunction] = {}
+
+# ONNX uses INT64_MAX and INT64_MIN as ends of slices that cover a whole dimension
+_LARGE_INT = sys.maxsize
+
+
+def infer_outputs(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    """Infer the types and shapes of the outputs of a node of the ONNX domain.
+
+    Args:
+        node: The node.
+        version: The opset version of the ONNX domain.
+
+    Returns:
+        The data type and shape of each output, or None if the op is not supported or
+        if the types of the inputs are not known well enough.
+    """
+    if not utils.is_onnx_domain(node.domain):
+        return None
+    function = _INFERENCE_FUNCTIONS.get(node.op_type)
+    if function is None:
+        return None
+    return function(node, version)
+
+
+def _register(*op_types: str) -> Callable[[InferenceFunction], InferenceFunction]:
+    def decorator(function: InferenceFunction) -> InferenceFunction:
+        for op_type in op_types:
+            _INFERENCE_FUNCTIONS[op_type] = function
+        return function
+
+    return decorator
+
+
+def _unknown_dim() -> ir.SymbolicDim:
+    return ir.SymbolicDim(None)
+
+
+def _input(node: ir.Node, index: int) -> ir.Value | None:
+    if index < len(node.inputs):
+        return node.inputs[index]
+    return None
+
+
+def _tensor_type(value: ir.Value | None) -> tuple[ir.DataType, ir.Shape | None] | None:
+    """Return the data type and shape of a tensor value, or None if not known."""
+    if value is None or not isinstance(value.type, ir.TensorType):
+        return None
+    return value.type.dtype, value.shape
+
+
+def _input_types(
+    node: ir.Node,
+) -> list[tuple[ir.DataType, ir.Shape | None]] | None:
+    types = []
+    for input in node.inputs:
+        type_ = _tensor_type(input)
+        if type_ is None:
+            return None
+        types.append(type_)
+    return types
+
+
+def _int_attribute(node: ir.Node, name: str, default: int | None = None) -> int | None:
+    attr = node.attributes.get(name)
+    if attr is None:
+        return default
+    if not isinstance(attr, ir.Attr) or attr.type != ir.AttributeType.INT:
+        return None
+    return attr.value
+
+
+def _ints_attribute(node: ir.Node, name: str) -> list[int] | None:
+    attr = node.attributes.get(name)
+    if not isinstance(attr, ir.Attr) or attr.type != ir.AttributeType.INTS:
+        return None
+    return list(attr.value)
+
+
+def _constant_ints(value: ir.Value | None) -> list[int] | None:
+    """Return the values of a constant 0-D or 1-D integer tensor."""
+    if value is None or value.const_value is None:
+        return None
+    const_value = value.const_value
+    if const_value.dtype not in (ir.DataType.INT64, ir.DataType.INT32):
+        return None
+    array = const_value.numpy()
+    if array.ndim > 1:
+        return None
+    return np.atleast_1d(array).tolist()
+
+
+def _axes(node: ir.Node, version: int, attribute_until: int) -> list[int] | None:
+    """Return the axes given as an attribute until a version, then as the second input."""
+    if version < attribute_until:
+        return _ints_attribute(node, "axes")
+    return _constant_ints(_input(node, 1))
+
+
+def _normalize_axis(axis: int, rank: int) -> int | None:
+    if axis < 0:
+        axis += rank
+    if axis < 0 or axis >= rank:
+        return None
+    return axis
+
+
+def _add_dims(dims: Sequence[int | ir.SymbolicDim]) -> int | ir.SymbolicDim:
+    """Return the sum of dimensions as an int or a symbolic expression."""
+    total: int | ir.SymbolicDim = 0
+    for dim in dims:
+        total = total + dim
+    return total
+
+
+def _multiply_dims(dims: Sequence[int | ir.SymbolicDim]) -> int | ir.SymbolicDim:
+    """Return the product of dimensions as an int or a symbolic expression."""
+    product: int | ir.SymbolicDim = 1
+    for dim in dims:
+        if dim == 0:
+            return 0
+        product = product * dim
+    return product
+
+
+def _broadcast(shapes: Sequence[ir.Shape | None]) -> ir.Shape | None:
+    """Return the shape of the multidirectional broadcast of shapes."""
+    if any(shape is None for shape in shapes):
+        return None
+    rank = max(len(shape) for shape in shapes)  # type: ignore[arg-type]
+    dims: list[int | ir.SymbolicDim] = []
+    for i in range(rank):
+        dim: int | ir.SymbolicDim = 1
+        for shape in shapes:
+            offset = rank - len(shape)  # type: ignore[arg-type]
+            if i < offset:
+                continue
+            other = shape[i - offset]  # type: ignore[index]
+            if other == 1 or other == dim:
+                continue
+            if dim == 1:
+                dim = other
+            elif isinstance(other, int) and not isinstance(dim, int):
+                # Assume the model is valid: the symbolic dim is equal to other
+                dim = other
+            elif not isinstance(other, int) and isinstance(dim, int):
+                continue
+            else:
+                # The dims are different symbolic dims, or different ints in an invalid
+                # model
+                dim = _unknown_dim()
+        dims.append(dim)
+    return ir.Shape(dims)
+
+
+def _same_as_input(
+    node: ir.Node, version: int, dtype: ir.DataType | None = None
+) -> Sequence[InferredType] | None:
+    del version
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None:
+        return None
+    return [(input_type[0] if dtype is None else dtype, input_type[1])]
+
+
+@_register(
+    "Abs",
+    "Acos",
+    "Asin",
+    "Atan",
+    "Ceil",
+    "Celu",
+    "Cos",
+    "Cosh",
+    "Elu",
+    "Erf",
+    "Exp",
+    "Floor",
+    "Gelu",
+    "HardSigmoid",
+    "HardSwish",
+    "Identity",
+    "LeakyRelu",
+    "Log",
+    "LogSoftmax",
+    "Mish",
+    "Neg",
+    "Not",
+    "Reciprocal",
+    "Relu",
+    "Round",
+    "Selu",
+    "Sigmoid",
+    "Sign",
+    "Sin",
+    "Sinh",
+    "Softmax",
+    "Softplus",
+    "Softsign",
+    "Sqrt",
+    "Tan",
+    "Tanh",
+    "ThresholdedRelu",
+    "Trilu",
+)
+def _unary(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    return _same_as_input(node, version)
+
+
+@_register("IsInf", "IsNaN")
+def _unary_predicate(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    return _same_as_input(node, version, ir.DataType.BOOL)
+
+
+@_register("Add", "BitShift", "Div", "Max", "Mean", "Min", "Mod", "Mul", "Pow", "Sub", "Sum")
+def _broadcasting(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    if not input_types:
+        return None
+    return [(input_types[0][0], _broadcast([shape for _, shape in input_types]))]
+
+
+@_register("And", "Equal", "Greater", "GreaterOrEqual", "Less", "LessOrEqual", "Or", "Xor")
+def _comparison(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    if not input_types:
+        return None
+    return [(ir.DataType.BOOL, _broadcast([shape for _, shape in input_types]))]
+
+
+@_register("Where")
+def _where(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    if input_types is None or len(input_types) != 3:
+        return None
+    return [(input_types[1][0], _broadcast([shape for _, shape in input_types]))]
+
+
+@_register("Cast")
+def _cast(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    to = _int_attribute(node, "to")
+    if to is None:
+        return None
+    return _same_as_input(node, version, ir.DataType(to))
+
+
+@_register("CastLike")
+def _cast_like(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    target_type = _tensor_type(_input(node, 1))
+    if target_type is None:
+        return None
+    return _same_as_input(node, version, target_type[0])
+
+
+@_register("Dropout")
+def _dropout(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    inferred = _same_as_input(node, version)
+    if inferred is None:
+        return None
+    (dtype, shape), *_ = inferred
+    return [(dtype, shape), (ir.DataType.BOOL, shape)][: len(node.outputs)]
+
+
+@_register("Shape")
+def _shape(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None or input_type[1] is None:
+        return None
+    start = _int_attribute(node, "start", 0)
+    end = _int_attribute(node, "end", None)
+    rank = len(range(len(input_type[1]))[start:end])
+    return [(ir.DataType.INT64, ir.Shape([rank]))]
+
+
+@_register("Size")
+def _size(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del node, version
+    return [(ir.DataType.INT64, ir.Shape([]))]
+
+
+@_register("Transpose")
+def _transpose(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None:
+        return None
+    dtype, shape = input_type
+    if shape is None:
+        return [(dtype, None)]
+    perm = _ints_attribute(node, "perm")
+    if perm is None:
+        perm = list(reversed(range(len(shape))))
+    if sorted(perm) != list(range(len(shape))):
+        return None
+    return [(dtype, ir.Shape([shape[axis] for axis in perm]))]
+
+
+@_register("MatMul")
+def _matmul(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    if input_types is None or len(input_types) != 2:
+        return None
+    (dtype, shape_a), (_, shape_b) = input_types
+    if shape_a is None or shape_b is None or len(shape_a) == 0 or len(shape_b) == 0:
+        return [(dtype, None)]
+    dims_a = list(shape_a.dims)
+    dims_b = list(shape_b.dims)
+    # 1-D operands are promoted to matrices and the added dims are removed after
+    if len(dims_a) == 1:
+        dims_a.insert(0, 1)
+    if len(dims_b) == 1:
+        dims_b.append(1)
+    batch = _broadcast([ir.Shape(dims_a[:-2]), ir.Shape(dims_b[:-2])])
+    assert batch is not None
+    dims = list(batch.dims)
+    if len(shape_a) > 1:
+        dims.append(dims_a[-2])
+    if len(shape_b) > 1:
+        dims.append(dims_b[-1])
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register("Concat")
+def _concat(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    axis = _int_attribute(node, "axis")
+    if not input_types or axis is None:
+        return None
+    dtype = input_types[0][0]
+    shapes = [shape for _, shape in input_types]
+    if any(shape is None for shape in shapes):
+        return [(dtype, None)]
+    rank = len(shapes[0])  # type: ignore[arg-type]
+    if any(len(shape) != rank for shape in shapes):  # type: ignore[arg-type]
+        return None
+    axis = _normalize_axis(axis, rank)
+    if axis is None:
+        return None
+    dims: list[int | ir.SymbolicDim] = []
+    for i in range(rank):
+        column = [shape[i] for shape in shapes]  # type: ignore[index]
+        if i == axis:
+            dims.append(_add_dims(column))
+        else:
+            # Prefer a known dim, they are equal in a valid model
+            dims.append(next((dim for dim in column if isinstance(dim, int)), column[0]))
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register("Unsqueeze")
+def _unsqueeze(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    input_type = _tensor_type(_input(node, 0))
+    axes = _axes(node, version, 13)
+    if input_type is None or axes is None:
+        return None
+    dtype, shape = input_type
+    if shape is None:
+        return [(dtype, None)]
+    rank = len(shape) + len(axes)
+    normalized_axes = {_normalize_axis(axis, rank) for axis in axes}
+    if None in normalized_axes or len(normalized_axes) != len(axes):
+        return None
+    dims = iter(shape.dims)
+    return [
+        (dtype, ir.Shape([1 if i in normalized_axes else next(dims) for i in range(rank)]))
+    ]
+
+
+@_register("Squeeze")
+def _squeeze(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None:
+        return None
+    dtype, shape = input_type
+    has_axes = _input(node, 1) is not None if version >= 13 else "axes" in node.attributes
+    axes = _axes(node, version, 13) if has_axes else None
+    if has_axes and axes is None:
+        return None
+    if shape is None:
+        return [(dtype, None)]
+    if axes is None:
+        if not all(isinstance(dim, int) for dim in shape):
+            # A symbolic dim may be 1
+            return None
+        return [(dtype, ir.Shape([dim for dim in shape if dim != 1]))]
+    normalized_axes = {_normalize_axis(axis, len(shape)) for axis in axes}
+    if None in normalized_axes:
+        return None
+    return [
+        (dtype, ir.Shape([dim for i, dim in enumerate(shape) if i not in normalized_axes]))
+    ]
+
+
+@_register("Reshape")
+def _reshape(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    input_type = _tensor_type(_input(node, 0))
+    target = _constant_ints(_input(node, 1)) if version >= 5 else None
+    if input_type is None or target is None:
+        return None
+    dtype, shape = input_type
+    allow_zero = _int_attribute(node, "allowzero", 0)
+    dims: list[int | ir.SymbolicDim] = []
+    for i, dim in enumerate(target):
+        if dim == 0 and not allow_zero:
+            if shape is None or i >= len(shape):
+                return None
+            dims.append(shape[i])
+        else:
+            dims.append(dim)
+    if -1 in dims:
+        index = dims.index(-1)
+        known = [dim for dim in dims if dim != -1]
+        input_size = _multiply_dims(shape.dims) if shape is not None else _unknown_dim()
+        output_size = _multiply_dims(known)
+        if output_size == 0:
+            dims[index] = _unknown_dim()
+        else:
+            dims[index] = input_size // output_size
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register("Gather")
+def _gather(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_types = _input_types(node)
+    axis = _int_attribute(node, "axis", 0)
+    if input_types is None or len(input_types) != 2 or axis is None:
+        return None
+    (dtype, data_shape), (_, indices_shape) = input_types
+    if data_shape is None or indices_shape is None:
+        return [(dtype, None)]
+    axis = _normalize_axis(axis, len(data_shape))
+    if axis is None:
+        return None
+    dims = [*data_shape[:axis], *indices_shape.dims, *data_shape[axis + 1 :]]
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register("Expand")
+def _expand(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_type = _tensor_type(_input(node, 0))
+    target = _constant_ints(_input(node, 1))
+    if input_type is None or target is None:
+        return None
+    dtype, shape = input_type
+    return [(dtype, _broadcast([shape, ir.Shape(target)]))]
+
+
+@_register("Slice")
+def _slice(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None or version < 10:
+        return None
+    dtype, shape = input_type
+    starts = _constant_ints(_input(node, 1))
+    ends = _constant_ints(_input(node, 2))
+    if shape is None or starts is None or ends is None:
+        return [(dtype, None)]
+    axes_input = _input(node, 3)
+    axes = list(range(len(starts))) if axes_input is None else _constant_ints(axes_input)
+    steps_input = _input(node, 4)
+    steps = [1] * len(starts) if steps_input is None else _constant_ints(steps_input)
+    if axes is None or steps is None:
+        return None
+    if not len(starts) == len(ends) == len(axes) == len(steps):
+        return None
+    dims = list(shape.dims)
+    for start, end, axis, step in zip(starts, ends, axes, steps):
+        normalized_axis = _normalize_axis(axis, len(dims))
+        if normalized_axis is None or step == 0:
+            return None
+        dim = dims[normalized_axis]
+        if isinstance(dim, int):
+            dims[normalized_axis] = len(range(dim)[start:end:step])
+        elif start == 0 and end >= _LARGE_INT and step == 1:
+            # The slice covers the whole dimension
+            continue
+        else:
+            dims[normalized_axis] = _unknown_dim()
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register("ConstantOfShape")
+def _constant_of_shape(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    target = _constant_ints(_input(node, 0))
+    attr = node.attributes.get("value")
+    if attr is None:
+        dtype = ir.DataType.FLOAT
+    elif isinstance(attr, ir.Attr) and attr.type == ir.AttributeType.TENSOR:
+        dtype = attr.as_tensor().dtype
+    else:
+        return None
+    return [(dtype, None if target is None else ir.Shape(target))]
+
+
+@_register("Constant")
+def _constant(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    if len(node.attributes) != 1:
+        return None
+    name, attr = next(iter(node.attributes.items()))
+    if not isinstance(attr, ir.Attr):
+        return None
+    if name == "value":
+        tensor = attr.as_tensor()
+        return [(tensor.dtype, ir.Shape(tensor.shape.dims))]
+    scalar_types = {"value_int": ir.DataType.INT64, "value_float": ir.DataType.FLOAT}
+    if name in scalar_types:
+        return [(scalar_types[name], ir.Shape([]))]
+    list_types = {"value_ints": ir.DataType.INT64, "value_floats": ir.DataType.FLOAT}
+    if name in list_types:
+        return [(list_types[name], ir.Shape([len(attr.value)]))]
+    return None
+
+
+@_register("Range")
+def _range(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None:
+        return None
+    length: int | ir.SymbolicDim = _unknown_dim()
+    values = [_input(node, i) for i in range(3)]
+    if all(value is not None and value.const_value is not None for value in values):
+        start, limit, delta = (value.const_value.numpy() for value in values)  # type: ignore[union-attr]
+        if delta != 0:
+            length = max(int(np.ceil((limit - start) / delta)), 0)
+    return [(input_type[0], ir.Shape([length]))]
+
+
+def _reduce(node: ir.Node, axes: list[int] | None) -> Sequence[InferredType] | None:
+    input_type = _tensor_type(_input(node, 0))
+    if input_type is None:
+        return None
+    dtype, shape = input_type
+    if shape is None:
+        return [(dtype, None)]
+    if not axes:
+        if _int_attribute(node, "noop_with_empty_axes", 0):
+            return [(dtype, shape)]
+        axes = list(range(len(shape)))
+    normalized_axes = {_normalize_axis(axis, len(shape)) for axis in axes}
+    if None in normalized_axes:
+        return None
+    keep_dims = _int_attribute(node, "keepdims", 1)
+    dims = []
+    for i, dim in enumerate(shape):
+        if i not in normalized_axes:
+            dims.append(dim)
+        elif keep_dims:
+            dims.append(1)
+    return [(dtype, ir.Shape(dims))]
+
+
+@_register(
+    "ReduceL1",
+    "ReduceL2",
+    "ReduceLogSum",
+    "ReduceLogSumExp",
+    "ReduceMax",
+    "ReduceMean",
+    "ReduceMin",
+    "ReduceProd",
+    "ReduceSum",
+    "ReduceSumSquare",
+)
+def _reduce_op(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    # ReduceSum takes the axes as an input from version 13, the other ops from 18
+    attribute_until = 13 if node.op_type == "ReduceSum" else 18
+    if version >= attribute_until and _input(node, 1) is not None:
+        axes = _constant_ints(_input(node, 1))
+        if axes is None:
+            return None
+    else:
+        axes = _ints_attribute(node, "axes")
+    return _reduce(node, axes)
+
+
+@_register("ArgMax", "ArgMin")
+def _arg_reduce(node: ir.Node, version: int) -> Sequence[InferredType] | None:
+    del version
+    axis = _int_attribute(node, "axis", 0)
+    if axis is None:
+        return None
+    inferred = _reduce(node, [axis])
+    if inferred is None:
+        return None
+    return [(ir.DataType.INT64, inferred[0][1])]
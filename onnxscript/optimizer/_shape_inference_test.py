@@ -0,0 +1,150 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from __future__ import annotations
+
+import unittest
+
+import onnx
+import onnx.parser
+import onnx.shape_inference
+import parameterized
+
+from onnxscript import ir
+from onnxscript.optimizer import _constant_folding, _shape_inference
+
+
+def _dims(shape: ir.Shape | None) -> list[int | str | None] | None:
+    if shape is None:
+        return None
+    return [dim if isinstance(dim, int) else dim.value for dim in shape]
+
+
+class InferOutputsTest(unittest.TestCase):
+    @parameterized.parameterized.expand(
+        [
+            ("unary", "float[N, 3] x", "y = Relu(x)"),
+            ("cast", "float[N, 3] x", "y = Cast <to = 7> (x)"),
+            ("broadcast", "float[N, 1, 4] x, float[3, 1] c", "y = Add(x, c)"),
+            ("broadcast_scalar", "int64[N, 3] x, int64 c", "y = Mul(x, c)"),
+            ("comparison", "int64[2, N] x, int64[N] c", "y = Equal(x, c)"),
+            ("where", "bool[N, 1] x, float[3] a, float b", "y = Where(x, a, b)"),
+            ("shape", "float[N, 3, 4] x", "y = Shape <start = 1> (x)"),
+            ("size", "float[N, 3] x", "y = Size(x)"),
+            ("transpose", "float[N, 3, 4] x", "y = Transpose <perm = [2, 0, 1]> (x)"),
+            ("transpose_default", "float[N, 3, 4] x", "y = Transpose(x)"),
+            ("matmul", "float[B, N, 3] x, float[3, 5] w", "y = MatMul(x, w)"),
+            ("matmul_vector", "float[N, 3] x, float[3] w", "y = MatMul(x, w)"),
+            ("concat", "float[N, 3] x, float[N, 4] c", "y = Concat <axis = -1> (x, c)"),
+            (
+                "unsqueeze",
+                "float[N, 3] x",
+                "axes = Constant <value_ints = [0, -1]> ()\ny = Unsqueeze(x, axes)",
+            ),
+            (
+                "squeeze",
+                "float[1, N, 1] x",
+                "axes = Constant <value_ints = [0]> ()\ny = Squeeze(x, axes)",
+            ),
+            (
+                "reshape",
+                "float[2, 3, 4] x",
+                "shape = Constant <value_ints = [0, -1]> ()\ny = Reshape(x, shape)",
+            ),
+            (
+                "reshape_symbolic",
+                "float[N, 12] x",
+                "shape = Constant <value_ints = [0, 3, 4]> ()\ny = Reshape(x, shape)",
+            ),
+            ("gather", "float[N, 5, 4] x, int64[2, 3] i", "y = Gather <axis = 1> (x, i)"),
+            (
+                "expand",
+                "float[N, 1] x",
+                "shape = Constant <value_ints = [2, 1, 4]> ()\ny = Expand(x, shape)",
+            ),
+            (
+                "slice",
+                "float[N, 10] x",
+                "starts = Constant <value_ints = [2]> ()\n"
+                "ends = Constant <value_ints = [-1]> ()\n"
+                "axes = Constant <value_ints = [1]> ()\n"
+                "y = Slice(x, starts, ends, axes)",
+            ),
+            (
+                "constant_of_shape",
+                "float[N] x",
+                "shape = Constant <value_ints = [2, 3]> ()\n"
+                "y = ConstantOfShape <value = int64[1] {1}> (shape)",
+            ),
+            (
+                "range",
+                "float[N] x",
+                "start = Constant <value = int64 {1}> ()\n"
+                "limit = Constant <value = int64 {10}> ()\n"
+                "delta = Constant <value = int64 {4}> ()\n"
+                "y = Range(start, limit, delta)",
+            ),
+            (
+                "reduce",
+                "float[N, 3, 4] x",
+                "axes = Constant <value_ints = [1]> ()\ny = ReduceSum <keepdims = 0> (x, axes)",
+            ),
+            ("reduce_attribute", "float[N, 3, 4] x", "y = ReduceMean <axes = [-1]> (x)"),
+            ("argmax", "float[N, 3, 4] x", "y = ArgMax <axis = 1> (x)"),
+        ]
+    )
+    def test_infer_outputs_matches_onnx_shape_inference(self, _: str, inputs: str, body: str):
+        model_proto = onnx.parser.parse_model(
+            f"""
+            <ir_version: 8, opset_import: ["" : 17]>
+            agraph ({inputs}) => (y) {{
+                {body}
+            }}
+            """
+        )
+        expected_proto = onnx.shape_inference.infer_shapes(model_proto, strict_mode=True)
+        expected_model = ir.serde.deserialize_model(expected_proto)
+        expected = expected_model.graph.outputs[0]
+
+        model = ir.serde.deserialize_model(model_proto)
+        _constant_folding.basic_constant_propagation(model.graph)
+        for node in model.graph:
+            inferred = _shape_inference.infer_outputs(node, 17)
+            self.assertIsNotNone(inferred)
+            for output, (dtype, shape) in zip(node.outputs, inferred):  # type: ignore[arg-type]
+                output.type = ir.TensorType(dtype)  # type: ignore[arg-type]
+                output.shape = shape
+        output = model.graph.outputs[0]
+        self.assertEqual(output.dtype, expected.dtype)
+        self.assertEqual(_dims(output.shape), _dims(expected.shape))
+
+    def test_infer_outputs_keeps_the_dims_of_slices_covering_a_symbolic_dim(self):
+        model = ir.serde.deserialize_model(
+            onnx.parser.parse_model(
+                """
+                <ir_version: 8, opset_import: ["" : 17]>
+                agraph (float[N, 10] x) => (y) {
+                    starts = Constant <value_ints = [0, 1]> ()
+                    ends = Constant <value_ints = [9223372036854775807, 3]> ()
+                    y = Slice(x, starts, ends)
+                }
+                """
+            )
+        )
+        _constant_folding.basic_constant_propagation(model.graph)
+        (_, shape), *_ = _shape_inference.infer_outputs(model.graph.node(2), 17)  # type: ignore[misc]
+        self.assertEqual(_dims(shape), ["N", 2])
+
+    def test_infer_outputs_returns_none_for_unsupported_nodes(self):
+        x = ir.Value(name="x", type=ir.TensorType(ir.DataType.FLOAT), shape=ir.Shape([2]))
+        self.assertIsNone(_shape_inference.infer_outputs(ir.Node("", "Conv", [x, x]), 17))
+        self.assertIsNone(
+            _shape_inference.infer_outputs(ir.Node("com.microsoft", "Relu", [x]), 1)
+        )
+        # The types of the inputs are not known
+        self.assertIsNone(
+            _shape_inference.infer_outputs(ir.Node("", "Relu", [ir.Value()]), 17)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
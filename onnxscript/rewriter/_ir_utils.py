@@ -41,7 +41,7 @@ def display_slice(x: ir.Value | ir.Node, backward: bool = True, depth_limit: int
                         visit(inp.producer(), depth + 1)  # type: ignore[arg-type]
             else:
                 for out in node.outputs:
-                    for consumer, _ in out.uses():
+                    for consumer, _ in out.iter_uses():
                         visit(consumer, depth + 1)
 
     if isinstance(x, ir.Node):
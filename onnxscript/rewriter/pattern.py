@@ -9,7 +9,7 @@ import enum
 import inspect
 import itertools
 import math
-from collections import defaultdict
+from collections import defaultdict, deque
 from typing import (
     Any,
     Callable,
@@ -745,7 +745,8 @@ class GraphPattern:
 
         # Determine the output nodes of the pattern. These are a minimal set of nodes
         # whose backward-slices cover the entire pattern.
-        output_nodes: set[NodePattern] = set()
+        # Kept in the order of the outputs, so that the choice of the root node is deterministic.
+        output_nodes: list[NodePattern] = []
         covered: set[NodePattern] = set()
         for value_pattern in outputs:
             if not isinstance(value_pattern, ValuePattern):
@@ -759,10 +760,10 @@ class GraphPattern:
             if isinstance(value_pattern, NodeOutputPattern):
                 candidate = value_pattern.producer()
                 if candidate not in covered:
-                    output_nodes.add(candidate)
+                    output_nodes.append(candidate)
                     _add_backward_slice(candidate, covered)
 
-        self.output_nodes: list[NodePattern] = list(output_nodes)
+        self.output_nodes: list[NodePattern] = output_nodes
 
     @property
     def output_node(self) -> NodePattern:
@@ -869,6 +870,77 @@ def _to_graph_pattern(pattern_constructor: Callable) -> GraphPattern:
     return GraphPattern(pattern_inputs, pattern_outputs, builder.nodes())
 
 
+def _last_producer(node: ir.Node, new_nodes: Sequence[ir.Node]) -> ir.Node:
+    """Return the last node among the node and the producers of the inputs of the new nodes.
+
+    Only producers in the graph of the node are considered.
+    """
+    graph = node.graph
+    assert graph is not None
+    new_node_set = set(new_nodes)
+    last = node
+    for new_node in new_nodes:
+        for input in new_node.inputs:
+            if input is None:
+                continue
+            producer = input.producer()
+            if (
+                producer is not None
+                and producer not in new_node_set
+                and producer.graph is graph
+                and graph.is_before(last, producer)
+            ):
+                last = producer
+    return last
+
+
+def _insertion_point(
+    node: ir.Node,
+    new_nodes: Sequence[ir.Node],
+    outputs: Sequence[ir.Value],
+    removed_nodes: Sequence[ir.Node],
+) -> ir.Node:
+    """Return the node after which the replacement of a multi-output pattern is inserted.
+
+    The replacement is inserted after the last producer of its inputs if that node
+    precedes every remaining consumer of the replaced outputs. Otherwise it is inserted
+    after the node, like for patterns with a single output node.
+    """
+    last = _last_producer(node, new_nodes)
+    if last is node:
+        return node
+    graph = node.graph
+    assert graph is not None
+    removed = set(removed_nodes)
+    for output in outputs:
+        for consumer in output.consumers():
+            if consumer in removed:
+                continue
+            if consumer.graph is not graph or not graph.is_before(last, consumer):
+                return node
+    return last
+
+
+def _root_op(rule: RewriteRule) -> tuple[str, str] | None:
+    """Return the domain and op_type of the nodes that the rule can be applied to, if known.
+
+    The rule can only match nodes of the operator of the first output node of its
+    pattern when it uses a :class:`SimplePatternMatcher`. The overload of the nodes is
+    not matched, so nodes of any overload of the operator can match.
+    """
+    matcher = rule._matcher  # pylint: disable=protected-access
+    if not isinstance(matcher, SimplePatternMatcher):
+        return None
+    output_nodes = matcher.pattern.output_nodes
+    if not output_nodes:
+        return None
+    op_identifier = output_nodes[0].op_identifier()
+    if op_identifier is None:
+        return None
+    domain, op_type, _ = op_identifier
+    return domain, op_type
+
+
 def _valid_to_replace(
     matched_nodes: Sequence[ir.Node], output_values: Sequence[ir.Value]
 ) -> bool:
@@ -884,7 +956,7 @@ def _valid_to_replace(
             if v.is_graph_output():
                 # value is an output-value of the graph/function.
                 return False
-            for consumer, _ in v.uses():
+            for consumer, _ in v.iter_uses():
                 if consumer not in matched_nodes:
                     return False
     return True
@@ -902,6 +974,9 @@ class ReplacementSubgraph:
     new_nodes: Sequence[ir.Node]
     new_initializers: Sequence[ir.Value]
     used_opsets: _tape.UsedOpsets
+    # The inputs of the matched nodes, recorded when they are removed by the rewrite
+    # since removing a node detaches it from its inputs.
+    removed_inputs: Sequence[ir.Value | None] = ()
 
 
 def always_true(*args, **kwargs) -> bool:
@@ -1257,16 +1332,13 @@ class SimplePatternMatcher(PatternMatcher):
             # that can be used for debugging and testing. The GenericPatternMatcher is a
             # more sophisticated implementation, but incomplete.
             pattern_output_nodes = self.pattern.output_nodes
-            op_to_nodes: dict[tuple[str, str, str], list[ir.Node]] = {}
-            for n in graph_or_function:
-                op_to_nodes.setdefault(n.op_identifier(), []).append(n)
             all_nodes = iter(graph_or_function)
 
             def get_nodes(pattern_node):
                 id = pattern_node.op_identifier()
                 if id is None:
                     return all_nodes
-                return op_to_nodes.get(id, [])
+                return graph_or_function.nodes_by_op(*id)
 
             candidates = [iter([node])] + [get_nodes(pn) for pn in pattern_output_nodes[1:]]
             match = None
@@ -1628,6 +1700,129 @@ class RewriteRuleSet:
             rules = list(itertools.chain.from_iterable([rule.commute() for rule in rules]))
         self.rules = rules
 
+    def max_pattern_size(self) -> int:
+        """Return the largest number of nodes in the target pattern of a rule of the set."""
+        return max(
+            (rule._target_pattern.num_nodes() for rule in self.rules),  # pylint: disable=protected-access
+            default=0,
+        )
+
+    def _apply_delta(
+        self,
+        model: ir.Model,
+        graph_or_function: ir.Graph | ir.Function,
+        node: ir.Node,
+        rule: RewriteRule,
+        delta: ReplacementSubgraph,
+        verbose: int | None,
+    ) -> bool:
+        """Replace the nodes matched by the rule with the replacement subgraph.
+
+        Returns:
+            True if the replacement is applied.
+        """
+        if delta.new_initializers:
+            if isinstance(graph_or_function, ir.Function):
+                # TODO(rama): Can't add initializers to functions. But currently this is not
+                # an issue, as we apply inlining before applying rewrite rules.
+                if verbose:
+                    print(f"Rewrites adding initializers not supported for functions: {rule}")
+                return False
+            initializers = graph_or_function.initializers
+            for initializer in delta.new_initializers:
+                if initializer.name in initializers:
+                    if verbose:
+                        print(f"Initializer {initializer.name} already exists.")
+                    continue
+            for initializer in delta.new_initializers:
+                initializers[initializer.name] = initializer  # type: ignore[index]
+        # TODO: This does not yet handle the problem of determining the correct insertion point
+        # for inserted nodes in the case of patterns with multiple output-nodes. The
+        # output-node "node" is sufficient for patterns with a single output-node. For
+        # others, the insertion point is moved after the producers of the inputs of the
+        # new nodes when that is before all consumers of the outputs. The nodes are not
+        # reordered when no such point exists.
+        onnxscript.optimizer.basic_constant_propagation(delta.new_nodes)
+        if rule.as_function:
+            # Create a function out of a copy of the matched nodes
+            if len(delta.new_nodes) != 1:
+                raise ValueError(
+                    "as_function=True is only supported for patterns with a single replacement node."
+                )
+            call_node = delta.new_nodes[0]
+            domain = call_node.domain
+            name = call_node.op_type
+            overload = _get_new_overload(model, domain, name)
+            call_node.overload = overload
+
+            # Create topologically sorted list of nodes to be replaced.
+            unsorted_nodes = set(delta.match.nodes)
+            original_nodes = [n for n in graph_or_function if n in unsorted_nodes]
+            # Create new inputs/nodes/outputs for the function
+            inputs, nodes, outputs = _copy_for_function(
+                call_node.inputs, original_nodes, delta.match.outputs
+            )
+
+            used_domains: set[str] = {node.domain for node in original_nodes}
+            parent_opset_imports = graph_or_function.opset_imports
+            used_opset_imports = {
+                k: v for k, v in parent_opset_imports.items() if k in used_domains
+            }
+
+            graph = ir.Graph(inputs, outputs, nodes=nodes, opset_imports=used_opset_imports)
+            f = ir.Function(domain, name, overload, graph=graph, attributes=())
+            model.functions[f.identifier()] = f
+        insertion_point = node
+        if not rule._target_pattern.has_single_output_node:  # pylint: disable=protected-access
+            insertion_point = _insertion_point(
+                node,
+                delta.new_nodes,
+                delta.match.outputs,
+                delta.match.nodes if rule.remove_nodes else [],
+            )
+        if rule.remove_nodes:
+            delta.removed_inputs = [
+                input for matched_node in delta.match.nodes for input in matched_node.inputs
+            ]
+        _convenience.replace_nodes_and_values(
+            graph_or_function,
+            insertion_point,
+            delta.match.nodes if rule.remove_nodes else [],
+            delta.new_nodes,
+            delta.match.outputs,
+            delta.new_outputs,
+        )
+        return True
+
+    def apply_to_node(
+        self,
+        model: ir.Model,
+        graph_or_function: ir.Graph | ir.Function,
+        node: ir.Node,
+        *,
+        verbose: int | None = None,
+    ) -> ReplacementSubgraph | None:
+        """Apply the first rewrite rule of the set matching the node.
+
+        Args:
+            model: The model to which the rewrite rules are applied.
+            graph_or_function: The graph or function containing the node.
+            node: The node to rewrite. For patterns with several output nodes,
+                the node is the last output node of the pattern.
+            verbose: The verbosity level. Defaults to None.
+
+        Returns:
+            The replacement applied, or None if no rule is applied.
+        """
+        for rule in self.rules:
+            delta = rule.try_rewrite(model, graph_or_function, node, verbose=verbose)
+            if delta is None:
+                continue
+            assert isinstance(delta, ReplacementSubgraph)
+            if self._apply_delta(model, graph_or_function, node, rule, delta, verbose):
+                return delta
+        return None
+
     def _apply_to_graph_or_function(
         self,
         model: ir.Model,
@@ -1655,81 +1850,76 @@ class RewriteRuleSet:
         for rule in self.rules:
             if rule.graph_pre_visitor:
                 rule.graph_pre_visitor()
-            for node in graph_or_function:
-                delta = rule.try_rewrite(
-                    model, graph_or_function, node, verbose=verbose, tracer=tracer
-                )
-                if delta is None or tracer is not None:
-                    continue
-                assert isinstance(delta, ReplacementSubgraph)
-                if delta.new_initializers:
-                    if isinstance(graph_or_function, ir.Function):
-                        # TODO(rama): Can't add initializers to functions. But currently this is not
-                        # an issue, as we apply inlining before applying rewrite rules.
-                        if verbose:
-                            print(
-                                f"Rewrites adding initializers not supported for functions: {rule}"
-                            )
-                        continue
-                    initializers = graph_or_function.initializers
-                    for initializer in delta.new_initializers:
-                        if initializer.name in initializers:
-                            if verbose:
-                                print(f"Initializer {initializer.name} already exists.")
-                            continue
-                    for initializer in delta.new_initializers:
-                        initializers[initializer.name] = initializer  # type: ignore[index]
-                # TODO: This does not yet handle the problem of determining the correct insertion point
-                # for inserted nodes in the case of patterns with multiple output-nodes. The following
-                # is sufficient for patterns with a single output-node "node", which can serve as the
-                # insertion-point.
-                onnxscript.optimizer.basic_constant_propagation(delta.new_nodes)
-                if rule.as_function:
-                    # Create a function out of a copy of the matched nodes
-                    if len(delta.new_nodes) != 1:
-                        raise ValueError(
-                            "as_function=True is only supported for patterns with a single replacement node."
-                        )
-                    call_node = delta.new_nodes[0]
-                    domain = call_node.domain
-                    name = call_node.op_type
-                    overload = _get_new_overload(model, domain, name)
-                    call_node.overload = overload
-
-                    # Create topologically sorted list of nodes to be replaced.
-                    unsorted_nodes = set(delta.match.nodes)
-                    original_nodes = [n for n in graph_or_function if n in unsorted_nodes]
-                    # Create new inputs/nodes/outputs for the function
-                    inputs, nodes, outputs = _copy_for_function(
-                        call_node.inputs, original_nodes, delta.match.outputs
+            # Every node is tried when tracing so that the report includes all of them
+            root_op = _root_op(rule) if tracer is None else None
+            if root_op is None:
+                for node in graph_or_function:
+                    delta = rule.try_rewrite(
+                        model, graph_or_function, node, verbose=verbose, tracer=tracer
                     )
-
-                    used_domains: set[str] = {node.domain for node in original_nodes}
-                    parent_opset_imports = graph_or_function.opset_imports
-                    used_opset_imports = {
-                        k: v for k, v in parent_opset_imports.items() if k in used_domains
-                    }
-
-                    graph = ir.Graph(
-                        inputs, outputs, nodes=nodes, opset_imports=used_opset_imports
-                    )
-                    f = ir.Function(domain, name, overload, graph=graph, attributes=())
-                    model.functions[f.identifier()] = f
-                _convenience.replace_nodes_and_values(
-                    graph_or_function,
-                    node,
-                    delta.match.nodes if rule.remove_nodes else [],
-                    delta.new_nodes,
-                    delta.match.outputs,
-                    delta.new_outputs,
+                    if delta is None or tracer is not None:
+                        continue
+                    assert isinstance(delta, ReplacementSubgraph)
+                    if self._apply_delta(model, graph_or_function, node, rule, delta, verbose):
+                        count += 1
+            else:
+                count += self._apply_rule_to_nodes_of_op(
+                    model, graph_or_function, rule, root_op, verbose=verbose
                 )
-
-                count += 1
             if rule.graph_post_visitor:
                 rule.graph_post_visitor()
 
         return count
 
+    def _apply_rule_to_nodes_of_op(
+        self,
+        model: ir.Model,
+        graph_or_function: ir.Graph | ir.Function,
+        rule: RewriteRule,
+        root_op: tuple[str, str],
+        *,
+        verbose: int | None,
+    ) -> int:
+        """Apply the rule to the nodes of the operator matched by its root pattern node.
+
+        Only these nodes can match, so the other nodes of the graph are not visited. The
+        nodes are visited in graph order, including nodes of the operator created by a
+        rewrite after the current node, like when iterating over the whole graph.
+
+        Returns:
+            The number of times the rule is applied.
+        """
+        count = 0
+        domain, op_type = root_op
+        nodes = deque(graph_or_function.nodes_by_op(domain, op_type, None))
+        while nodes:
+            node = nodes.popleft()
+            if node.graph is None:
+                # The node was removed by an earlier rewrite
+                continue
+            delta = rule.try_rewrite(model, graph_or_function, node, verbose=verbose)
+            if delta is None:
+                continue
+            assert isinstance(delta, ReplacementSubgraph)
+            if not self._apply_delta(model, graph_or_function, node, rule, delta, verbose):
+                continue
+            count += 1
+            new_nodes = [
+                new_node
+                for new_node in delta.new_nodes
+                if new_node.domain == domain and new_node.op_type == op_type
+            ]
+            if new_nodes:
+                # Merge the new nodes with the remaining ones in graph order
+                remaining = set(nodes)
+                remaining.update(new_nodes)
+                nodes = deque(
+                    other
+                    for other in graph_or_function.nodes_by_op(domain, op_type, None)
+                    if other in remaining
+                )
+        return count
+
     def apply_to_model(
         self, model: ir.Model, *, verbose: int | None = None, debug: bool = False
     ) -> int:
@@ -4,6 +4,7 @@ import contextlib
 import io
 import logging
 import unittest
+import unittest.mock
 
 import numpy as np
 import onnx.checker
@@ -102,6 +103,30 @@ class ReciprocalMulTest(unittest.TestCase):
         self.assertEqual(count, 2)
         self.assertEqual(len(model.graph), 9)
 
+    def test_apply_to_node(self):
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x, float[N] y) => (float[N] z)
+            {
+                c1 = Constant<value_float = 1.0>()
+                t1 = Div(c1, x)
+                z1 = Mul(t1, y)
+                z = Identity(z1)
+            }
+        """
+        )
+        model = ir.serde.deserialize_model(model_proto)
+        onnxscript.optimizer.basic_constant_propagation(model.graph)
+        rules = pattern.RewriteRuleSet([self.rule()])
+        self.assertIsNone(rules.apply_to_node(model, model.graph, model.graph.node(1)))
+        delta = rules.apply_to_node(model, model.graph, model.graph.node(2))
+        self.assertIsNotNone(delta)
+        self.assertEqual(
+            [node.op_type for node in model.graph], ["Constant", "Div", "Identity"]
+        )
+        self.assertIs(model.graph.node(2).inputs[0], delta.new_outputs[0])
+
 
 class FastGeluTest(unittest.TestCase):
     def rule(self) -> pattern.RewriteRule:
@@ -512,6 +537,130 @@ class RewriteRuleTest(unittest.TestCase):
         self.assertEqual(model.graph.node(0).op_type, "Bar")
         self.assertEqual(model.graph.node(1).op_type, "Add")
 
+    def test_rule_is_only_tried_on_nodes_of_the_root_operator(self):
+        def abs_neg_pattern(op, x):
+            return op.Abs(op.Neg(x))
+
+        def neg_abs(op, x):
+            return op.Neg(op.Abs(x))
+
+        rule = pattern.RewriteRule(abs_neg_pattern, neg_abs)
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x) => (float[N] z)
+            {
+                t1 = Neg(x)
+                t2 = Relu(t1)
+                t3 = Neg(t2)
+                z = Abs(t3)
+            }
+        """
+        )
+        model = ir.serde.deserialize_model(model_proto)
+        with unittest.mock.patch.object(
+            rule, "try_rewrite", wraps=rule.try_rewrite
+        ) as try_rewrite:
+            count = rule.apply_to_model(model)
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            [call.args[2].op_type for call in try_rewrite.call_args_list], ["Abs", "Abs"]
+        )
+        self.assertEqual([node.op_type for node in model.graph], ["Neg", "Relu", "Abs", "Neg"])
+
+    def test_rule_is_applied_to_new_nodes_of_the_root_operator(self):
+        def abs_neg_pattern(op, x):
+            return op.Abs(op.Neg(x))
+
+        def neg_abs(op, x):
+            return op.Neg(op.Abs(x))
+
+        rule = pattern.RewriteRule(abs_neg_pattern, neg_abs)
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x) => (float[N] z)
+            {
+                t1 = Neg(x)
+                t2 = Neg(t1)
+                z = Abs(t2)
+            }
+        """
+        )
+        model = ir.serde.deserialize_model(model_proto)
+        count = rule.apply_to_model(model)
+        # The Abs created by the first rewrite is rewritten in the same pass
+        self.assertEqual(count, 2)
+        self.assertEqual([node.op_type for node in model.graph], ["Abs", "Neg", "Neg"])
+
+    def test_rule_is_applied_to_nodes_of_the_root_operator_with_an_overload(self):
+        def foo_pattern(op, x):
+            return op.Foo(x, _domain="custom")
+
+        def bar(op, x):
+            return op.Bar(x, _domain="custom")
+
+        rule = pattern.RewriteRule(foo_pattern, bar)
+        x = ir.Input("x", ir.Shape([2]), ir.TensorType(ir.DataType.FLOAT))
+        foo = ir.Node("custom", "Foo", inputs=[x], overload="v1")
+        graph = ir.Graph([x], foo.outputs, nodes=[foo], opset_imports={"": 17, "custom": 1})
+        model = ir.Model(graph, ir_version=8)
+        count = rule.apply_to_model(model)
+        self.assertEqual(count, 1)
+        self.assertEqual([node.op_type for node in model.graph], ["Bar"])
+
+    def _multi_output_rule(self) -> pattern.RewriteRule:
+        def abs_neg_pattern(op, x, y):
+            return op.Abs(x), op.Neg(y)
+
+        def abs_neg(op, x, y):
+            return op.AbsNeg(x, y, _domain="custom", _outputs=2)
+
+        return pattern.RewriteRule(
+            abs_neg_pattern, abs_neg, matcher=pattern.SimplePatternMatcher
+        )
+
+    def test_multi_output_replacement_is_inserted_after_the_producers_of_its_inputs(self):
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x) => (float[N] z)
+            {
+                a = Abs(x)
+                y = Sigmoid(x)
+                n = Neg(y)
+                z = Add(a, n)
+            }
+        """
+        )
+        model = ir.serde.deserialize_model(model_proto)
+        count = self._multi_output_rule().apply_to_model(model)
+        self.assertEqual(count, 1)
+        self.assertEqual([node.op_type for node in model.graph], ["Sigmoid", "AbsNeg", "Add"])
+
+    def test_multi_output_replacement_is_inserted_before_the_consumers_of_its_outputs(self):
+        model_proto = onnx.parser.parse_model(
+            """
+            <ir_version: 7, opset_import: [ "" : 17]>
+            agraph (float[N] x) => (float[N] z)
+            {
+                a = Abs(x)
+                u = Relu(a)
+                y = Sigmoid(x)
+                n = Neg(y)
+                z = Add(u, n)
+            }
+        """
+        )
+        model = ir.serde.deserialize_model(model_proto)
+        count = self._multi_output_rule().apply_to_model(model)
+        self.assertEqual(count, 1)
+        # No position follows the producers of the inputs and precedes all consumers, so
+        # the replacement stays at the position of the first output node of the match
+        self.assertEqual(
+            [node.op_type for node in model.graph], ["AbsNeg", "Relu", "Sigmoid", "Add"]
+        )
+
     def test_debug_mode(self):
         def source_pattern(op, x):
             t1 = op.Abs(x)
@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Measure the time to constant fold a model with and without the NumPy kernels and cache.
+
+By default, a small decoder with static shapes is exported with the TorchScript
+exporter of PyTorch without its constant folding, which leaves the shape
+computations of the attention layers in the model. Pass ``--model`` to fold an
+exported LLM instead.
+
+Usage:
+    python constant_folding_benchmark.py --layers 8
+    python constant_folding_benchmark.py --model model.onnx
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import contextlib
+import io
+import time
+
+import onnx
+
+from onnxscript import ir
+from onnxscript.optimizer import _constant_folding, _numpy_kernels
+
+
+def export_decoder(num_layers: int) -> onnx.ModelProto:
+    import torch  # pylint: disable=import-outside-toplevel
+
+    class Attention(torch.nn.Module):
+        def __init__(self, hidden_size: int = 64, num_heads: int = 4):
+            super().__init__()
+            self.num_heads = num_heads
+            self.qkv = torch.nn.Linear(hidden_size, 3 * hidden_size)
+            self.out = torch.nn.Linear(hidden_size, hidden_size)
+
+        def forward(self, x):
+            batch, length, hidden = x.shape
+            head_size = hidden // self.num_heads
+            q, k, v = (
+                t.view(batch, length, self.num_heads, head_size).transpose(1, 2)
+                for t in self.qkv(x).split(hidden, dim=-1)
+            )
+            mask = torch.triu(torch.ones(length, length, dtype=torch.bool), 1)
+            scores = (q @ k.transpose(-1, -2)).masked_fill(mask, float("-inf"))
+            attention = scores.softmax(-1) @ v
+            return self.out(attention.transpose(1, 2).reshape(batch, length, hidden))
+
+    model = torch.nn.Sequential(*[Attention() for _ in range(num_layers)])
+    buffer = io.BytesIO()
+    torch.onnx.export(
+        model,
+        (torch.randn(2, 16, 64),),
+        buffer,
+        dynamo=False,
+        do_constant_folding=False,
+        opset_version=18,
+    )
+    return onnx.load_from_string(buffer.getvalue())
+
+
+@contextlib.contextmanager
+def _kernels_disabled():
+    op_kernels = _numpy_kernels.registry.op_kernels
+    _numpy_kernels.registry.op_kernels = {}
+    try:
+        yield
+    finally:
+        _numpy_kernels.registry.op_kernels = op_kernels
+
+
+def _fold(model_proto: onnx.ModelProto, repeat: int, **kwargs) -> tuple[float, ir.Model]:
+    best = float("inf")
+    for _ in range(repeat):
+        model = ir.serde.deserialize_model(model_proto)
+        start = time.perf_counter()
+        _constant_folding.fold_constants(model, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="Path to an ONNX model to fold")
+    parser.add_argument("--layers", type=int, default=8, help="Layers of the decoder")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration")
+    args = parser.parse_args()
+
+    if args.model:
+        model_proto = onnx.load(args.model, load_external_data=False)
+    else:
+        model_proto = export_decoder(args.layers)
+    op_types = collections.Counter(node.op_type for node in model_proto.graph.node)
+    print(f"{len(model_proto.graph.node)} nodes: {dict(op_types.most_common(8))}")
+
+    with _kernels_disabled():
+        reference_time, reference_model = _fold(model_proto, args.repeat, cache_size_limit=0)
+    kernel_time, kernel_model = _fold(model_proto, args.repeat, cache_size_limit=0)
+    cache_time, cache_model = _fold(model_proto, args.repeat)
+    same = ir.serde.serialize_model(reference_model) == ir.serde.serialize_model(kernel_model)
+    print(f"reference implementation {reference_time * 1000:8.1f} ms")
+    print(f"NumPy kernels            {kernel_time * 1000:8.1f} ms")
+    print(f"NumPy kernels and cache  {cache_time * 1000:8.1f} ms")
+    print(f"{len(kernel_model.graph)} nodes left ({'same' if same else 'DIFFERENT'} output)")
+    num_constants = sum(node.op_type == "Constant" for node in cache_model.graph)
+    print(f"{len(cache_model.graph)} nodes left with the cache, {num_constants} constants")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Measure the memory used by the IR for a large transformer-like graph.
+
+The graph is synthesized so that no model needs to be downloaded. Each layer
+resembles a transformer decoder block with attention and MLP subgraphs.
+
+Usage:
+    python memory_benchmark.py --layers 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from onnxscript import ir
+
+
+def _layer(x: ir.Value, index: int) -> tuple[list[ir.Node], ir.Value]:
+    nodes: list[ir.Node] = []
+
+    def add(op_type: str, *inputs: ir.Value, **attributes) -> ir.Value:
+        node = ir.Node(
+            "",
+            op_type,
+            inputs,
+            attributes=[ir.convenience.convert_attribute(k, v) for k, v in attributes.items()],
+            name=f"layer{index}/{op_type}_{len(nodes)}",
+        )
+        node.outputs[0].name = f"layer{index}/{op_type}_{len(nodes)}_output"
+        node.outputs[0].dtype = ir.DataType.FLOAT
+        node.outputs[0].shape = ir.Shape(["batch", "seq", 4096])
+        nodes.append(node)
+        return node.outputs[0]
+
+    normed = add("LayerNormalization", x, axis=-1, epsilon=1e-5)
+    q = add("MatMul", normed)
+    k = add("MatMul", normed)
+    v = add("MatMul", normed)
+    q = add("Transpose", add("Reshape", q), perm=[0, 2, 1, 3])
+    k = add("Transpose", add("Reshape", k), perm=[0, 2, 3, 1])
+    v = add("Transpose", add("Reshape", v), perm=[0, 2, 1, 3])
+    scores = add("Softmax", add("Div", add("MatMul", q, k)), axis=-1)
+    attention = add("Reshape", add("Transpose", add("MatMul", scores, v), perm=[0, 2, 1, 3]))
+    x = add("Add", x, add("MatMul", attention))
+    normed = add("LayerNormalization", x, axis=-1, epsilon=1e-5)
+    gate = add("Sigmoid", add("MatMul", normed))
+    up = add("MatMul", normed)
+    x = add("Add", x, add("MatMul", add("Mul", gate, up)))
+    return nodes, x
+
+
+def build_graph(num_layers: int) -> ir.Graph:
+    x = ir.Value(name="input", type=ir.TensorType(ir.DataType.FLOAT))
+    nodes = []
+    for i in range(num_layers):
+        layer_nodes, x = _layer(x, i)
+        nodes.extend(layer_nodes)
+    return ir.Graph([nodes[0].inputs[0]], [x], nodes=nodes, name="main_graph")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--layers", type=int, default=200, help="Number of layers")
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    graph = build_graph(args.layers)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    num_nodes = len(graph)
+    num_values = sum(len(node.outputs) for node in graph)
+    start = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - start
+
+    print(f"Nodes: {num_nodes}, values: {num_values}")
+    print(f"Memory: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB)")
+    print(f"Memory per node including its outputs: {current / num_nodes:.0f} bytes")
+    print(f"Full garbage collection: {gc_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the worklist optimizer with repeated full passes of optimize_ir.
+
+The model is synthesized so that no model needs to be downloaded. Each block has
+a small subtraction of constants to fold, a Mul by the folded one that the rewrite
+rules remove, and nodes that cannot be optimized.
+
+Usage:
+    python optimizer_benchmark.py --blocks 500 --iterations 2 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+import onnxscript.optimizer
+from onnxscript import ir
+
+
+def build_model(num_blocks: int) -> ir.Model:
+    model_input = ir.Value(
+        name="x", type=ir.TensorType(ir.DataType.FLOAT), shape=ir.Shape([4, 4])
+    )
+    nodes: list[ir.Node] = []
+
+    def add_node(op_type: str, inputs, **attributes) -> ir.Value:
+        node = ir.Node(
+            "",
+            op_type,
+            inputs,
+            attributes=ir.convenience.convert_attributes(attributes),
+            name=f"node_{len(nodes)}",
+        )
+        node.outputs[0].name = f"value_{len(nodes)}"
+        nodes.append(node)
+        return node.outputs[0]
+
+    x = model_input
+    for _ in range(num_blocks):
+        two = add_node("Constant", [], value=ir.tensor(np.array(2.0, dtype=np.float32)))
+        one = add_node("Constant", [], value=ir.tensor(np.array(1.0, dtype=np.float32)))
+        # Sub is folded to 1, then Mul(x, 1) is removed by the rewrite rules
+        x = add_node("Mul", [x, add_node("Sub", [two, one])])
+        x = add_node("Tanh", [add_node("Relu", [x])])
+    graph = ir.Graph([model_input], [x], nodes=nodes, opset_imports={"": 20})
+    return ir.Model(graph, ir_version=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=500, help="Number of blocks")
+    parser.add_argument(
+        "--iterations", type=int, nargs="+", default=[2, 4], help="Values of num_iterations"
+    )
+    args = parser.parse_args()
+
+    for num_iterations in args.iterations:
+        for stop_if_no_change in (False, True):
+            model = build_model(args.blocks)
+            start = time.perf_counter()
+            onnxscript.optimizer.optimize_ir(
+                model,
+                num_iterations=num_iterations,
+                onnx_shape_inference=False,
+                stop_if_no_change=stop_if_no_change,
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"num_iterations={num_iterations} stop_if_no_change={stop_if_no_change!s:5} "
+                f"{elapsed * 1000:8.1f} ms  {len(model.graph)} nodes left"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the cost of the accessors of the uses of a value.
+
+Usage:
+    python uses_benchmark.py --uses 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from onnxscript import ir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uses", type=int, default=4, help="Number of uses of the value")
+    parser.add_argument("--number", type=int, default=1_000_000, help="Calls per accessor")
+    args = parser.parse_args()
+
+    value = ir.Value(name="x")
+    for _ in range(args.uses):
+        ir.Node("", "Identity", [value])
+
+    def first_consumer_from_uses():
+        for node, _ in value.uses():
+            return node
+        return None
+
+    def first_consumer_from_iter_uses():
+        for node, _ in value.iter_uses():
+            return node
+        return None
+
+    statements = {
+        "bool(value.uses())": lambda: bool(value.uses()),
+        "value.has_uses()": value.has_uses,
+        "len(value.uses())": lambda: len(value.uses()),
+        "value.num_uses()": value.num_uses,
+        "first consumer from uses()": first_consumer_from_uses,
+        "first consumer from iter_uses()": first_consumer_from_iter_uses,
+    }
+    for name, statement in statements.items():
+        seconds = timeit.timeit(statement, number=args.number)
+        print(f"{name:35} {seconds / args.number * 1e9:8.1f} ns")
+
+
+if __name__ == "__main__":
+    main()